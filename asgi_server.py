@@ -0,0 +1,811 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Variante assíncrona (ASGI) da API, para muitas requisições simultâneas por processo
+
+O PostgreSQL é acessado com asyncpg, sem bloquear o event loop. O pymssql não
+tem versão assíncrona, então as consultas ao Azure rodam em um
+ThreadPoolExecutor limitado. Os contratos JSON são os mesmos de photo_server.py.
+
+Uso (produção roda este app sob o gunicorn.conf.py, worker do uvicorn):
+    gunicorn -c gunicorn.conf.py
+    WEB_CONCURRENCY=2 uvicorn asgi_server:app --host 0.0.0.0 --port 8000
+
+O uvicorn lê o número de workers de WEB_CONCURRENCY; com mais de um, as fotos
+das sessões vão para o store SQLite compartilhado (como no gunicorn.conf.py).
+Com --workers na linha de comando isso não é visível daqui: defina
+PHOTO_STORE=sqlite.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import partial
+
+import asyncpg
+from quart import Quart, Response, jsonify, request, send_file
+from quart_cors import cors
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Precisa valer antes de photo_server ser importado (cada worker importa o módulo)
+if int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+    os.environ.setdefault('PHOTO_STORE', 'sqlite')
+
+import photo_server
+from idempotency import idempotente_async
+from order_export import (
+    PlanilhaXlsx, Workbook, gerar_csv_async, ler_em_lotes_async, montar_consulta_exportacao
+)
+from order_history import decodificar_cursor, ler_limite, montar_consulta_historico, montar_pagina
+from order_store import (
+    gravar_refeicoes_async, ler_pedido, limites_quinzena, montar_linhas_pedido, montar_linhas_quinzena,
+    para_asyncpg, total_da_linha, validar_data_periodo
+)
+from order_summary import CONSULTA_RESUMO, montar_resumo
+from pdf_report import montar_recibo, nome_arquivo_pdf
+from photo_store import (
+    SESSION_ID_VALIDO, TIPOS_FOTO, Foto, FotoGrandeDemais, ler_data_url, ler_em_blocos, limitar_espera,
+    montar_data_url
+)
+from reports import ler_filtros, montar_consulta, montar_relatorio
+from supplier_catalog import somente_digitos
+
+# Threads para as chamadas bloqueantes (pymssql); mais que o pool Azure só geraria fila
+ASGI_AZURE_THREADS = int(os.getenv('ASGI_AZURE_THREADS', photo_server.AZURE_POOL_MAX))
+
+# Pool asyncpg do PostgreSQL
+ASGI_PG_POOL_MIN = int(os.getenv('ASGI_PG_POOL_MIN', photo_server.PG_POOL_MIN))
+ASGI_PG_POOL_MAX = int(os.getenv('ASGI_PG_POOL_MAX', photo_server.PG_POOL_MAX))
+ASGI_PG_COMMAND_TIMEOUT = float(os.getenv('ASGI_PG_COMMAND_TIMEOUT', 30))
+
+azure_executor = ThreadPoolExecutor(max_workers=ASGI_AZURE_THREADS, thread_name_prefix='azure')
+
+app = cors(Quart(__name__))  # Habilita CORS para todas as rotas
+
+# asyncpg.Pool, criado na subida (ou na primeira requisição se o banco estava fora)
+pg_pool = None
+_pg_pool_lock = asyncio.Lock()
+
+
+async def em_thread(funcao, *args):
+    """Executa uma chamada bloqueante no executor limitado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(azure_executor, partial(funcao, *args))
+
+
+async def obter_pg_pool():
+    """Devolve o pool asyncpg, criando-o se necessário (None se o banco não responder)"""
+    global pg_pool
+    if pg_pool is not None:
+        return pg_pool
+    async with _pg_pool_lock:
+        if pg_pool is None:
+            try:
+                print(f"🔌 Criando pool asyncpg para {photo_server.PG_HOST}:{photo_server.PG_PORT}...")
+                pg_pool = await asyncpg.create_pool(
+                    host=photo_server.PG_HOST,
+                    port=int(photo_server.PG_PORT),
+                    user=photo_server.PG_USER,
+                    password=photo_server.PG_PASSWORD,
+                    database=photo_server.PG_DATABASE,
+                    min_size=ASGI_PG_POOL_MIN,
+                    max_size=ASGI_PG_POOL_MAX,
+                    command_timeout=ASGI_PG_COMMAND_TIMEOUT,
+                    timeout=30
+                )
+                print("✅ Pool asyncpg pronto!")
+            except Exception as e:
+                print(f"❌ Erro ao conectar PostgreSQL (asyncpg): {e}")
+        return pg_pool
+
+
+async def consultar(sql, parametros):
+    """Executa uma consulta montada para psycopg2 (%s) no pool asyncpg; devolve tuplas"""
+    pool = await obter_pg_pool()
+    if pool is None:
+        raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+    async with pool.acquire() as connection:
+        linhas = await connection.fetch(para_asyncpg(sql), *parametros)
+    return [tuple(linha) for linha in linhas]
+
+
+def admin_autorizado():
+    """Confere o token de administração do request atual (sem ADMIN_TOKEN, nega)"""
+    return photo_server.token_admin_valido(request.headers.get('X-Admin-Token'))
+
+
+async def obter_catalogo():
+    """Catálogo do cache; só vai para uma thread quando pode precisar do Azure"""
+    # Com um catálogo no cache get() não bloqueia: a recarga corre em segundo plano
+    if photo_server.catalog_cache.peek() is not None:
+        return photo_server.catalog_cache.get()
+    return await em_thread(photo_server.catalog_cache.get)
+
+
+@app.before_serving
+async def iniciar():
+    """Migrações (psycopg2, uma vez), pool asyncpg e conexões Azure mínimas"""
+    print("🔧 Verificando migrações do PostgreSQL...")
+    await em_thread(photo_server.migrar_banco_postgresql)
+    # A conexão psycopg2 só serviu para as migrações
+    photo_server.pg_pool.close_all()
+    await obter_pg_pool()
+    # Catálogo do snapshot já está no cache; a conferência com o Azure corre em segundo plano
+    photo_server.catalog_cache.atualizar()
+    print(f"🔧 Aquecendo pool Azure: {await em_thread(photo_server.azure_pool.warm_up)} conexões abertas")
+
+
+@app.after_serving
+async def encerrar():
+    """Fecha o pool asyncpg, o executor e as conexões Azure"""
+    if pg_pool is not None:
+        await pg_pool.close()
+    azure_executor.shutdown(wait=False)
+    photo_server.fechar_pools()
+
+
+@app.route('/favicon.ico')
+async def favicon():
+    """Retorna um favicon vazio para evitar erro 404"""
+    return '', 204
+
+
+@app.route('/health')
+async def health_check():
+    """Health check para Railway"""
+    return jsonify({'status': 'healthy', 'service': 'fornecedores-api'}), 200
+
+
+@app.route('/api/stats')
+async def get_stats():
+    """Estatísticas internas (pools, executor e caches)"""
+    postgresql = None
+    if pg_pool is not None:
+        postgresql = {
+            'abertas': pg_pool.get_size(),
+            'ociosas': pg_pool.get_idle_size(),
+            'min_size': pg_pool.get_min_size(),
+            'max_size': pg_pool.get_max_size(),
+        }
+    return jsonify({
+        'azure_pool': photo_server.azure_pool.stats(),
+        'azure_threads': ASGI_AZURE_THREADS,
+        'postgresql_pool': postgresql,
+        'catalogo': photo_server.catalog_cache.stats(),
+        'busca': photo_server.supplier_search.stats(),
+        'pdf': photo_server.pdf_renderer.stats(),
+        'idempotencia': photo_server.idempotency_cache.stats(),
+        'fotos': photo_server.photo_store.stats(),
+        'imagens': photo_server.image_pipeline.stats(),
+        'estaticos': photo_server.static_assets.stats()
+    })
+
+
+async def servir_estatico(nome, asset):
+    """Responde um arquivo estático: variante comprimida da memória ou o arquivo do disco"""
+    if asset is None:
+        return jsonify({'error': f'{nome} não encontrado'}), 404
+
+    variante = asset.negociar(request.headers.get('Accept-Encoding'))
+    if variante.dados is None:
+        response = await send_file(asset.caminho, mimetype=asset.content_type)
+    else:
+        response = Response(variante.dados, mimetype=asset.content_type)
+        if variante.encoding != 'identity':
+            response.headers['Content-Encoding'] = variante.encoding
+        response.vary.add('Accept-Encoding')
+    response.set_etag(variante.etag)
+    response.headers['Cache-Control'] = photo_server.static_assets.cache_control(asset, nome)
+    response = await response.make_conditional(request)
+    photo_server.static_assets.registrar_resposta(response.status_code == 304)
+    return response
+
+
+@app.route('/')
+async def index():
+    """Serve o HTML principal"""
+    return await servir_estatico('index.html', photo_server.static_assets.buscar('index.html'))
+
+
+@app.route(f'/{photo_server.LOGO_ARQUIVO}')
+async def logo():
+    """Logo pelo nome original (páginas antigas em cache)"""
+    return await servir_estatico(photo_server.LOGO_ARQUIVO, photo_server.static_assets.buscar(photo_server.LOGO_ARQUIVO))
+
+
+@app.route('/static/<nome>')
+async def static_fingerprint(nome):
+    """Arquivos pela URL com hash do conteúdo (cache de um ano)"""
+    return await servir_estatico(nome, photo_server.static_assets.buscar_fingerprint(nome))
+
+
+@app.route('/api/suppliers')
+async def get_suppliers():
+    """API para buscar fornecedores (catálogo em cache com ETag)"""
+    try:
+        catalogo = await obter_catalogo()
+    except Exception as e:
+        print(f"❌ Erro na API: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    response = Response(catalogo.corpo, mimetype='application/json')
+    response.set_etag(catalogo.etag)
+    # Navegador sempre revalida; se nada mudou recebe 304 sem corpo
+    response.headers['Cache-Control'] = 'no-cache'
+    if photo_server.catalog_cache.expirado(catalogo):
+        # Azure fora por mais que ttl + stale_ttl: o catálogo pode estar desatualizado
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    return await response.make_conditional(request)
+
+
+@app.route('/api/admin/suppliers/refresh', methods=['POST'])
+async def refresh_suppliers():
+    """Força a recarga do catálogo de fornecedores a partir do Azure"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+
+    try:
+        catalogo = await em_thread(photo_server.catalog_cache.refresh)
+    except Exception as e:
+        print(f"❌ Erro ao recarregar catálogo: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    return jsonify({
+        'success': True,
+        'fornecedores': len(catalogo.fornecedores),
+        'etag': catalogo.etag
+    })
+
+
+@app.route('/api/suppliers/search')
+async def search_suppliers():
+    """Busca de fornecedores para o Select2 (sem acento, por prefixo, tolera um erro de digitação)"""
+    try:
+        limite = min(int(request.args.get('limit') or photo_server.SUPPLIER_SEARCH_LIMIT),
+                     photo_server.SUPPLIER_SEARCH_LIMIT)
+        if limite < 1:
+            raise ValueError('limit deve ser positivo')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        # Garante um catálogo no cache: daí em diante a busca é só memória
+        await obter_catalogo()
+        resultados = photo_server.supplier_search.buscar(request.args.get('q', ''), limite)
+    except Exception as e:
+        print(f"❌ Erro na busca de fornecedores: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    return jsonify({
+        'success': True,
+        # id = posição no catálogo; com os preços o front-end não precisa baixar /api/suppliers
+        'resultados': [{'id': indice, **f.para_dict()} for indice, f in resultados]
+    })
+
+
+async def receber_foto():
+    """Versão async de photo_server.receber_foto (corpo lido em blocos conforme chega)"""
+    limite_corpo = photo_server.PHOTO_MAX_BYTES * 4 // 3 + 64 * 1024
+    if request.content_length and request.content_length > limite_corpo:
+        raise FotoGrandeDemais('Foto maior que o permitido')
+
+    if request.mimetype in TIPOS_FOTO:
+        dados = bytearray()
+        async for parte in request.body:
+            dados += parte
+            if len(dados) > photo_server.PHOTO_MAX_BYTES:
+                raise FotoGrandeDemais('Foto maior que o permitido')
+        return Foto(bytes(dados), request.mimetype)
+
+    if request.mimetype == 'multipart/form-data':
+        arquivo = (await request.files).get('photo')
+        if arquivo is None:
+            raise ValueError("Campo 'photo' não enviado")
+        if arquivo.mimetype not in TIPOS_FOTO:
+            raise ValueError(f"Tipo de imagem não suportado: {arquivo.mimetype}")
+        return Foto(ler_em_blocos(arquivo.stream, photo_server.PHOTO_MAX_BYTES), arquivo.mimetype)
+
+    data = await request.get_json(silent=True) or {}
+    if not data.get('photo'):
+        raise ValueError('Foto não fornecida')
+    return ler_data_url(data['photo'])
+
+
+def responder_foto(foto):
+    """Foto em bytes com o content type original (?format=raw) ou JSON com data URL"""
+    if request.args.get('format') == 'raw':
+        return Response(foto.dados, mimetype=foto.content_type, headers={'Cache-Control': 'no-store'})
+    return jsonify({'status': 'found', 'photo': montar_data_url(foto)})
+
+
+@app.route('/api/photo/<session_id>', methods=['GET', 'POST'])
+async def photo_session(session_id):
+    """Foto da sessão de QR code: o celular envia (POST) e o desktop retira (GET)"""
+    photo_store = photo_server.photo_store
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+
+    if request.method == 'GET':
+        # O store SQLite faz I/O de disco: fora do event loop
+        foto = await asyncio.to_thread(photo_store.take, session_id)
+        if foto is None:
+            return jsonify({'status': 'not_found'}), 404
+        return responder_foto(foto)
+
+    try:
+        foto = await receber_foto()
+    except (FotoGrandeDemais, RequestEntityTooLarge):
+        return jsonify({'status': 'error', 'error': 'Foto maior que o permitido'}), 413
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+
+    if not await asyncio.to_thread(photo_server.guardar_foto, session_id, foto):
+        return jsonify({'status': 'error', 'error': 'Foto maior que o permitido'}), 413
+
+    print(f"📷 Foto recebida para a sessão {session_id} ({len(foto.dados)} bytes, {foto.content_type})")
+    return jsonify({'status': 'success'})
+
+
+@app.route('/api/photo/<session_id>/thumb')
+async def photo_session_thumb(session_id):
+    """Miniatura JPEG da foto da sessão (pode ser lida várias vezes até expirar)"""
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+
+    miniatura = await asyncio.to_thread(photo_server.photo_store.get, f'thumb:{session_id}')
+    if miniatura is None:
+        falha = await asyncio.to_thread(photo_server.falha_da_foto, f'thumb:{session_id}') or \
+            await asyncio.to_thread(photo_server.falha_da_foto, session_id)
+        if falha is not None:
+            return jsonify({'status': 'error', 'error': falha}), 422
+        return jsonify({'status': 'not_found'}), 404
+    return Response(miniatura.dados, mimetype=miniatura.content_type,
+                    headers={'Cache-Control': f'private, max-age={photo_server.PHOTO_TTL}'})
+
+
+async def esperar_foto(session_id, timeout):
+    """Espera a foto sem ocupar thread: o put() do store acorda um asyncio.Event
+
+    Devolve (foto, falha): a falha registrada pelo processamento também encerra a espera.
+    """
+    photo_store = photo_server.photo_store
+    foto = await asyncio.to_thread(photo_store.take, session_id)
+    if foto is not None or timeout <= 0:
+        return foto, None if foto is not None else await asyncio.to_thread(photo_server.falha_da_foto, session_id)
+
+    loop = asyncio.get_running_loop()
+    chegou = asyncio.Event()
+
+    def avisar():
+        # put() pode rodar em outra thread (ou no próprio loop)
+        loop.call_soon_threadsafe(chegou.set)
+
+    # Store compartilhado entre processos: também reconsulta a cada poll_interval
+    prazo = loop.time() + timeout
+    fatia = photo_store.poll_interval or timeout
+    chaves = (session_id, f'falha:{session_id}')
+    for chave in chaves:
+        photo_store.add_listener(chave, avisar)
+    try:
+        while True:
+            chegou.clear()
+            foto = await asyncio.to_thread(photo_store.take, session_id)
+            if foto is not None:
+                return foto, None
+            falha = await asyncio.to_thread(photo_server.falha_da_foto, session_id)
+            restante = prazo - loop.time()
+            if falha is not None or restante <= 0:
+                return None, falha
+            try:
+                await asyncio.wait_for(chegou.wait(), min(fatia, restante))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for chave in chaves:
+            photo_store.remove_listener(chave, avisar)
+
+
+@app.route('/api/photo/<session_id>/wait')
+async def photo_session_wait(session_id):
+    """Long-poll: segura a requisição até a foto chegar ou até ?timeout= segundos"""
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+
+    foto, falha = await esperar_foto(session_id, limitar_espera(request.args.get('timeout'), photo_server.PHOTO_WAIT_MAX))
+    if falha is not None:
+        return jsonify({'status': 'error', 'error': falha}), 422
+    if foto is None:
+        if request.args.get('format') == 'raw':
+            return '', 204
+        return jsonify({'status': 'waiting'})
+    return responder_foto(foto)
+
+
+@app.route('/api/save-order', methods=['POST'])
+@idempotente_async(photo_server.idempotency_cache)
+async def save_order():
+    """API para salvar pedidos com quantidades no banco"""
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'Dados não fornecidos'
+            }), 400
+
+        funcionario, cpf, data_pedido, pedidos = ler_pedido(data)
+
+        if not pedidos:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum pedido especificado'
+            }), 400
+
+        try:
+            data_pedido = validar_data_periodo(data_pedido)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        try:
+            precos, precos_do_cache = await em_thread(
+                photo_server.buscar_valores_fornecedores,
+                [pedido.get('fornecedor', '') for pedido in pedidos]
+            )
+        except photo_server.PrecosIndisponiveis as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        linhas, erros = montar_linhas_pedido(data_pedido, cpf, pedidos, precos)
+
+        if erros:
+            print(f"❌ Pedido rejeitado: {len(erros)} itens com erro")
+            return jsonify({
+                'success': False,
+                'error': f'{len(erros)} item(ns) com dados inválidos',
+                'erros': erros
+            }), 400
+
+        pool = await obter_pg_pool()
+        if pool is None:
+            return jsonify({
+                'success': False,
+                'error': 'Erro de conexão com o banco PostgreSQL'
+            }), 500
+
+        async with pool.acquire() as connection:
+            resultado = await gravar_refeicoes_async(connection, linhas, photo_server.COPY_THRESHOLD)
+
+        ids = resultado['ids'] or []
+        itens_salvos = resultado['linhas']
+        print(f"✅ Pedido salvo: {itens_salvos} itens para {funcionario}")
+
+        return jsonify({
+            'success': True,
+            'message': f'Pedido salvo com sucesso! {itens_salvos} itens processados',
+            'itens_salvos': itens_salvos,
+            'id': ids[0] if ids else None,
+            'ids': ids,
+            'funcionario': funcionario,
+            'data_pedido': data_pedido.isoformat(),
+            'precos_do_cache': precos_do_cache
+        })
+
+    except Exception as e:
+        print(f"❌ Erro ao salvar pedido: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/save-order/quinzena', methods=['POST'])
+@idempotente_async(photo_server.idempotency_cache)
+async def save_order_quinzena():
+    """API para salvar todos os dias de uma quinzena em uma única transação"""
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'Dados não fornecidos'
+            }), 400
+
+        # refeicoes guarda só os dígitos (cnpj CHAR(14)), como o /api/pdf consulta
+        cnpj = somente_digitos(data.get('cnpj'))
+        fornecedor = data.get('fornecedor', '')
+        dias = data.get('dias') or []
+
+        if not fornecedor or not dias:
+            return jsonify({
+                'success': False,
+                'error': 'Fornecedor e dias do período são obrigatórios'
+            }), 400
+
+        try:
+            precos, precos_do_cache = await em_thread(photo_server.buscar_valores_fornecedores, [fornecedor])
+        except photo_server.PrecosIndisponiveis as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        linhas, erros = montar_linhas_quinzena(
+            dias, cnpj, fornecedor, precos.get(fornecedor, {}),
+            data.get('ano'), data.get('mes'), data.get('quinzena')
+        )
+
+        if erros:
+            return jsonify({
+                'success': False,
+                'error': f'{len(erros)} dia(s) com dados inválidos',
+                'erros': erros
+            }), 400
+
+        pool = await obter_pg_pool()
+        if pool is None:
+            return jsonify({
+                'success': False,
+                'error': 'Erro de conexão com o banco PostgreSQL'
+            }), 500
+
+        async with pool.acquire() as connection:
+            resultado = await gravar_refeicoes_async(connection, linhas, photo_server.COPY_THRESHOLD)
+
+        ids = resultado['ids'] or [None] * len(linhas)
+        print(f"✅ Quinzena salva: {resultado['linhas']} dias para {fornecedor}")
+
+        return jsonify({
+            'success': True,
+            'message': f"Quinzena salva com sucesso! {resultado['linhas']} dias processados",
+            'itens_salvos': resultado['linhas'],
+            'precos_do_cache': precos_do_cache,
+            'dias': [
+                {
+                    'data_refeicao': linha[0].isoformat(),
+                    'id': id_refeicao,
+                    'total': round(total_da_linha(linha), 2)
+                }
+                for linha, id_refeicao in zip(linhas, ids)
+            ]
+        })
+
+    except Exception as e:
+        print(f"❌ Erro ao salvar quinzena: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/pdf', methods=['POST'])
+async def order_pdf():
+    """PDF do pedido da quinzena gerado a partir das linhas gravadas e da foto da assinatura"""
+    pdf_renderer = photo_server.pdf_renderer
+    if not pdf_renderer.disponivel:
+        return jsonify({'success': False, 'error': 'Geração de PDF no servidor indisponível'}), 501
+
+    data = await request.get_json(silent=True) or {}
+    fornecedor = data.get('fornecedor', '')
+    # refeicoes guarda só os dígitos (saveOrderToDatabase envia cleanCNPJ)
+    cnpj = somente_digitos(data.get('cnpj'))
+    try:
+        if not fornecedor or not cnpj:
+            raise ValueError('Fornecedor e CNPJ são obrigatórios')
+        inicio, fim = limites_quinzena(data.get('ano'), data.get('mes'), data.get('quinzena'))
+        foto = ler_data_url(data['photo']).dados if data.get('photo') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        linhas = await consultar(photo_server.SQL_REFEICOES_PERIODO, (cnpj, fornecedor, inicio, fim))
+        if not linhas:
+            return jsonify({'success': False, 'error': 'Nenhum pedido gravado nesta quinzena'}), 404
+        recibo = montar_recibo(
+            linhas, fornecedor, cnpj, inicio.year, inicio.month, data.get('quinzena'),
+            foto=foto, data_hora=data.get('data_hora', ''), local=data.get('local', '')
+        )
+        # reportlab é CPU: fora do event loop
+        sha, pdf = await asyncio.to_thread(pdf_renderer.render, recibo)
+    except Exception as e:
+        print(f"❌ Erro ao gerar PDF: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    response = Response(pdf, mimetype='application/pdf', headers={
+        'Content-Disposition': f'attachment; filename={nome_arquivo_pdf(recibo)}',
+        'Cache-Control': 'no-cache'
+    })
+    response.set_etag(sha)
+    return response
+
+
+@app.route('/api/reports/resumo')
+async def report_summary():
+    """Totais de uma quinzena de um fornecedor (uma linha de FORNECEDORES.resumo_quinzena)"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+
+    cnpj = somente_digitos(request.args.get('cnpj'))
+    fornecedor = request.args.get('fornecedor', '')
+    try:
+        if not cnpj or not fornecedor:
+            raise ValueError('cnpj e fornecedor são obrigatórios')
+        inicio, fim = limites_quinzena(request.args.get('ano'), request.args.get('mes'), request.args.get('quinzena'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        linhas = await consultar(CONSULTA_RESUMO, (cnpj, fornecedor, inicio))
+    except Exception as e:
+        print(f"❌ Erro no resumo: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'cnpj': cnpj,
+        'fornecedor': fornecedor,
+        'data_inicio': inicio.isoformat(),
+        'data_fim': fim.isoformat(),
+        'resumo': montar_resumo(linhas[0] if linhas else None)
+    })
+
+
+@app.route('/api/reports/<agrupamento>')
+async def report(agrupamento):
+    """Somas de quantidades e totais por fornecedores, projetos ou periodos (quinzenas)"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+
+    try:
+        filtros = ler_filtros(request.args)
+        projetos = ()
+        if agrupamento == 'projetos':
+            projetos = [(f['fornecedor'], f.get('projeto', '')) for f in (await obter_catalogo()).fornecedores]
+        sql, parametros = montar_consulta(agrupamento, filtros, projetos)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro no relatório: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    try:
+        linhas = await consultar(sql, parametros)
+    except Exception as e:
+        print(f"❌ Erro no relatório: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'agrupamento': agrupamento,
+        'filtros': {chave: valor.isoformat() if isinstance(valor, date) else valor for chave, valor in filtros.items()},
+        **montar_relatorio(agrupamento, linhas)
+    })
+
+
+@app.route('/api/orders')
+async def list_orders():
+    """Pedidos já gravados de um CNPJ, do mais recente ao mais antigo, em páginas"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    try:
+        filtros = ler_filtros(request.args)
+        if not filtros['cnpj']:
+            raise ValueError('cnpj é obrigatório')
+        limite = ler_limite(request.args.get('limit'))
+        cursor_pagina = decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        sql, parametros = montar_consulta_historico(
+            filtros, request.args.get('fornecedor') or None, cursor_pagina, limite
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        linhas = await consultar(sql, parametros)
+    except Exception as e:
+        print(f"❌ Erro no histórico: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, **montar_pagina(linhas, limite)})
+
+
+async def exportar_lotes(sql, parametros):
+    """Lotes de EXPORT_CHUNK_ROWS linhas lidos por cursor asyncpg; a conexão volta ao pool no fim"""
+    pool = await obter_pg_pool()
+    if pool is None:
+        raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+    async with pool.acquire() as connection:
+        lotes = ler_em_lotes_async(connection, para_asyncpg(sql), parametros, photo_server.EXPORT_CHUNK_ROWS)
+        try:
+            async for lote in lotes:
+                yield lote
+        finally:
+            await lotes.aclose()
+
+
+async def ler_arquivo(arquivo, tamanho=64 * 1024):
+    """Envia um arquivo temporário em blocos lidos fora do event loop e o fecha no fim"""
+    try:
+        while True:
+            bloco = await asyncio.to_thread(arquivo.read, tamanho)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        arquivo.close()
+
+
+@app.route('/api/export/<formato>')
+async def export_orders(formato):
+    """Exporta FORNECEDORES.refeicoes em csv ou xlsx (filtros como em /api/reports)"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    if formato not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'error': f'Formato inválido: {formato}'}), 400
+    if formato == 'xlsx' and Workbook is None:
+        return jsonify({'success': False, 'error': 'Exportação XLSX indisponível (openpyxl não instalado)'}), 501
+
+    try:
+        sql, parametros = montar_consulta_exportacao(ler_filtros(request.args))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    nome_arquivo = f"refeicoes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{formato}"
+
+    if formato == 'xlsx':
+        try:
+            planilha = PlanilhaXlsx()
+            async for lote in exportar_lotes(sql, parametros):
+                await asyncio.to_thread(planilha.adicionar, lote)
+            arquivo = await asyncio.to_thread(planilha.finalizar)
+        except Exception as e:
+            print(f"❌ Erro na exportação: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+        return Response(ler_arquivo(arquivo), headers={
+            'Content-Type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'Content-Disposition': f'attachment; filename={nome_arquivo}'
+        })
+
+    # O primeiro pedaço já executa a consulta: erro aqui ainda vira um 500 em JSON
+    corpo = gerar_csv_async(exportar_lotes(sql, parametros))
+    try:
+        primeiro = await corpo.__anext__()
+    except Exception as e:
+        await corpo.aclose()
+        print(f"❌ Erro na exportação: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    async def enviar():
+        try:
+            yield primeiro
+            async for pedaco in corpo:
+                yield pedaco
+        finally:
+            # Cliente desconectou no meio: fecha o cursor e devolve a conexão já
+            await corpo.aclose()
+
+    print(f"📤 Exportando refeições ({formato})")
+    return Response(enviar(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={nome_arquivo}',
+        'Cache-Control': 'no-store'
+    })
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 8000))
+    print(f"🚀 Iniciando servidor ASGI em http://0.0.0.0:{port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build dos arquivos estáticos: separa o CSS e o JS embutidos no index.html
+
+Cada bloco <style> do <head> e cada <script> inline vira um arquivo com o
+hash do conteúdo no nome (minificado se rcssmin/rjsmin estiverem
+instalados), e o HTML gerado passa a referenciá-los em /static/. Um bloco
+que não mudou mantém o nome, então continua no cache do navegador entre
+deploys.
+
+Uso:
+    python build_assets.py [--origem index.html] [--destino build]
+
+O servidor usa o build só se o manifest.json corresponder ao index.html
+atual; caso contrário serve o index.html original.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+from static_assets import nome_com_hash
+
+try:
+    import rcssmin
+except ImportError:  # minificação é opcional: sem ela o arquivo sai como está
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+DIRETORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+ORIGEM_PADRAO = os.path.join(DIRETORIO_BASE, 'index.html')
+DESTINO_PADRAO = os.getenv('STATIC_BUILD_DIR', os.path.join(DIRETORIO_BASE, 'build'))
+
+# Arquivos referenciados pelo HTML/JS que são servidos com o nome com hash
+ARQUIVOS_FINGERPRINT = ('LARSIL_branco_fundo_transparente.png',)
+
+VERSAO_MANIFESTO = 1
+
+STYLE_INLINE = re.compile(r'<style>(.*?)</style>', re.S)
+SCRIPT_INLINE = re.compile(r'<script>(.*?)</script>', re.S)
+
+
+def buscar_referencias(raiz=DIRETORIO_BASE):
+    """Nome original -> URL com hash, para os ARQUIVOS_FINGERPRINT que existem"""
+    referencias = {}
+    for nome in ARQUIVOS_FINGERPRINT:
+        caminho = os.path.join(raiz, nome)
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as f:
+                referencias[nome] = f"/static/{nome_com_hash(nome, f.read())}"
+    return referencias
+
+
+def assinatura_origem(bruto, referencias):
+    """Hash do HTML de origem e das URLs com hash (um logo novo também pede rebuild)"""
+    sha = hashlib.sha256(bruto)
+    for nome in sorted(referencias):
+        sha.update(referencias[nome].encode('utf-8'))
+    return sha.hexdigest()
+
+
+def ler_manifesto(destino, origem, raiz=DIRETORIO_BASE):
+    """Manifesto do build em `destino`, ou None se não existe ou não é do `origem` atual"""
+    try:
+        with open(os.path.join(destino, 'manifest.json'), encoding='utf-8') as f:
+            manifesto = json.load(f)
+        with open(origem, 'rb') as f:
+            assinatura = assinatura_origem(f.read(), buscar_referencias(raiz))
+    except (OSError, ValueError):
+        return None
+    if manifesto.get('versao') != VERSAO_MANIFESTO or manifesto.get('origem_sha') != assinatura:
+        return None
+    return manifesto
+
+
+def gravar_atomico(caminho, dados):
+    """Grava em arquivo temporário e renomeia (quem lê nunca vê arquivo pela metade)"""
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+def construir(origem, destino, raiz=DIRETORIO_BASE):
+    """Gera destino/index.html, os .css/.js com hash e o manifest.json; devolve o manifesto"""
+    with open(origem, 'rb') as f:
+        bruto = f.read()
+    html = bruto.decode('utf-8')
+
+    referencias = buscar_referencias(raiz)
+
+    def trocar_referencias(texto):
+        for nome, url in referencias.items():
+            texto = texto.replace(nome, url)
+        return texto
+
+    os.makedirs(destino, exist_ok=True)
+    arquivos = []
+
+    def extrair(conteudo, extensao, minificar):
+        conteudo = trocar_referencias(conteudo)
+        if minificar is not None:
+            conteudo = minificar(conteudo)
+        dados = conteudo.strip().encode('utf-8') + b'\n'
+        indice = sum(1 for nome in arquivos if nome.endswith(extensao)) + 1
+        nome = nome_com_hash(f"index-{indice}{extensao}", dados)
+        gravar_atomico(os.path.join(destino, nome), dados)
+        arquivos.append(nome)
+        return nome
+
+    # Só os <style> do <head>: há HTML com <style> dentro de strings do JS
+    cabeca, separador, corpo = html.partition('</head>')
+    cabeca = STYLE_INLINE.sub(
+        lambda m: f'<link rel="stylesheet" href="/static/{extrair(m.group(1), ".css", rcssmin and rcssmin.cssmin)}">',
+        cabeca
+    )
+    html = cabeca + separador + corpo
+    html = SCRIPT_INLINE.sub(
+        lambda m: f'<script src="/static/{extrair(m.group(1), ".js", rjsmin and rjsmin.jsmin)}"></script>',
+        html
+    )
+    gravar_atomico(os.path.join(destino, 'index.html'), trocar_referencias(html).encode('utf-8'))
+
+    # Arquivos de builds anteriores não são mais referenciados
+    for nome in os.listdir(destino):
+        if nome.endswith(('.css', '.js')) and nome not in arquivos:
+            os.remove(os.path.join(destino, nome))
+
+    manifesto = {
+        'versao': VERSAO_MANIFESTO,
+        'origem_sha': assinatura_origem(bruto, referencias),
+        'index': 'index.html',
+        'arquivos': arquivos,
+    }
+    gravar_atomico(os.path.join(destino, 'manifest.json'), json.dumps(manifesto, indent=2).encode('utf-8'))
+    return manifesto
+
+
+def construir_se_preciso(origem=ORIGEM_PADRAO, destino=DESTINO_PADRAO):
+    """Reconstrói só se o index.html mudou desde o último build"""
+    manifesto = ler_manifesto(destino, origem)
+    if manifesto is not None:
+        print(f"✅ Build dos estáticos em dia ({len(manifesto['arquivos'])} arquivos)")
+        return manifesto
+    print("🔧 Gerando build dos estáticos...")
+    manifesto = construir(origem, destino)
+    print(f"✅ Build gerado em {destino}: {', '.join(manifesto['arquivos'])}")
+    return manifesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Separa e versiona o CSS/JS do index.html')
+    parser.add_argument('--origem', default=ORIGEM_PADRAO)
+    parser.add_argument('--destino', default=DESTINO_PADRAO)
+    args = parser.parse_args()
+
+    if rcssmin is None or rjsmin is None:
+        print("⚠️ rcssmin/rjsmin não instalados: CSS/JS sem minificação")
+    try:
+        manifesto = construir(args.origem, args.destino)
+    except OSError as e:
+        print(f"❌ Erro no build: {e}")
+        return 1
+
+    for nome in manifesto['arquivos']:
+        print(f"   {nome}: {os.path.getsize(os.path.join(args.destino, nome))} bytes")
+    print(f"✅ Build gerado em {args.destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
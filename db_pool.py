@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pool de conexões thread-safe usado pelo servidor para Azure SQL e PostgreSQL"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _ConexaoDoPool:
+    """Conexão física guardada pelo pool com seus carimbos de tempo"""
+
+    __slots__ = ('raw', 'criada_em', 'devolvida_em', 'geracao')
+
+    def __init__(self, raw, geracao=0):
+        agora = time.monotonic()
+        self.raw = raw
+        self.geracao = geracao
+        self.criada_em = agora
+        self.devolvida_em = agora
+
+
+class ConnectionPool:
+    """Pool genérico com tamanho mínimo/máximo, validação, expiração e estatísticas
+
+    `factory` deve devolver uma conexão nova ou None em caso de falha (mesmo
+    contrato de `conectar_azure_sql`). `validate` recebe a conexão e devolve
+    True se ela ainda estiver utilizável. `is_broken` detecta conexões mortas
+    sem ida ao banco e `reset` limpa o estado da sessão na devolução.
+    """
+
+    def __init__(self, nome, factory, min_size=1, max_size=10, idle_timeout=300,
+                 max_lifetime=1800, checkout_timeout=30, validate=None, validate_after=30,
+                 is_broken=None, reset=None):
+        self.nome = nome
+        self.factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.validate = validate
+        self.validate_after = validate_after
+        self.is_broken = is_broken
+        self.reset = reset
+
+        self._cond = threading.Condition()
+        self._ociosas = []      # pilha LIFO: a conexão mais "quente" sai primeiro
+        self._em_uso = {}       # id(raw) -> _ConexaoDoPool
+        self._total = 0         # conexões abertas (ociosas + em uso + sendo criadas)
+        self._geracao = 0       # incrementada por close_all: conexões anteriores não voltam ao pool
+        self._stats = {
+            'criadas': 0,
+            'descartadas': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'falhas_conexao': 0,
+            'falhas_validacao': 0,
+            'quebradas': 0,
+            'esperas': 0,
+            'pico_em_uso': 0,
+        }
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def _expirada(self, item, agora):
+        return self.max_lifetime and agora - item.criada_em > self.max_lifetime
+
+    def _fechar(self, itens):
+        """Fecha conexões físicas fora do lock"""
+        for item in itens:
+            try:
+                item.raw.close()
+            except Exception:
+                pass
+
+    def _remover_ociosas_locked(self, agora):
+        """Retira conexões ociosas expiradas ou excedentes (chamar com o lock)"""
+        removidas = []
+        manter = []
+        # As mais antigas ficam no início da pilha
+        for item in self._ociosas:
+            ociosa_demais = (
+                self.idle_timeout
+                and agora - item.devolvida_em > self.idle_timeout
+                and self._total - len(removidas) > self.min_size
+            )
+            if ociosa_demais or self._expirada(item, agora):
+                removidas.append(item)
+            else:
+                manter.append(item)
+        if removidas:
+            self._ociosas = manter
+            self._total -= len(removidas)
+            self._stats['descartadas'] += len(removidas)
+            self._cond.notify_all()
+        return removidas
+
+    def _criar(self):
+        """Abre uma conexão nova (a vaga já deve estar reservada em _total)"""
+        try:
+            raw = self.factory()
+        except Exception as e:
+            print(f"❌ Pool {self.nome}: erro ao abrir conexão: {e}")
+            raw = None
+        with self._cond:
+            if raw is None:
+                self._total -= 1
+                self._stats['falhas_conexao'] += 1
+                self._cond.notify()
+                return None
+            self._stats['criadas'] += 1
+            geracao = self._geracao
+        return _ConexaoDoPool(raw, geracao)
+
+    def _quebrada(self, raw):
+        if not self.is_broken:
+            return False
+        try:
+            quebrada = bool(self.is_broken(raw))
+        except Exception:
+            quebrada = True
+        if quebrada:
+            with self._cond:
+                self._stats['quebradas'] += 1
+        return quebrada
+
+    def _valida(self, item, agora):
+        if self._quebrada(item.raw):
+            return False
+        if not self.validate or agora - item.devolvida_em < self.validate_after:
+            return True
+        try:
+            return bool(self.validate(item.raw))
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Empresta uma conexão do pool; devolve None se não for possível obter uma"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        limite = time.monotonic() + timeout
+        espera = 0.0            # só o tempo bloqueado esperando vaga
+
+        while True:
+            item = None
+            criar = False
+            removidas = []
+            with self._cond:
+                while True:
+                    agora = time.monotonic()
+                    removidas += self._remover_ociosas_locked(agora)
+                    if self._ociosas:
+                        item = self._ociosas.pop()
+                        break
+                    if self._total < self.max_size:
+                        self._total += 1
+                        criar = True
+                        break
+                    restante = limite - agora
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        break
+                    bloqueio = time.monotonic()
+                    self._cond.wait(restante)
+                    espera += time.monotonic() - bloqueio
+            self._fechar(removidas)
+
+            if not item and not criar:
+                print(f"⏳ Pool {self.nome}: nenhuma conexão livre em {timeout}s")
+                return None
+            if criar:
+                item = self._criar()
+                if item is None:
+                    return None
+            elif not self._valida(item, time.monotonic()):
+                with self._cond:
+                    self._total -= 1
+                    self._stats['falhas_validacao'] += 1
+                    self._stats['descartadas'] += 1
+                    self._cond.notify()
+                self._fechar([item])
+                continue
+
+            with self._cond:
+                self._em_uso[id(item.raw)] = item
+                self._stats['checkouts'] += 1
+                self._stats['pico_em_uso'] = max(self._stats['pico_em_uso'], len(self._em_uso))
+                self._espera_total += espera
+                self._espera_max = max(self._espera_max, espera)
+                if espera > 0:
+                    self._stats['esperas'] += 1
+            return item.raw
+
+    def release(self, raw, discard=False):
+        """Devolve uma conexão ao pool (ou a descarta se estiver inutilizável)"""
+        if raw is None:
+            return
+        if not discard and self._quebrada(raw):
+            discard = True
+        if not discard and self.reset:
+            try:
+                self.reset(raw)
+            except Exception as e:
+                print(f"⚠️ Pool {self.nome}: falha ao limpar conexão, descartando: {e}")
+                discard = True
+        agora = time.monotonic()
+        with self._cond:
+            item = self._em_uso.pop(id(raw), None)
+            if item is None:
+                return
+            if discard or item.geracao != self._geracao or self._expirada(item, agora):
+                self._total -= 1
+                self._stats['descartadas'] += 1
+                descartar = [item]
+            else:
+                item.devolvida_em = agora
+                self._ociosas.append(item)
+                descartar = self._remover_ociosas_locked(agora)
+            self._cond.notify()
+        self._fechar(descartar)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager que empresta e devolve a conexão automaticamente"""
+        raw = self.acquire(timeout)
+        try:
+            yield raw
+        except Exception:
+            # Sem como verificar a conexão o estado dela é desconhecido após
+            # o erro: melhor descartar. Com `is_broken` + `reset` ela é limpa
+            # e só descartada se estiver realmente quebrada.
+            self.release(raw, discard=not (self.is_broken and self.reset))
+            raise
+        else:
+            self.release(raw)
+
+    def warm_up(self):
+        """Abre conexões até atingir o tamanho mínimo"""
+        conexoes = []
+        while True:
+            with self._cond:
+                if self._total >= self.min_size:
+                    break
+                self._total += 1
+            item = self._criar()
+            if item is None:
+                break
+            conexoes.append(item)
+        with self._cond:
+            for item in conexoes:
+                self._ociosas.append(item)
+            self._cond.notify_all()
+        return len(conexoes)
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas (as em uso são fechadas ao voltar)
+
+        O pool continua utilizável: conexões novas são abertas sob demanda.
+        """
+        with self._cond:
+            self._geracao += 1
+            removidas = self._ociosas
+            self._ociosas = []
+            self._total -= len(removidas)
+            self._stats['descartadas'] += len(removidas)
+            self._cond.notify_all()
+        self._fechar(removidas)
+
+    def stats(self):
+        """Estatísticas atuais do pool"""
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'nome': self.nome,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'abertas': self._total,
+                'em_uso': len(self._em_uso),
+                'ociosas': len(self._ociosas),
+                'saturacao': round(len(self._em_uso) / self.max_size, 3),
+                'espera_media_ms': round(self._espera_total / checkouts * 1000, 2) if checkouts else 0.0,
+                'espera_max_ms': round(self._espera_max * 1000, 2),
+                **self._stats,
+            }
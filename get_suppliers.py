@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import pyodbc
 import os
 from dotenv import load_dotenv
 
+from supplier_catalog import Catalogo, PriceBook, gravar_snapshot
+
 # Load environment variables
 load_dotenv()
 
@@ -52,42 +53,10 @@ def get_suppliers_data():
         
         print(f"📋 Encontrados {len(rows)} registros")
         
-        # Group by supplier and organize by meal type
-        suppliers_dict = {}
-        for row in rows:
-            fornecedor = row[0] if row[0] else ''
-            cpf_cnpj = row[1] if row[1] else ''
-            valor = float(row[2]) if row[2] else 0.0
-            tipo_forn = row[3] if row[3] else ''
-            
-            if fornecedor not in suppliers_dict:
-                suppliers_dict[fornecedor] = {
-                    'fornecedor': fornecedor,
-                    'cpf_cnpj': cpf_cnpj,
-                    'cafe': 0.0,
-                    'almoco_marmitex': 0.0,
-                    'almoco_local': 0.0,
-                    'janta_marmitex': 0.0,
-                    'janta_local': 0.0,
-                    'gelo': 0.0
-                }
-            
-            # Map meal types to the expected structure
-            tipo_lower = tipo_forn.lower()
-            if 'café' in tipo_lower or 'cafe' in tipo_lower:
-                suppliers_dict[fornecedor]['cafe'] = valor
-            elif 'almoço marmitex' in tipo_lower or 'almoco marmitex' in tipo_lower:
-                suppliers_dict[fornecedor]['almoco_marmitex'] = valor
-            elif 'almoço local' in tipo_lower or 'almoco local' in tipo_lower:
-                suppliers_dict[fornecedor]['almoco_local'] = valor
-            elif 'janta marmitex' in tipo_lower:
-                suppliers_dict[fornecedor]['janta_marmitex'] = valor
-            elif 'janta local' in tipo_lower:
-                suppliers_dict[fornecedor]['janta_local'] = valor
-            elif 'gelo' in tipo_lower:
-                suppliers_dict[fornecedor]['gelo'] = valor
-        
-        suppliers = list(suppliers_dict.values())
+        # Group by supplier and organize by meal type (same mapping as the server)
+        colunas = [coluna[0] for coluna in cursor.description]
+        precos = PriceBook.das_linhas(dict(zip(colunas, row)) for row in rows)
+        suppliers = precos.para_json()
         
         print(f"🏢 Processados {len(suppliers)} fornecedores únicos")
         
@@ -103,10 +72,11 @@ def get_suppliers_data():
             print(f"   Janta Local: R$ {supplier['janta_local']:.2f}")
             print(f"   Gelo: R$ {supplier['gelo']:.2f}")
         
-        # Save to JSON file for testing
-        output_file = "fornecedores_sql.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(suppliers, f, ensure_ascii=False, indent=2)
+        # Semente que o servidor carrega no boot quando ainda não há snapshot de runtime
+        output_file = os.getenv(
+            'CATALOG_SNAPSHOT_SEED', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fornecedores_sql.json')
+        )
+        gravar_snapshot(output_file, Catalogo(precos))
         
         print(f"\n💾 Dados salvos em: {output_file}")
         
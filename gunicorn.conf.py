@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração do Gunicorn (servidor de produção, pre-fork)
+
+    gunicorn -c gunicorn.conf.py
+
+Por padrão os workers rodam o app ASGI (asgi_server:app, worker do
+uvicorn): a espera da foto do QR code é um long-poll que não ocupa thread.
+SERVER_MODE=wsgi volta ao Flask (wsgi:app) com workers gthread, em que
+/api/photo/<id>/wait responde na hora com Retry-After.
+
+Tudo ajustável por variáveis de ambiente:
+    SERVER_MODE                         asgi (padrão) ou wsgi
+    WEB_CONCURRENCY / GUNICORN_WORKERS  processos worker (padrão 2)
+    GUNICORN_THREADS                    threads por worker no modo wsgi (padrão 4)
+    GUNICORN_KEEPALIVE                  segundos de keep-alive (padrão 5)
+    GUNICORN_TIMEOUT                    timeout de requisição em segundos (padrão 60)
+    GUNICORN_GRACEFUL_TIMEOUT           tempo para encerrar workers (padrão 30)
+    GUNICORN_MAX_REQUESTS               recicla o worker após N requisições (0 = nunca)
+
+Cada worker tem seus próprios pools: o total de conexões por banco é
+workers × AZURE_POOL_MAX / PG_POOL_MAX.
+
+Com mais de um worker as fotos do QR code vão para o SQLite compartilhado
+(PHOTO_STORE=sqlite), já que o envio e a espera podem cair em processos
+diferentes.
+"""
+
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'asgi')
+if SERVER_MODE not in ('asgi', 'wsgi'):
+    raise ValueError(f"SERVER_MODE inválido: {SERVER_MODE} (use asgi ou wsgi)")
+
+workers = int(os.getenv('GUNICORN_WORKERS', os.getenv('WEB_CONCURRENCY', 2)))
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'asgi_server:app'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'wsgi:app'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Precisa valer antes de photo_server ser importado (on_starting)
+if workers > 1:
+    os.environ.setdefault('PHOTO_STORE', 'sqlite')
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """Trabalho de inicialização que deve rodar uma vez só (no master)"""
+    import build_assets
+
+    # Antes de importar photo_server, que carrega o index.html/build na importação
+    try:
+        build_assets.construir_se_preciso()
+    except OSError as e:
+        print(f"⚠️ Build dos estáticos falhou, servindo o index.html original: {e}")
+
+    import photo_server
+
+    print("🔧 Verificando migrações do PostgreSQL...")
+    photo_server.migrar_banco_postgresql()
+    # Conexões abertas aqui não podem ser herdadas pelos workers
+    photo_server.fechar_pools()
+
+
+def post_fork(server, worker):
+    """Cada worker abre suas próprias conexões (em segundo plano, sem atrasar o boot)"""
+    if SERVER_MODE == 'asgi':
+        # O app ASGI abre o pool asyncpg e aquece o Azure no before_serving
+        return
+
+    import threading
+
+    import photo_server
+
+    threading.Thread(target=photo_server.aquecer_pools, name='aquecer-pools', daemon=True).start()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cache limitado de respostas por Idempotency-Key para as rotas de gravação"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, make_response, request
+
+
+class IdempotencyCache:
+    """LRU com TTL guardando a resposta de cada chave já processada
+
+    Vale por processo: com vários workers a mesma chave pode rodar em dois
+    deles. Quem garante que o pedido não é gravado duas vezes é o upsert na
+    chave única de refeicoes (cnpj, fornecedor, data_refeicao); este cache só
+    evita refazer o trabalho e devolve a mesma resposta.
+    """
+
+    def __init__(self, max_entries=5000, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._itens = OrderedDict()   # chave -> (expira_em, impressao, status, corpo, mimetype)
+        self._em_andamento = set()    # chaves com um request rodando agora
+        self._lock = threading.Lock()
+        self._stats = {'replays': 0, 'conflitos': 0, 'concorrentes': 0, 'gravadas': 0, 'expulsas': 0}
+
+    def _item(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return item
+
+    def get(self, chave):
+        with self._lock:
+            return self._item(chave)
+
+    def reservar(self, chave):
+        """Resposta já gravada da chave ou reserva da chave para este request
+
+        Devolve (item, em_andamento). Com (None, False) a chave fica reservada
+        e quem chamou deve chamar liberar() ao terminar; com em_andamento
+        True outro request com a mesma chave ainda não respondeu.
+        """
+        with self._lock:
+            item = self._item(chave)
+            if item is not None:
+                return item, False
+            if chave in self._em_andamento:
+                return None, True
+            self._em_andamento.add(chave)
+            return None, False
+
+    def liberar(self, chave):
+        with self._lock:
+            self._em_andamento.discard(chave)
+
+    def put(self, chave, impressao, status, corpo, mimetype):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, impressao, status, corpo, mimetype)
+            self._itens.move_to_end(chave)
+            self._stats['gravadas'] += 1
+            while len(self._itens) > self.max_entries:
+                self._itens.popitem(last=False)
+                self._stats['expulsas'] += 1
+
+    def contar(self, evento):
+        with self._lock:
+            self._stats[evento] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'entradas': len(self._itens),
+                'em_andamento': len(self._em_andamento),
+                **self._stats,
+            }
+
+
+def idempotente(cache):
+    """Decorator: repete a resposta gravada quando a mesma Idempotency-Key volta
+
+    A chave vale por rota; reutilizar a chave com outro corpo devolve 422 e
+    repeti-la enquanto a primeira ainda roda devolve 409 (Retry-After).
+    Só respostas 2xx são guardadas, então erros podem ser tentados de novo.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            chave = request.headers.get('Idempotency-Key', '').strip()
+            if not chave:
+                return view(*args, **kwargs)
+
+            chave = f"{request.path}:{chave}"
+            impressao = hashlib.sha256(request.get_data()).hexdigest()
+            item, em_andamento = cache.reservar(chave)
+            if em_andamento:
+                cache.contar('concorrentes')
+                return jsonify({
+                    'success': False,
+                    'error': 'Requisição com esta Idempotency-Key ainda em andamento'
+                }), 409, {'Retry-After': '1'}
+            if item is not None:
+                if item[1] != impressao:
+                    cache.contar('conflitos')
+                    return jsonify({
+                        'success': False,
+                        'error': 'Idempotency-Key já usada com outro conteúdo'
+                    }), 422
+                cache.contar('replays')
+                print(f"♻️ Repetindo resposta para Idempotency-Key {chave}")
+                response = make_response(item[3], item[2])
+                response.mimetype = item[4]
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+                if 200 <= response.status_code < 300:
+                    cache.put(chave, impressao, response.status_code, response.get_data(), response.mimetype)
+            finally:
+                cache.liberar(chave)
+            return response
+        return wrapper
+    return decorator
+
+
+def idempotente_async(cache):
+    """Mesmo comportamento de idempotente() para views async do Quart (asgi_server)"""
+    from quart import jsonify as quart_jsonify, make_response as quart_make_response, request as quart_request
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            chave = quart_request.headers.get('Idempotency-Key', '').strip()
+            if not chave:
+                return await view(*args, **kwargs)
+
+            chave = f"{quart_request.path}:{chave}"
+            impressao = hashlib.sha256(await quart_request.get_data()).hexdigest()
+            item, em_andamento = cache.reservar(chave)
+            if em_andamento:
+                cache.contar('concorrentes')
+                return quart_jsonify({
+                    'success': False,
+                    'error': 'Requisição com esta Idempotency-Key ainda em andamento'
+                }), 409, {'Retry-After': '1'}
+            if item is not None:
+                if item[1] != impressao:
+                    cache.contar('conflitos')
+                    return quart_jsonify({
+                        'success': False,
+                        'error': 'Idempotency-Key já usada com outro conteúdo'
+                    }), 422
+                cache.contar('replays')
+                print(f"♻️ Repetindo resposta para Idempotency-Key {chave}")
+                response = await quart_make_response(item[3], item[2])
+                response.mimetype = item[4]
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = await quart_make_response(await view(*args, **kwargs))
+                if 200 <= response.status_code < 300:
+                    cache.put(chave, impressao, response.status_code, await response.get_data(), response.mimetype)
+            finally:
+                cache.liberar(chave)
+            return response
+        return wrapper
+    return decorator
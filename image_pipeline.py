@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Normalização das fotos de assinatura (orientação, sem EXIF, tamanho fixo) e miniatura"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele as fotos seguem como chegaram
+    Image = None
+
+# Resultado do processamento: hash da foto original e os dois JPEGs gerados
+Variantes = namedtuple('Variantes', ['sha', 'assinatura', 'miniatura'])
+
+# Acima disso a imagem é recusada antes de decodificar (proteção contra "bombas")
+MAX_PIXELS = 40_000_000
+
+
+class ImagePipeline:
+    """Decodifica uma vez e gera a foto da assinatura e a miniatura em um pool de threads
+
+    Os resultados ficam em um LRU indexado pelo sha256 dos bytes recebidos,
+    então reenvios da mesma foto não são processados de novo.
+    """
+
+    def __init__(self, lado=400, lado_miniatura=96, qualidade=82, workers=2, max_cache=128):
+        self.lado = lado
+        self.lado_miniatura = lado_miniatura
+        self.qualidade = qualidade
+        self.max_cache = max_cache
+        self.disponivel = Image is not None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='imagens')
+        self._cache = OrderedDict()   # sha -> Variantes
+        self._lock = threading.Lock()
+        self._stats = {'processadas': 0, 'cache_hits': 0, 'falhas': 0}
+
+    def _jpeg(self, imagem, lado):
+        copia = imagem.copy()
+        copia.thumbnail((lado, lado), Image.LANCZOS)
+        saida = io.BytesIO()
+        # Sem exif=...: o JPEG gerado não carrega metadados do aparelho
+        copia.save(saida, 'JPEG', quality=self.qualidade, optimize=True, progressive=True)
+        return saida.getvalue()
+
+    def _processar(self, dados, sha):
+        with Image.open(io.BytesIO(dados)) as imagem:
+            largura, altura = imagem.size
+            if largura * altura > MAX_PIXELS:
+                raise ValueError(f"Imagem grande demais: {largura}x{altura}")
+            # JPEG: decodifica já reduzido (escala 1/2, 1/4, 1/8) quando possível
+            imagem.draft('RGB', (self.lado, self.lado))
+            imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+            return Variantes(sha, self._jpeg(imagem, self.lado), self._jpeg(imagem, self.lado_miniatura))
+
+    def processar(self, dados):
+        """Processa na thread atual (com cache); levanta ValueError/OSError se não for imagem"""
+        sha = hashlib.sha256(dados).hexdigest()
+        with self._lock:
+            variantes = self._cache.get(sha)
+            if variantes is not None:
+                self._cache.move_to_end(sha)
+                self._stats['cache_hits'] += 1
+                return variantes
+
+        try:
+            variantes = self._processar(dados, sha)
+        except Exception:
+            with self._lock:
+                self._stats['falhas'] += 1
+            raise
+
+        with self._lock:
+            self._cache[sha] = variantes
+            self._stats['processadas'] += 1
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return variantes
+
+    def submit(self, dados):
+        """Agenda processar(dados) no pool; devolve um Future com as Variantes"""
+        return self._executor.submit(self.processar, dados)
+
+    def stats(self):
+        """Estatísticas do pipeline"""
+        with self._lock:
+            return {
+                'disponivel': self.disponivel,
+                'lado': self.lado,
+                'lado_miniatura': self.lado_miniatura,
+                'cache': len(self._cache),
+                **self._stats,
+            }
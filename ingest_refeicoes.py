@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga em massa de refeições (fechamento de período / reimportação)
+
+Uso:
+    python ingest_refeicoes.py pedidos.csv [--limite-copy 500]
+
+O CSV precisa das colunas data_refeicao (AAAA-MM-DD), cnpj, fornecedor e das
+quantidades (cafe, almoco_marmitex, ...). Se vier com as colunas valor_*
+esses preços são usados; senão os preços são buscados no Azure em uma
+única consulta para todos os fornecedores do arquivo.
+"""
+
+import argparse
+import csv
+import sys
+
+from order_store import gravar_refeicoes, montar_linha_refeicao, validar_data_periodo
+from supplier_catalog import CAMPOS_REFEICAO
+
+
+def ler_csv(caminho):
+    """Lê o arquivo detectando ; ou , como separador"""
+    with open(caminho, newline='', encoding='utf-8-sig') as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,')
+        return list(csv.DictReader(f, dialect=dialeto))
+
+
+def traz_precos(registros):
+    """True se o arquivo já vier com as colunas valor_*"""
+    return bool(registros) and all(f'valor_{campo}' in registros[0] for campo in CAMPOS_REFEICAO)
+
+
+def montar_linhas(registros, precos):
+    """Converte os registros do CSV em linhas de refeicoes; devolve (linhas, erros)"""
+    linhas = []
+    erros = []
+    tem_precos = traz_precos(registros)
+    for numero, registro in enumerate(registros, start=2):
+        fornecedor = (registro.get('fornecedor') or '').strip()
+        try:
+            data_refeicao = validar_data_periodo(registro.get('data_refeicao', ''))
+            if tem_precos:
+                valores = {campo: registro.get(f'valor_{campo}') for campo in CAMPOS_REFEICAO}
+            else:
+                valores = precos.get(fornecedor, {})
+            linhas.append(montar_linha_refeicao(
+                data_refeicao, (registro.get('cnpj') or '').strip(), fornecedor, registro, valores
+            ))
+        except (TypeError, ValueError) as e:
+            erros.append(f"linha {numero}: {e}")
+    return linhas, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga em massa em FORNECEDORES.refeicoes')
+    parser.add_argument('arquivo', help='CSV com as refeições')
+    parser.add_argument('--limite-copy', type=int, default=None,
+                        help='linhas acima das quais usa COPY (padrão: COPY_THRESHOLD)')
+    args = parser.parse_args()
+
+    # Importado aqui para reaproveitar configuração e pools do servidor
+    import photo_server
+
+    registros = ler_csv(args.arquivo)
+    print(f"📄 {len(registros)} registros lidos de {args.arquivo}")
+    if not registros:
+        return 0
+
+    precos = {}
+    if not traz_precos(registros):
+        nomes = {(r.get('fornecedor') or '').strip() for r in registros}
+        try:
+            precos, do_cache = photo_server.buscar_valores_fornecedores(nomes)
+        except photo_server.PrecosIndisponiveis as e:
+            print(f"❌ {e}")
+            return 1
+        origem = ' (catálogo em cache, Azure fora)' if do_cache else ''
+        print(f"💲 Preços resolvidos para {len(precos)} de {len(nomes)} fornecedores{origem}")
+
+    linhas, erros = montar_linhas(registros, precos)
+    if erros:
+        print(f"❌ {len(erros)} registros inválidos, nada foi gravado:")
+        for erro in erros[:20]:
+            print(f"   {erro}")
+        return 1
+
+    limite = photo_server.COPY_THRESHOLD if args.limite_copy is None else args.limite_copy
+    with photo_server.pg_pool.connection() as connection:
+        if not connection:
+            print("❌ Erro: Não foi possível conectar ao PostgreSQL")
+            return 1
+        cursor = connection.cursor()
+        resultado = gravar_refeicoes(cursor, linhas, limite)
+        connection.commit()
+        cursor.close()
+
+    print(f"✅ Carga concluída: {resultado['linhas']} linhas via {resultado['metodo']} "
+          f"({resultado['linhas_por_segundo']} linhas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrações versionadas do PostgreSQL (schema FORNECEDORES)
+
+Cada migração tem um número, um nome e o SQL. As já aplicadas ficam em
+FORNECEDORES.schema_version; um advisory lock garante que só uma instância
+migra por vez quando várias sobem juntas.
+
+Uso:
+    python migrations.py            # aplica as pendentes
+    python migrations.py --status   # mostra versão atual e pendentes
+"""
+
+import sys
+
+# Chave arbitrária (fixa) do pg_advisory_lock das migrações
+LOCK_MIGRACOES = 727384001
+
+MIGRATIONS = [
+    (1, 'cria tabela refeicoes', """
+        CREATE TABLE IF NOT EXISTS FORNECEDORES.refeicoes (
+            id SERIAL PRIMARY KEY,
+            data_refeicao DATE,
+            cnpj CHAR(14),
+            fornecedor TEXT,
+            cafe NUMERIC(10,2) DEFAULT 0,
+            almoco_marmitex NUMERIC(10,2) DEFAULT 0,
+            almoco_local NUMERIC(10,2) DEFAULT 0,
+            janta_marmitex NUMERIC(10,2) DEFAULT 0,
+            janta_local NUMERIC(10,2) DEFAULT 0,
+            gelo NUMERIC(10,2) DEFAULT 0,
+            valor_cafe NUMERIC(12,2) DEFAULT 0,
+            valor_almoco_marmitex NUMERIC(12,2) DEFAULT 0,
+            valor_almoco_local NUMERIC(12,2) DEFAULT 0,
+            valor_janta_marmitex NUMERIC(12,2) DEFAULT 0,
+            valor_janta_local NUMERIC(12,2) DEFAULT 0,
+            valor_gelo NUMERIC(12,2) DEFAULT 0,
+            total_cafe NUMERIC(14,2) DEFAULT 0,
+            total_almoco_marmitex NUMERIC(14,2) DEFAULT 0,
+            total_almoco_local NUMERIC(14,2) DEFAULT 0,
+            total_janta_marmitex NUMERIC(14,2) DEFAULT 0,
+            total_janta_local NUMERIC(14,2) DEFAULT 0,
+            total_gelo NUMERIC(14,2) DEFAULT 0,
+            data_criacao TIMESTAMP DEFAULT NOW()
+        );
+    """),
+    (2, 'chave unica por cnpj/fornecedor/dia', """
+        -- Remove duplicatas antigas antes de criar a restrição
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'uq_refeicoes_cnpj_fornecedor_data'
+            ) THEN
+                DELETE FROM FORNECEDORES.refeicoes r
+                USING FORNECEDORES.refeicoes d
+                WHERE r.cnpj = d.cnpj
+                  AND r.fornecedor = d.fornecedor
+                  AND r.data_refeicao = d.data_refeicao
+                  AND r.id < d.id;
+                ALTER TABLE FORNECEDORES.refeicoes
+                    ADD CONSTRAINT uq_refeicoes_cnpj_fornecedor_data
+                    UNIQUE (cnpj, fornecedor, data_refeicao);
+            END IF;
+        END $$;
+    """),
+    (3, 'indices de acesso por cnpj, fornecedor e data', """
+        -- Consultas por CNPJ e período
+        CREATE INDEX IF NOT EXISTS idx_refeicoes_cnpj_data
+            ON FORNECEDORES.refeicoes (cnpj, data_refeicao);
+        -- Consultas por nome do fornecedor e período
+        CREATE INDEX IF NOT EXISTS idx_refeicoes_fornecedor_data
+            ON FORNECEDORES.refeicoes (fornecedor, data_refeicao);
+        -- data_criacao só cresce: BRIN é minúsculo e atende filtros por intervalo
+        CREATE INDEX IF NOT EXISTS brin_refeicoes_data_criacao
+            ON FORNECEDORES.refeicoes USING BRIN (data_criacao);
+    """),
+    (4, 'indice por data para os relatorios', """
+        -- Relatórios filtram só pelo período (sem cnpj/fornecedor na frente)
+        CREATE INDEX IF NOT EXISTS idx_refeicoes_data
+            ON FORNECEDORES.refeicoes (data_refeicao);
+    """),
+    (5, 'resumo por fornecedor e quinzena mantido por trigger', """
+        CREATE TABLE IF NOT EXISTS FORNECEDORES.resumo_quinzena (
+            cnpj CHAR(14) NOT NULL,
+            fornecedor TEXT NOT NULL,
+            -- Primeiro dia da quinzena (dia 1 ou 16)
+            periodo DATE NOT NULL,
+            dias INTEGER NOT NULL DEFAULT 0,
+            cafe NUMERIC(16,2) NOT NULL DEFAULT 0,
+            almoco_marmitex NUMERIC(16,2) NOT NULL DEFAULT 0,
+            almoco_local NUMERIC(16,2) NOT NULL DEFAULT 0,
+            janta_marmitex NUMERIC(16,2) NOT NULL DEFAULT 0,
+            janta_local NUMERIC(16,2) NOT NULL DEFAULT 0,
+            gelo NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_cafe NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_almoco_marmitex NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_almoco_local NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_janta_marmitex NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_janta_local NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total_gelo NUMERIC(16,2) NOT NULL DEFAULT 0,
+            total NUMERIC(16,2) NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (cnpj, fornecedor, periodo)
+        );
+        -- Relatórios por período sem cnpj
+        CREATE INDEX IF NOT EXISTS idx_resumo_quinzena_periodo
+            ON FORNECEDORES.resumo_quinzena (periodo);
+
+        CREATE OR REPLACE FUNCTION FORNECEDORES.inicio_quinzena(d DATE) RETURNS DATE
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE WHEN EXTRACT(DAY FROM d) <= 15 THEN date_trunc('month', d)::date
+                        ELSE date_trunc('month', d)::date + 15 END
+        $$;
+
+        -- Recalcula uma linha do resumo a partir das (no máximo 16) linhas da quinzena.
+        -- O advisory lock serializa quem mexe na mesma chave: quem chega depois
+        -- recalcula já enxergando o que o outro gravou.
+        CREATE OR REPLACE FUNCTION FORNECEDORES.recalcular_resumo_quinzena(p_cnpj CHAR(14), p_fornecedor TEXT, p_data DATE)
+        RETURNS void LANGUAGE plpgsql AS $$
+        DECLARE
+            v_inicio DATE := FORNECEDORES.inicio_quinzena(p_data);
+            v_fim DATE := CASE WHEN EXTRACT(DAY FROM p_data) <= 15 THEN v_inicio + 14
+                               ELSE (date_trunc('month', p_data) + INTERVAL '1 month - 1 day')::date END;
+        BEGIN
+            PERFORM pg_advisory_xact_lock(727384002, hashtext(p_cnpj || '|' || p_fornecedor || '|' || v_inicio));
+            DELETE FROM FORNECEDORES.resumo_quinzena
+            WHERE cnpj = p_cnpj AND fornecedor = p_fornecedor AND periodo = v_inicio;
+            INSERT INTO FORNECEDORES.resumo_quinzena (cnpj, fornecedor, periodo, dias, cafe, almoco_marmitex, almoco_local, janta_marmitex, janta_local, gelo, total_cafe, total_almoco_marmitex, total_almoco_local, total_janta_marmitex, total_janta_local, total_gelo, total)
+            SELECT p_cnpj, p_fornecedor, v_inicio, COUNT(*),
+               COALESCE(SUM(cafe), 0),
+               COALESCE(SUM(almoco_marmitex), 0),
+               COALESCE(SUM(almoco_local), 0),
+               COALESCE(SUM(janta_marmitex), 0),
+               COALESCE(SUM(janta_local), 0),
+               COALESCE(SUM(gelo), 0),
+               COALESCE(SUM(total_cafe), 0),
+               COALESCE(SUM(total_almoco_marmitex), 0),
+               COALESCE(SUM(total_almoco_local), 0),
+               COALESCE(SUM(total_janta_marmitex), 0),
+               COALESCE(SUM(total_janta_local), 0),
+               COALESCE(SUM(total_gelo), 0),
+               COALESCE(SUM(COALESCE(total_cafe, 0) + COALESCE(total_almoco_marmitex, 0) + COALESCE(total_almoco_local, 0) + COALESCE(total_janta_marmitex, 0) + COALESCE(total_janta_local, 0) + COALESCE(total_gelo, 0)), 0)
+            FROM FORNECEDORES.refeicoes
+            WHERE cnpj = p_cnpj AND fornecedor = p_fornecedor AND data_refeicao BETWEEN v_inicio AND v_fim
+            HAVING COUNT(*) > 0;
+        END
+        $$;
+
+        CREATE OR REPLACE FUNCTION FORNECEDORES.trg_resumo_quinzena() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.cnpj IS NOT NULL AND OLD.fornecedor IS NOT NULL
+               AND OLD.data_refeicao IS NOT NULL THEN
+                PERFORM FORNECEDORES.recalcular_resumo_quinzena(OLD.cnpj, OLD.fornecedor, OLD.data_refeicao);
+            END IF;
+            -- Num UPDATE que não muda a chave, o recálculo acima já contou a linha nova
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.cnpj IS NOT NULL AND NEW.fornecedor IS NOT NULL
+               AND NEW.data_refeicao IS NOT NULL
+               AND (TG_OP = 'INSERT'
+                    OR (NEW.cnpj, NEW.fornecedor, FORNECEDORES.inicio_quinzena(NEW.data_refeicao))
+                       IS DISTINCT FROM (OLD.cnpj, OLD.fornecedor, FORNECEDORES.inicio_quinzena(OLD.data_refeicao))) THEN
+                PERFORM FORNECEDORES.recalcular_resumo_quinzena(NEW.cnpj, NEW.fornecedor, NEW.data_refeicao);
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS trg_resumo_quinzena ON FORNECEDORES.refeicoes;
+        CREATE TRIGGER trg_resumo_quinzena
+            AFTER INSERT OR UPDATE OR DELETE ON FORNECEDORES.refeicoes
+            FOR EACH ROW EXECUTE FUNCTION FORNECEDORES.trg_resumo_quinzena();
+
+        -- Carga inicial a partir do que já está gravado
+        DELETE FROM FORNECEDORES.resumo_quinzena;
+        INSERT INTO FORNECEDORES.resumo_quinzena (cnpj, fornecedor, periodo, dias, cafe, almoco_marmitex, almoco_local, janta_marmitex, janta_local, gelo, total_cafe, total_almoco_marmitex, total_almoco_local, total_janta_marmitex, total_janta_local, total_gelo, total)
+        SELECT cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao), COUNT(*),
+               COALESCE(SUM(cafe), 0),
+               COALESCE(SUM(almoco_marmitex), 0),
+               COALESCE(SUM(almoco_local), 0),
+               COALESCE(SUM(janta_marmitex), 0),
+               COALESCE(SUM(janta_local), 0),
+               COALESCE(SUM(gelo), 0),
+               COALESCE(SUM(total_cafe), 0),
+               COALESCE(SUM(total_almoco_marmitex), 0),
+               COALESCE(SUM(total_almoco_local), 0),
+               COALESCE(SUM(total_janta_marmitex), 0),
+               COALESCE(SUM(total_janta_local), 0),
+               COALESCE(SUM(total_gelo), 0),
+               COALESCE(SUM(COALESCE(total_cafe, 0) + COALESCE(total_almoco_marmitex, 0) + COALESCE(total_almoco_local, 0) + COALESCE(total_janta_marmitex, 0) + COALESCE(total_janta_local, 0) + COALESCE(total_gelo, 0)), 0)
+        FROM FORNECEDORES.refeicoes
+        WHERE cnpj IS NOT NULL AND fornecedor IS NOT NULL AND data_refeicao IS NOT NULL
+        GROUP BY cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao);
+    """),
+    (6, 'indice do historico por cnpj, data e id', """
+        -- Paginação por chave (data_refeicao, id) dentro de um CNPJ; cobre também
+        -- as consultas que usavam idx_refeicoes_cnpj_data
+        CREATE INDEX IF NOT EXISTS idx_refeicoes_cnpj_data_id
+            ON FORNECEDORES.refeicoes (cnpj, data_refeicao, id);
+        DROP INDEX IF EXISTS FORNECEDORES.idx_refeicoes_cnpj_data;
+    """),
+    (7, 'resumo da quinzena recalculado uma vez por comando', """
+        -- date_trunc sobre DATE passa por timestamptz (depende do TimeZone da
+        -- sessão) e não poderia estar numa função IMMUTABLE: só aritmética de datas
+        CREATE OR REPLACE FUNCTION FORNECEDORES.inicio_quinzena(d DATE) RETURNS DATE
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT d - (EXTRACT(DAY FROM d)::integer - CASE WHEN EXTRACT(DAY FROM d) <= 15 THEN 1 ELSE 16 END)
+        $$;
+
+        CREATE OR REPLACE FUNCTION FORNECEDORES.recalcular_resumo_quinzena(p_cnpj CHAR(14), p_fornecedor TEXT, p_data DATE)
+        RETURNS void LANGUAGE plpgsql AS $$
+        DECLARE
+            v_inicio DATE := FORNECEDORES.inicio_quinzena(p_data);
+            v_fim DATE := CASE WHEN EXTRACT(DAY FROM p_data) <= 15 THEN v_inicio + 14
+                               ELSE (date_trunc('month', p_data::timestamp) + INTERVAL '1 month - 1 day')::date END;
+        BEGIN
+            PERFORM pg_advisory_xact_lock(727384002, hashtext(p_cnpj || '|' || p_fornecedor || '|' || v_inicio));
+            DELETE FROM FORNECEDORES.resumo_quinzena
+            WHERE cnpj = p_cnpj AND fornecedor = p_fornecedor AND periodo = v_inicio;
+            INSERT INTO FORNECEDORES.resumo_quinzena (cnpj, fornecedor, periodo, dias, cafe, almoco_marmitex, almoco_local, janta_marmitex, janta_local, gelo, total_cafe, total_almoco_marmitex, total_almoco_local, total_janta_marmitex, total_janta_local, total_gelo, total)
+            SELECT p_cnpj, p_fornecedor, v_inicio, COUNT(*),
+               COALESCE(SUM(cafe), 0),
+               COALESCE(SUM(almoco_marmitex), 0),
+               COALESCE(SUM(almoco_local), 0),
+               COALESCE(SUM(janta_marmitex), 0),
+               COALESCE(SUM(janta_local), 0),
+               COALESCE(SUM(gelo), 0),
+               COALESCE(SUM(total_cafe), 0),
+               COALESCE(SUM(total_almoco_marmitex), 0),
+               COALESCE(SUM(total_almoco_local), 0),
+               COALESCE(SUM(total_janta_marmitex), 0),
+               COALESCE(SUM(total_janta_local), 0),
+               COALESCE(SUM(total_gelo), 0),
+               COALESCE(SUM(COALESCE(total_cafe, 0) + COALESCE(total_almoco_marmitex, 0) + COALESCE(total_almoco_local, 0) + COALESCE(total_janta_marmitex, 0) + COALESCE(total_janta_local, 0) + COALESCE(total_gelo, 0)), 0)
+            FROM FORNECEDORES.refeicoes
+            WHERE cnpj = p_cnpj AND fornecedor = p_fornecedor AND data_refeicao BETWEEN v_inicio AND v_fim
+            HAVING COUNT(*) > 0;
+        END
+        $$;
+
+        -- Um pedido de quinzena grava até 16 linhas num só comando: o trigger por
+        -- comando lê as linhas afetadas nas tabelas de transição e recalcula cada
+        -- (cnpj, fornecedor, quinzena) uma vez. As chaves vão em ordem para que
+        -- comandos concorrentes peguem os advisory locks na mesma sequência.
+        CREATE OR REPLACE FUNCTION FORNECEDORES.trg_resumo_quinzena_comando() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_chave RECORD;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                FOR v_chave IN
+                    SELECT DISTINCT cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao) AS periodo
+                    FROM novas
+                    WHERE cnpj IS NOT NULL AND fornecedor IS NOT NULL AND data_refeicao IS NOT NULL
+                    ORDER BY 1, 2, 3
+                LOOP
+                    PERFORM FORNECEDORES.recalcular_resumo_quinzena(v_chave.cnpj, v_chave.fornecedor, v_chave.periodo);
+                END LOOP;
+            ELSIF TG_OP = 'UPDATE' THEN
+                -- Chaves de antes e de depois: uma linha que mudou de quinzena sai de uma e entra na outra
+                FOR v_chave IN
+                    SELECT DISTINCT cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao) AS periodo
+                    FROM (
+                        SELECT cnpj, fornecedor, data_refeicao FROM antigas
+                        UNION ALL
+                        SELECT cnpj, fornecedor, data_refeicao FROM novas
+                    ) linhas
+                    WHERE cnpj IS NOT NULL AND fornecedor IS NOT NULL AND data_refeicao IS NOT NULL
+                    ORDER BY 1, 2, 3
+                LOOP
+                    PERFORM FORNECEDORES.recalcular_resumo_quinzena(v_chave.cnpj, v_chave.fornecedor, v_chave.periodo);
+                END LOOP;
+            ELSE
+                FOR v_chave IN
+                    SELECT DISTINCT cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao) AS periodo
+                    FROM antigas
+                    WHERE cnpj IS NOT NULL AND fornecedor IS NOT NULL AND data_refeicao IS NOT NULL
+                    ORDER BY 1, 2, 3
+                LOOP
+                    PERFORM FORNECEDORES.recalcular_resumo_quinzena(v_chave.cnpj, v_chave.fornecedor, v_chave.periodo);
+                END LOOP;
+            END IF;
+            RETURN NULL;
+        END
+        $$;
+
+        -- Tabelas de transição não podem ser usadas em trigger de mais de um
+        -- evento: um trigger por evento, todos com a mesma função
+        DROP TRIGGER IF EXISTS trg_resumo_quinzena ON FORNECEDORES.refeicoes;
+        DROP FUNCTION IF EXISTS FORNECEDORES.trg_resumo_quinzena();
+        DROP TRIGGER IF EXISTS trg_resumo_quinzena_insert ON FORNECEDORES.refeicoes;
+        CREATE TRIGGER trg_resumo_quinzena_insert
+            AFTER INSERT ON FORNECEDORES.refeicoes
+            REFERENCING NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION FORNECEDORES.trg_resumo_quinzena_comando();
+        DROP TRIGGER IF EXISTS trg_resumo_quinzena_update ON FORNECEDORES.refeicoes;
+        CREATE TRIGGER trg_resumo_quinzena_update
+            AFTER UPDATE ON FORNECEDORES.refeicoes
+            REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION FORNECEDORES.trg_resumo_quinzena_comando();
+        DROP TRIGGER IF EXISTS trg_resumo_quinzena_delete ON FORNECEDORES.refeicoes;
+        CREATE TRIGGER trg_resumo_quinzena_delete
+            AFTER DELETE ON FORNECEDORES.refeicoes
+            REFERENCING OLD TABLE AS antigas
+            FOR EACH STATEMENT EXECUTE FUNCTION FORNECEDORES.trg_resumo_quinzena_comando();
+    """),
+    (8, 'indice por data e id para a exportacao', """
+        -- /api/export sem cnpj lê a tabela inteira em ORDER BY data_refeicao, id:
+        -- com este índice o cursor anda na ordem dele em vez de ordenar tudo.
+        -- Também atende os relatórios por período, no lugar de idx_refeicoes_data
+        CREATE INDEX IF NOT EXISTS idx_refeicoes_data_id
+            ON FORNECEDORES.refeicoes (data_refeicao, id);
+        DROP INDEX IF EXISTS FORNECEDORES.idx_refeicoes_data;
+    """),
+]
+
+
+def _preparar(cursor):
+    cursor.execute("""
+        CREATE SCHEMA IF NOT EXISTS FORNECEDORES;
+        CREATE TABLE IF NOT EXISTS FORNECEDORES.schema_version (
+            versao INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            aplicada_em TIMESTAMP DEFAULT NOW()
+        );
+    """)
+
+
+def versao_atual(cursor):
+    """Maior versão já aplicada (0 se nenhuma)"""
+    cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM FORNECEDORES.schema_version")
+    return cursor.fetchone()[0]
+
+
+def aplicar_migracoes(connection):
+    """Aplica as migrações pendentes, cada uma em sua própria transação
+
+    Devolve a lista de versões aplicadas nesta execução.
+    """
+    cursor = connection.cursor()
+    aplicadas = []
+    # Lock de sessão: outras instâncias esperam aqui até terminarmos
+    cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_MIGRACOES,))
+    try:
+        _preparar(cursor)
+        connection.commit()
+
+        atual = versao_atual(cursor)
+        for versao, nome, sql in MIGRATIONS:
+            if versao <= atual:
+                continue
+            print(f"🔧 Aplicando migração {versao}: {nome}")
+            try:
+                cursor.execute(sql)
+                cursor.execute(
+                    "INSERT INTO FORNECEDORES.schema_version (versao, nome) VALUES (%s, %s)",
+                    (versao, nome)
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            aplicadas.append(versao)
+    finally:
+        connection.rollback()
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_MIGRACOES,))
+        connection.commit()
+        cursor.close()
+
+    if aplicadas:
+        print(f"✅ Migrações aplicadas: {aplicadas}")
+    else:
+        print("✅ Schema PostgreSQL já está na versão mais recente")
+    return aplicadas
+
+
+def status(connection):
+    """Versão atual e migrações pendentes"""
+    cursor = connection.cursor()
+    _preparar(cursor)
+    connection.commit()
+    atual = versao_atual(cursor)
+    cursor.close()
+    return atual, [(versao, nome) for versao, nome, _ in MIGRATIONS if versao > atual]
+
+
+if __name__ == "__main__":
+    # Reaproveita a configuração de conexão do servidor
+    from photo_server import conectar_postgresql
+
+    connection = conectar_postgresql()
+    if not connection:
+        sys.exit(1)
+    try:
+        if '--status' in sys.argv:
+            atual, pendentes = status(connection)
+            print(f"📊 Versão atual: {atual}")
+            for versao, nome in pendentes:
+                print(f"   pendente {versao}: {nome}")
+        else:
+            aplicar_migracoes(connection)
+    finally:
+        connection.close()
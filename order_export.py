@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Exportação de FORNECEDORES.refeicoes em CSV/XLSX lendo por cursor nomeado (memória constante)"""
+
+import csv
+import io
+import tempfile
+import uuid
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl é opcional: sem ele só há CSV
+    Workbook = None
+
+from order_store import COLUNAS_REFEICOES
+
+# Mesmas colunas do CSV aceito por ingest_refeicoes.py, mais id e data_criacao
+COLUNAS_EXPORTACAO = ('id',) + COLUNAS_REFEICOES + ('data_criacao',)
+
+
+def montar_consulta_exportacao(filtros):
+    """SELECT (psycopg2) das linhas filtradas, na ordem do índice (data_refeicao, id)
+
+    Sem cnpj o cursor percorre idx_refeicoes_data_id (migração 8); com cnpj,
+    idx_refeicoes_cnpj_data_id (migração 6). Nenhum dos dois casos ordena a tabela.
+    """
+    condicoes = []
+    parametros = []
+    if filtros['data_inicio']:
+        condicoes.append('data_refeicao >= %s')
+        parametros.append(filtros['data_inicio'])
+    if filtros['data_fim']:
+        condicoes.append('data_refeicao <= %s')
+        parametros.append(filtros['data_fim'])
+    if filtros['cnpj']:
+        condicoes.append('cnpj = %s')
+        parametros.append(filtros['cnpj'])
+    if filtros['quinzena'] == 1:
+        condicoes.append('EXTRACT(DAY FROM data_refeicao) <= 15')
+    elif filtros['quinzena'] == 2:
+        condicoes.append('EXTRACT(DAY FROM data_refeicao) > 15')
+
+    sql = f"""
+        SELECT {', '.join(COLUNAS_EXPORTACAO)}
+        FROM FORNECEDORES.refeicoes
+        {'WHERE ' + ' AND '.join(condicoes) if condicoes else ''}
+        ORDER BY data_refeicao, id
+    """
+    return sql, parametros
+
+
+def ler_em_lotes(connection, sql, parametros, tamanho_lote):
+    """Gera listas de até `tamanho_lote` linhas lidas por um cursor do lado do servidor
+
+    O cursor nomeado (DECLARE ... CURSOR) mantém o resultado no PostgreSQL;
+    só um lote por vez fica na memória do worker.
+    """
+    cursor = connection.cursor(name=f'exportacao_{uuid.uuid4().hex}')
+    cursor.itersize = tamanho_lote
+    try:
+        cursor.execute(sql, parametros)
+        while True:
+            lote = cursor.fetchmany(tamanho_lote)
+            if not lote:
+                break
+            yield lote
+    finally:
+        cursor.close()
+        # Só leitura: encerra a transação aberta pelo cursor
+        connection.rollback()
+
+
+async def ler_em_lotes_async(connection, sql, parametros, tamanho_lote):
+    """Versão asyncpg de ler_em_lotes (`sql` já com $1, $2...; cursor dentro de uma transação só leitura)"""
+    async with connection.transaction(readonly=True):
+        cursor = await connection.cursor(sql, *parametros)
+        while True:
+            lote = await cursor.fetch(tamanho_lote)
+            if not lote:
+                break
+            yield [tuple(linha) for linha in lote]
+
+
+def _celula(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor).strip()
+
+
+class _CsvEmPedacos:
+    """Escreve lotes de linhas e devolve cada pedaço já codificado"""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.escritor = csv.writer(self.buffer, delimiter=';')
+        # BOM para o Excel reconhecer UTF-8
+        self.buffer.write('\ufeff')
+        self.escritor.writerow(COLUNAS_EXPORTACAO)
+
+    def pedaco(self, lote=()):
+        self.escritor.writerows([_celula(valor) for valor in linha] for linha in lote)
+        dados = self.buffer.getvalue().encode('utf-8')
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return dados
+
+
+def gerar_csv(lotes):
+    """Gera o CSV em pedaços (um por lote), com BOM para o Excel reconhecer UTF-8"""
+    saida = _CsvEmPedacos()
+    for lote in lotes:
+        yield saida.pedaco(lote)
+    restante = saida.pedaco()
+    if restante:
+        yield restante
+
+
+async def gerar_csv_async(lotes):
+    """gerar_csv para lotes vindos de um gerador assíncrono (ler_em_lotes_async)"""
+    saida = _CsvEmPedacos()
+    async for lote in lotes:
+        yield saida.pedaco(lote)
+    restante = saida.pedaco()
+    if restante:
+        yield restante
+
+
+class PlanilhaXlsx:
+    """Planilha openpyxl write-only preenchida lote a lote
+
+    O XLSX é um zip e só fica completo no final; o modo write-only descarrega
+    as linhas no disco em vez de montar a planilha na memória.
+    """
+
+    def __init__(self):
+        if Workbook is None:
+            raise RuntimeError('Exportação XLSX requer openpyxl')
+        self.planilha = Workbook(write_only=True)
+        self.aba = self.planilha.create_sheet('refeicoes')
+        self.aba.append(COLUNAS_EXPORTACAO)
+
+    def adicionar(self, lote):
+        for linha in lote:
+            # Decimal, date e datetime viram números/datas nativos da planilha
+            self.aba.append(linha)
+
+    def finalizar(self):
+        """Grava em um arquivo temporário e o devolve posicionado no início"""
+        arquivo = tempfile.TemporaryFile()
+        self.planilha.save(arquivo)
+        arquivo.seek(0)
+        return arquivo
+
+
+def gravar_xlsx(lotes):
+    """Grava a planilha em um arquivo temporário e o devolve posicionado no início"""
+    planilha = PlanilhaXlsx()
+    for lote in lotes:
+        planilha.adicionar(lote)
+    return planilha.finalizar()
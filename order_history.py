@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Histórico de pedidos de um fornecedor com paginação por chave (data_refeicao, id)"""
+
+import base64
+import json
+from datetime import date
+
+from order_store import COLUNAS_REFEICOES
+
+COLUNAS_HISTORICO = ('id',) + COLUNAS_REFEICOES + ('data_criacao',)
+
+# Tamanho de página padrão e máximo
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+def codificar_cursor(data_refeicao, id_linha):
+    """Token opaco com a última chave da página: base64 de ["AAAA-MM-DD", id]"""
+    bruto = json.dumps([data_refeicao.isoformat(), id_linha], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """(date, id) do token; levanta ValueError se ele não for válido"""
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data_refeicao, id_linha = json.loads(bruto)
+        return date.fromisoformat(data_refeicao), int(id_linha)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor inválido')
+
+
+def ler_limite(valor):
+    """Tamanho da página pedido, limitado a LIMITE_MAXIMO"""
+    if not valor:
+        return LIMITE_PADRAO
+    limite = int(valor)
+    if limite < 1:
+        raise ValueError(f"Limite inválido: {valor}")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def montar_consulta_historico(filtros, fornecedor=None, cursor=None, limite=LIMITE_PADRAO):
+    """SELECT (psycopg2) de uma página, do pedido mais recente para o mais antigo
+
+    Em vez de OFFSET a página seguinte começa depois da última chave vista
+    ((data_refeicao, id) < cursor), o que percorre idx_refeicoes_cnpj_data_id
+    de trás para frente e custa o mesmo na primeira ou na milésima página.
+    Busca limite + 1 linhas para saber se há próxima página.
+    """
+    condicoes = ['cnpj = %s']
+    parametros = [filtros['cnpj']]
+    if fornecedor:
+        condicoes.append('fornecedor = %s')
+        parametros.append(fornecedor)
+    if filtros['data_inicio']:
+        condicoes.append('data_refeicao >= %s')
+        parametros.append(filtros['data_inicio'])
+    if filtros['data_fim']:
+        condicoes.append('data_refeicao <= %s')
+        parametros.append(filtros['data_fim'])
+    if filtros['quinzena'] == 1:
+        condicoes.append('EXTRACT(DAY FROM data_refeicao) <= 15')
+    elif filtros['quinzena'] == 2:
+        condicoes.append('EXTRACT(DAY FROM data_refeicao) > 15')
+    if cursor is not None:
+        condicoes.append('(data_refeicao, id) < (%s, %s)')
+        parametros.extend(cursor)
+
+    sql = f"""
+        SELECT {', '.join(COLUNAS_HISTORICO)}
+        FROM FORNECEDORES.refeicoes
+        WHERE {' AND '.join(condicoes)}
+        ORDER BY data_refeicao DESC, id DESC
+        LIMIT %s
+    """
+    parametros.append(limite + 1)
+    return sql, parametros
+
+
+def montar_pagina(linhas, limite):
+    """{'pedidos': [...], 'proximo_cursor': token ou None} a partir das linhas da consulta"""
+    pagina = linhas[:limite]
+    pedidos = []
+    for linha in pagina:
+        pedido = dict(zip(COLUNAS_HISTORICO, linha))
+        pedido['cnpj'] = (pedido['cnpj'] or '').strip()
+        pedido['data_refeicao'] = pedido['data_refeicao'].isoformat()
+        pedido['data_criacao'] = pedido['data_criacao'].isoformat() if pedido['data_criacao'] else None
+        for coluna in COLUNAS_REFEICOES[3:]:
+            pedido[coluna] = float(pedido[coluna] or 0)
+        pedidos.append(pedido)
+
+    proximo = None
+    if len(linhas) > limite:
+        ultima = pagina[-1]
+        proximo = codificar_cursor(ultima[1], ultima[0])
+    return {'pedidos': pedidos, 'proximo_cursor': proximo}
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Montagem e gravação das linhas de FORNECEDORES.refeicoes"""
+
+import calendar
+import itertools
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from psycopg2.extras import execute_values
+
+from supplier_catalog import CAMPOS_REFEICAO, somente_digitos
+
+# Ordem das colunas gravadas em FORNECEDORES.refeicoes
+COLUNAS_REFEICOES = (
+    ('data_refeicao', 'cnpj', 'fornecedor')
+    + CAMPOS_REFEICAO
+    + tuple(f'valor_{campo}' for campo in CAMPOS_REFEICAO)
+    + tuple(f'total_{campo}' for campo in CAMPOS_REFEICAO)
+)
+
+# Um pedido por fornecedor/CNPJ/dia: regravar o mesmo dia atualiza a linha
+CHAVE_REFEICOES = ('cnpj', 'fornecedor', 'data_refeicao')
+UPSERT_REFEICOES = (
+    f"ON CONFLICT ({', '.join(CHAVE_REFEICOES)}) DO UPDATE SET "
+    + ', '.join(f'{coluna} = EXCLUDED.{coluna}' for coluna in COLUNAS_REFEICOES if coluna not in CHAVE_REFEICOES)
+)
+
+
+def montar_linha_refeicao(data_refeicao, cnpj, fornecedor, quantidades, valores):
+    """Calcula os totais e devolve a tupla na ordem de COLUNAS_REFEICOES
+
+    `quantidades` e `valores` são dicts indexados pelos campos de refeição;
+    quantidades inválidas levantam ValueError.
+    """
+    qtds = []
+    for campo in CAMPOS_REFEICAO:
+        qtd = float(quantidades.get(campo) or 0)
+        if qtd < 0:
+            raise ValueError(f"Quantidade negativa em '{campo}'")
+        qtds.append(qtd)
+    precos = [float(valores.get(campo) or 0.0) for campo in CAMPOS_REFEICAO]
+    totais = [qtd * preco for qtd, preco in zip(qtds, precos)]
+    return (data_refeicao, cnpj, fornecedor, *qtds, *precos, *totais)
+
+
+def ler_pedido(data):
+    """Normaliza o corpo de /api/save-order (formato individual ou lista 'pedidos')
+
+    Devolve (funcionario, cnpj, data_pedido, pedidos); o CNPJ/CPF vem só com os dígitos.
+    """
+    if 'pedidos' in data:
+        # Formato antigo com múltiplos pedidos
+        return data.get('funcionario', ''), somente_digitos(data.get('cpf')), data.get('data', ''), data.get('pedidos', [])
+
+    # Formato novo - pedido individual (interface envia 'cnpj' em vez de 'cpf')
+    pedido = {'fornecedor': data.get('fornecedor', '')}
+    for campo in CAMPOS_REFEICAO:
+        pedido[campo] = data.get(campo, 0)
+    return data.get('funcionario', 'Usuario'), somente_digitos(data.get('cnpj')), data.get('data_refeicao', ''), [pedido]
+
+
+def montar_linhas_pedido(data_pedido, cnpj, pedidos, precos):
+    """Monta as linhas de um pedido; devolve (linhas, erros), um erro por item inválido"""
+    linhas = []
+    erros = []
+    for posicao, pedido in enumerate(pedidos):
+        fornecedor = pedido.get('fornecedor', '')
+        try:
+            linha = montar_linha_refeicao(data_pedido, cnpj, fornecedor, pedido, precos.get(fornecedor, {}))
+        except (TypeError, ValueError) as e:
+            print(f"❌ Item inválido {fornecedor}: {e}")
+            erros.append({'item': posicao, 'fornecedor': fornecedor, 'error': str(e)})
+            continue
+        linhas.append(linha)
+        print(f"✅ Item preparado: {fornecedor} - Total: R$ {total_da_linha(linha):.2f}")
+    return linhas, erros
+
+
+def montar_linhas_quinzena(dias, cnpj, fornecedor, valores, ano, mes, quinzena):
+    """Valida cada dia contra o período e monta as linhas; devolve (linhas, erros)"""
+    linhas = []
+    erros = []
+    for dia in dias:
+        data_refeicao = dia.get('data_refeicao', '')
+        try:
+            data_validada = validar_data_periodo(data_refeicao, ano, mes, quinzena)
+            linhas.append(montar_linha_refeicao(data_validada, cnpj, fornecedor, dia, valores))
+        except (TypeError, ValueError) as e:
+            erros.append({'data_refeicao': data_refeicao, 'error': str(e)})
+    return linhas, erros
+
+
+def total_da_linha(linha):
+    """Soma dos totais de uma linha montada por montar_linha_refeicao"""
+    return sum(linha[-len(CAMPOS_REFEICAO):])
+
+
+def chave_da_linha(linha):
+    """Chave única (data, cnpj, fornecedor) de uma linha montada"""
+    return (str(linha[0]), (linha[1] or '').rstrip(), linha[2])
+
+
+def deduplicar_linhas(linhas):
+    """Mantém uma linha por chave (a última enviada vence)"""
+    unicas = {}
+    for linha in linhas:
+        unicas[chave_da_linha(linha)] = linha
+    return list(unicas.values())
+
+
+def inserir_refeicoes(cursor, linhas):
+    """Grava (ou atualiza) as linhas com um único INSERT multi-linha
+
+    As linhas não podem repetir chave. Devolve {chave_da_linha: id}.
+    """
+    if not linhas:
+        return {}
+    query = f"""
+        INSERT INTO FORNECEDORES.refeicoes ({', '.join(COLUNAS_REFEICOES)})
+        VALUES %s
+        {UPSERT_REFEICOES}
+        RETURNING id, data_refeicao, cnpj, fornecedor
+    """
+    resultado = execute_values(cursor, query, linhas, page_size=len(linhas), fetch=True)
+    return {chave_da_linha(row[1:]): row[0] for row in resultado}
+
+
+def _valor_csv(valor):
+    """Formata um valor para o CSV do COPY (texto sempre entre aspas, vazio = NULL)"""
+    if valor is None:
+        return ''
+    if isinstance(valor, (int, float)):
+        return repr(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return '"' + str(valor).replace('"', '""') + '"'
+
+
+class _FonteCSV:
+    """Arquivo somente-leitura que gera o CSV do COPY sob demanda
+
+    Evita montar o lote inteiro em memória: copy_expert pede blocos com
+    read(size) e as linhas vão sendo formatadas conforme o PostgreSQL consome.
+    """
+
+    def __init__(self, linhas):
+        self._linhas = iter(linhas)
+        self._buffer = ''
+        self.total = 0
+
+    def read(self, size=-1):
+        partes = [self._buffer]
+        tamanho = len(self._buffer)
+        while size < 0 or tamanho < size:
+            linha = next(self._linhas, None)
+            if linha is None:
+                break
+            texto = ','.join(_valor_csv(valor) for valor in linha) + '\n'
+            partes.append(texto)
+            tamanho += len(texto)
+            self.total += 1
+        dados = ''.join(partes)
+        if size < 0:
+            self._buffer = ''
+            return dados
+        self._buffer = dados[size:]
+        return dados[:size]
+
+
+def copiar_refeicoes(cursor, linhas):
+    """Envia as linhas via COPY para uma tabela de staging e faz o upsert de lá
+
+    As linhas não podem repetir chave. Devolve quantas foram gravadas.
+    """
+    colunas = ', '.join(COLUNAS_REFEICOES)
+    # Tabela temporária da sessão; esvaziada a cada commit
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS refeicoes_staging
+        ON COMMIT DELETE ROWS
+        AS SELECT {colunas} FROM FORNECEDORES.refeicoes WITH NO DATA
+    """)
+    cursor.execute("TRUNCATE refeicoes_staging")
+    fonte = _FonteCSV(linhas)
+    cursor.copy_expert(f"COPY refeicoes_staging ({colunas}) FROM STDIN WITH (FORMAT csv)", fonte)
+    cursor.execute(f"""
+        INSERT INTO FORNECEDORES.refeicoes ({colunas})
+        SELECT {colunas} FROM refeicoes_staging
+        {UPSERT_REFEICOES}
+    """)
+    return fonte.total
+
+
+def gravar_refeicoes(cursor, linhas, limite_copy=500):
+    """Grava as linhas escolhendo o caminho mais rápido para o volume
+
+    Linhas repetidas para o mesmo dia são reduzidas à última e dias já
+    gravados são atualizados (upsert), então regravar é seguro. Até
+    `limite_copy` linhas usa o INSERT multi-linha (que devolve os ids, na
+    ordem das linhas recebidas); acima disso usa COPY. Devolve um dict com
+    ids (None no COPY), método, quantidade e a vazão em linhas por segundo.
+    """
+    inicio = time.perf_counter()
+    unicas = deduplicar_linhas(linhas)
+    if len(unicas) > limite_copy:
+        metodo = 'copy'
+        ids = None
+        total = copiar_refeicoes(cursor, unicas)
+    else:
+        metodo = 'insert'
+        ids_por_chave = inserir_refeicoes(cursor, unicas)
+        ids = [ids_por_chave.get(chave_da_linha(linha)) for linha in linhas]
+        total = len(ids_por_chave)
+    segundos = time.perf_counter() - inicio
+    linhas_por_segundo = round(total / segundos) if segundos > 0 else total
+    print(f"📥 {total} linhas gravadas via {metodo} em {segundos:.3f}s ({linhas_por_segundo} linhas/s)")
+    return {
+        'ids': ids,
+        'metodo': metodo,
+        'linhas': total,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': linhas_por_segundo,
+    }
+
+
+# asyncpg: o lote vai como um array por coluna e o INSERT lê com unnest()
+_TIPOS_UNNEST = ('date', 'text', 'text') + ('float8',) * (len(COLUNAS_REFEICOES) - 3)
+INSERT_REFEICOES_UNNEST = f"""
+    INSERT INTO FORNECEDORES.refeicoes ({', '.join(COLUNAS_REFEICOES)})
+    SELECT * FROM unnest({', '.join(f'${i}::{tipo}[]' for i, tipo in enumerate(_TIPOS_UNNEST, start=1))})
+    {UPSERT_REFEICOES}
+    RETURNING id, data_refeicao, cnpj, fornecedor
+"""
+
+
+def para_asyncpg(sql):
+    """Troca os %s do psycopg2 pelos $1, $2... do asyncpg (as consultas montadas aqui não usam % literal)"""
+    numeros = itertools.count(1)
+    return re.sub(r'%s', lambda _: f'${next(numeros)}', sql)
+
+
+def _registro_copy(linha):
+    """Linha pronta para o COPY binário do asyncpg (NUMERIC como Decimal)"""
+    return linha[:3] + tuple(Decimal(repr(valor)) for valor in linha[3:])
+
+
+async def gravar_refeicoes_async(connection, linhas, limite_copy=500):
+    """Versão asyncpg de gravar_refeicoes (mesma deduplicação, upsert e retorno)
+
+    Abre a própria transação na conexão recebida.
+    """
+    inicio = time.perf_counter()
+    unicas = deduplicar_linhas(linhas)
+    colunas = ', '.join(COLUNAS_REFEICOES)
+    async with connection.transaction():
+        if len(unicas) > limite_copy:
+            metodo = 'copy'
+            ids = None
+            await connection.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS refeicoes_staging
+                ON COMMIT DELETE ROWS
+                AS SELECT {colunas} FROM FORNECEDORES.refeicoes WITH NO DATA
+            """)
+            await connection.execute("TRUNCATE refeicoes_staging")
+            await connection.copy_records_to_table(
+                'refeicoes_staging',
+                records=[_registro_copy(linha) for linha in unicas],
+                columns=COLUNAS_REFEICOES
+            )
+            await connection.execute(f"""
+                INSERT INTO FORNECEDORES.refeicoes ({colunas})
+                SELECT {colunas} FROM refeicoes_staging
+                {UPSERT_REFEICOES}
+            """)
+            total = len(unicas)
+        else:
+            metodo = 'insert'
+            ids_por_chave = {}
+            if unicas:
+                resultado = await connection.fetch(INSERT_REFEICOES_UNNEST, *(list(coluna) for coluna in zip(*unicas)))
+                ids_por_chave = {chave_da_linha(tuple(row)[1:]): row[0] for row in resultado}
+            ids = [ids_por_chave.get(chave_da_linha(linha)) for linha in linhas]
+            total = len(ids_por_chave)
+    segundos = time.perf_counter() - inicio
+    linhas_por_segundo = round(total / segundos) if segundos > 0 else total
+    print(f"📥 {total} linhas gravadas via {metodo} em {segundos:.3f}s ({linhas_por_segundo} linhas/s)")
+    return {
+        'ids': ids,
+        'metodo': metodo,
+        'linhas': total,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': linhas_por_segundo,
+    }
+
+
+def validar_data_periodo(data_refeicao, ano=None, mes=None, quinzena=None):
+    """Converte 'YYYY-MM-DD' em date e confere se pertence ao período informado"""
+    try:
+        dia = datetime.strptime(str(data_refeicao), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Data inválida: '{data_refeicao}' (use AAAA-MM-DD)")
+
+    if ano and dia.year != int(ano):
+        raise ValueError(f"Data {dia.isoformat()} fora do ano {ano}")
+    if mes and dia.month != int(mes):
+        raise ValueError(f"Data {dia.isoformat()} fora do mês {mes}")
+    if quinzena:
+        inicio, fim = limites_quinzena(dia.year, dia.month, quinzena)
+        if not inicio <= dia <= fim:
+            raise ValueError(f"Data {dia.isoformat()} fora da {quinzena}ª quinzena")
+    return dia
+
+
+def limites_quinzena(ano, mes, quinzena):
+    """Primeiro e último dia de uma quinzena (1 = dias 1-15, 2 = 16-fim do mês)"""
+    ano, mes, quinzena = int(ano), int(mes), int(quinzena)
+    if quinzena == 1:
+        return date(ano, mes, 1), date(ano, mes, 15)
+    if quinzena == 2:
+        return date(ano, mes, 16), date(ano, mes, calendar.monthrange(ano, mes)[1])
+    raise ValueError(f"Quinzena inválida: {quinzena}")
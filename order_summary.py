@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resumo por fornecedor e quinzena (FORNECEDORES.resumo_quinzena)
+
+Os triggers trg_resumo_quinzena_* (migração 7) recalculam, uma vez por
+comando, as quinzenas tocadas por INSERT/UPDATE/DELETE em refeicoes, na
+mesma transação da gravação, então os totais de uma quinzena são uma
+leitura pela chave primária. Este módulo faz essa leitura e a reconciliação
+com a tabela base.
+
+Uso:
+    python order_summary.py                 # reconcilia o resumo com refeicoes
+    python order_summary.py --verificar     # só lista as divergências
+    python order_summary.py --cnpj 12345678000190
+"""
+
+import argparse
+import sys
+
+from supplier_catalog import CAMPOS_REFEICAO
+
+COLUNAS_RESUMO = CAMPOS_REFEICAO + tuple(f'total_{campo}' for campo in CAMPOS_REFEICAO)
+
+# Resumo calculado direto das linhas diárias (mesmo cálculo do trigger)
+_SOMAS = ',\n               '.join(f'COALESCE(SUM({coluna}), 0)' for coluna in COLUNAS_RESUMO)
+_TOTAL = ' + '.join(f'COALESCE(total_{campo}, 0)' for campo in CAMPOS_REFEICAO)
+RESUMO_DA_BASE = f"""
+        SELECT cnpj, fornecedor, FORNECEDORES.inicio_quinzena(data_refeicao) AS periodo, COUNT(*)::integer AS dias,
+               {_SOMAS},
+               COALESCE(SUM({_TOTAL}), 0)
+        FROM FORNECEDORES.refeicoes
+        WHERE cnpj IS NOT NULL AND fornecedor IS NOT NULL AND data_refeicao IS NOT NULL {{filtro}}
+        GROUP BY 1, 2, 3
+"""
+RESUMO_GRAVADO = f"""
+        SELECT cnpj, fornecedor, periodo, dias, {', '.join(COLUNAS_RESUMO)}, total
+        FROM FORNECEDORES.resumo_quinzena
+        WHERE TRUE {{filtro}}
+"""
+
+
+# Uma quinzena pela chave primária: (cnpj, fornecedor, periodo)
+CONSULTA_RESUMO = f"""
+        SELECT dias, {', '.join(COLUNAS_RESUMO)}, total, atualizado_em
+        FROM FORNECEDORES.resumo_quinzena
+        WHERE cnpj = %s AND fornecedor = %s AND periodo = %s
+"""
+
+
+def buscar_resumo(cursor, cnpj, fornecedor, periodo):
+    """Totais de uma quinzena (periodo = primeiro dia); None se não há pedidos"""
+    cursor.execute(CONSULTA_RESUMO, (cnpj, fornecedor, periodo))
+    return montar_resumo(cursor.fetchone())
+
+
+def montar_resumo(linha):
+    """Linha de CONSULTA_RESUMO como dict (None continua None)"""
+    if linha is None:
+        return None
+    return {
+        'dias': linha[0],
+        **{coluna: float(valor) for coluna, valor in zip(COLUNAS_RESUMO, linha[1:])},
+        'total': float(linha[-2]),
+        'atualizado_em': linha[-1].isoformat(),
+    }
+
+
+def buscar_divergencias(cursor, cnpj=None):
+    """Chaves (cnpj, fornecedor, periodo) em que o resumo não bate com refeicoes"""
+    filtro, parametros = ('AND cnpj = %s', [cnpj, cnpj]) if cnpj else ('', [])
+    cursor.execute(f"""
+        WITH base AS ({RESUMO_DA_BASE.format(filtro=filtro)}),
+             gravado AS ({RESUMO_GRAVADO.format(filtro=filtro)})
+        SELECT DISTINCT cnpj, fornecedor, periodo
+        FROM ((TABLE base EXCEPT TABLE gravado) UNION ALL (TABLE gravado EXCEPT TABLE base)) d
+        ORDER BY periodo, cnpj, fornecedor
+    """, parametros)
+    return cursor.fetchall()
+
+
+def reconciliar_resumo(connection, cnpj=None, apenas_verificar=False):
+    """Corrige as linhas divergentes do resumo; devolve a lista de chaves corrigidas
+
+    Bloqueia gravações em refeicoes (SHARE) durante a conferência para que
+    nada mude entre a comparação e a correção; leituras seguem normalmente.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("LOCK TABLE FORNECEDORES.refeicoes IN SHARE MODE")
+        divergentes = buscar_divergencias(cursor, cnpj)
+        if divergentes and not apenas_verificar:
+            chaves = (
+                [linha[0] for linha in divergentes],
+                [linha[1] for linha in divergentes],
+                [linha[2] for linha in divergentes],
+            )
+            cursor.execute("""
+                DELETE FROM FORNECEDORES.resumo_quinzena
+                WHERE (cnpj, fornecedor, periodo) IN (
+                    SELECT * FROM unnest(%s::char(14)[], %s::text[], %s::date[])
+                )
+            """, chaves)
+            cursor.execute(f"""
+                INSERT INTO FORNECEDORES.resumo_quinzena (cnpj, fornecedor, periodo, dias, {', '.join(COLUNAS_RESUMO)}, total)
+                SELECT * FROM ({RESUMO_DA_BASE.format(filtro='')}) base
+                WHERE (cnpj, fornecedor, periodo) IN (
+                    SELECT * FROM unnest(%s::char(14)[], %s::text[], %s::date[])
+                )
+            """, chaves)
+            connection.commit()
+        else:
+            connection.rollback()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return divergentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcilia FORNECEDORES.resumo_quinzena com refeicoes')
+    parser.add_argument('--cnpj', help='só este CNPJ (apenas dígitos)')
+    parser.add_argument('--verificar', action='store_true', help='só lista as divergências, sem corrigir')
+    args = parser.parse_args()
+
+    # Reaproveita a configuração de conexão do servidor
+    from photo_server import conectar_postgresql
+
+    connection = conectar_postgresql()
+    if not connection:
+        return 1
+    try:
+        divergentes = reconciliar_resumo(connection, args.cnpj, apenas_verificar=args.verificar)
+    except Exception as e:
+        print(f"❌ Erro ao reconciliar o resumo: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    for cnpj, fornecedor, periodo in divergentes:
+        print(f"   {periodo.isoformat()} {cnpj} {fornecedor}")
+    if not divergentes:
+        print("✅ Resumo em dia com refeicoes")
+    elif args.verificar:
+        print(f"⚠️ {len(divergentes)} quinzena(s) divergente(s)")
+    else:
+        print(f"✅ {len(divergentes)} quinzena(s) corrigida(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""PDF do pedido da quinzena (mesmo layout do jsPDF do front-end) gerado no servidor"""
+
+import hashlib
+import io
+import json
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:  # reportlab é opcional: sem ele o front-end gera o PDF com jsPDF
+    canvas = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from order_store import limites_quinzena
+from supplier_catalog import CAMPOS_REFEICAO
+
+# Muda quando o layout muda, para não servir PDFs antigos do cache
+VERSAO_LAYOUT = 2
+
+MESES = ('Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho', 'Agosto',
+         'Setembro', 'Outubro', 'Novembro', 'Dezembro')
+
+CABECALHOS = ('DATA', 'CAFÉ', 'ALM. MARM.', 'ALM. LOCAL', 'JANTA M.', 'JANTA L.', 'GELO')
+LARGURAS = (28, 22, 24, 24, 24, 24, 24)
+ROTULOS = ('CAFÉ', 'ALMOÇO MARMITEX', 'ALMOÇO LOCAL', 'JANTA MARMITEX', 'JANTA LOCAL', 'GELO')
+
+# Largura (px) com que o logo é guardado: 25 mm impressos não precisam de 8000 px
+LARGURA_LOGO = 600
+
+
+def formatar_moeda(valor):
+    """1234.5 -> 'R$ 1.234,50'"""
+    texto = f"{valor:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    return f"R$ {texto}"
+
+
+def formatar_quantidade(valor):
+    return str(int(valor)) if float(valor).is_integer() else f"{valor:g}".replace('.', ',')
+
+
+def formatar_cnpj(cnpj):
+    """'12323430000123' -> '12.323.430/0001-23' (CPF com 11 dígitos; outro tamanho volta como veio)"""
+    if len(cnpj) == 14 and cnpj.isdigit():
+        return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+    if len(cnpj) == 11 and cnpj.isdigit():
+        return f"{cnpj[:3]}.{cnpj[3:6]}.{cnpj[6:9]}-{cnpj[9:]}"
+    return cnpj
+
+
+def nome_arquivo_pdf(recibo):
+    """Fornecedor-Mês-Ano-NQ.pdf, só com letras, números e _"""
+    nome_seguro = re.sub(r'\s+', '_', re.sub(r'[^\w\s]', '', recibo['fornecedor']))
+    return f"{nome_seguro}-{MESES[recibo['mes'] - 1]}-{recibo['ano']}-{recibo['quinzena']}Q.pdf"
+
+
+def montar_recibo(linhas, fornecedor, cnpj, ano, mes, quinzena, foto=None, data_hora='', local=''):
+    """Monta o recibo da quinzena a partir das linhas gravadas
+
+    `linhas`: tuplas (data_refeicao, <quantidades>, <valores>, <totais>) na
+    ordem de CAMPOS_REFEICAO. Todos os dias do período aparecem; dias sem
+    linha ficam zerados. Os valores a receber somam os total_* gravados em
+    cada dia, agrupados pelo preço unitário daquele dia: se o preço mudou no
+    meio da quinzena cada faixa de preço aparece separada.
+    """
+    inicio, fim = limites_quinzena(ano, mes, quinzena)
+    n = len(CAMPOS_REFEICAO)
+    por_dia = {linha[0]: linha for linha in linhas}
+    dias = []
+    faixas = {campo: {} for campo in CAMPOS_REFEICAO}   # campo -> {preço: [quantidade, total]}
+    vigentes = {campo: 0.0 for campo in CAMPOS_REFEICAO}
+    for numero in range(inicio.day, fim.day + 1):
+        dia = inicio.replace(day=numero)
+        linha = por_dia.get(dia)
+        registro = {'data_refeicao': dia.isoformat()}
+        for indice, campo in enumerate(CAMPOS_REFEICAO):
+            quantidade = float(linha[1 + indice] or 0) if linha else 0.0
+            registro[campo] = quantidade
+            if not linha:
+                continue
+            preco = float(linha[1 + n + indice] or 0)
+            total = float(linha[1 + 2 * n + indice] or 0)
+            vigentes[campo] = preco
+            if quantidade or total:
+                faixa = faixas[campo].setdefault(preco, [0.0, 0.0])
+                faixa[0] += quantidade
+                faixa[1] += total
+        dias.append(registro)
+
+    resumo = []
+    for campo in CAMPOS_REFEICAO:
+        # Sem consumo no período: uma linha zerada com o preço vigente
+        itens = sorted(faixas[campo].items()) or [(vigentes[campo], [0.0, 0.0])]
+        resumo.append({
+            'campo': campo,
+            'faixas': [{'preco': preco, 'quantidade': quantidade, 'total': round(total, 2)}
+                       for preco, (quantidade, total) in itens],
+        })
+    return {
+        'fornecedor': fornecedor,
+        'cnpj': formatar_cnpj(cnpj),
+        'ano': int(ano),
+        'mes': int(mes),
+        'quinzena': int(quinzena),
+        'dias': dias,
+        'resumo': resumo,
+        'valor_total': round(sum(faixa['total'] for item in resumo for faixa in item['faixas']), 2),
+        'foto': foto,
+        'data_hora': data_hora,
+        'local': local,
+    }
+
+
+class PdfRenderer:
+    """Gera o PDF do pedido com logo e fontes pré-carregados e cache por conteúdo
+
+    A chave do cache é o sha256 de tudo o que vai para o PDF (linhas, foto,
+    assinatura e versão do layout); o mesmo pedido não é renderizado duas vezes.
+    """
+
+    def __init__(self, logo_path, font_path=None, max_cache=64):
+        self.logo_path = logo_path
+        self.font_path = font_path
+        self.max_cache = max_cache
+        self.disponivel = canvas is not None
+        self._logo = None
+        self._fontes = None
+        self._recursos_lock = threading.Lock()
+        self._cache = OrderedDict()   # sha -> bytes do PDF
+        self._lock = threading.Lock()
+        self._stats = {'renderizados': 0, 'cache_hits': 0}
+
+    def _recursos(self):
+        """Logo reduzido e fontes registradas, preparados uma única vez por processo"""
+        with self._recursos_lock:
+            if self._fontes is None:
+                self._fontes = ('Helvetica', 'Helvetica-Bold')
+                if self.font_path:
+                    try:
+                        pdfmetrics.registerFont(TTFont('Recibo', self.font_path))
+                        self._fontes = ('Recibo', 'Recibo')
+                    except Exception as e:
+                        print(f"⚠️ Fonte {self.font_path} não carregada, usando Helvetica: {e}")
+                self._logo = self._carregar_logo()
+            return self._logo, self._fontes
+
+    def _carregar_logo(self):
+        try:
+            if Image is None:
+                return ImageReader(self.logo_path)
+            with Image.open(self.logo_path) as imagem:
+                imagem.thumbnail((LARGURA_LOGO, LARGURA_LOGO))
+                saida = io.BytesIO()
+                imagem.save(saida, 'PNG', optimize=True)
+            saida.seek(0)
+            return ImageReader(saida)
+        except Exception as e:
+            print(f"⚠️ Logo {self.logo_path} indisponível para o PDF: {e}")
+            return None
+
+    @staticmethod
+    def chave(recibo):
+        """sha256 do conteúdo do recibo (a foto entra pelo hash dos bytes)"""
+        conteudo = dict(recibo, foto=hashlib.sha256(recibo['foto']).hexdigest() if recibo.get('foto') else None)
+        texto = json.dumps([VERSAO_LAYOUT, conteudo], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+    def render(self, recibo):
+        """Devolve (sha, bytes do PDF), do cache quando possível
+
+        `recibo`: fornecedor, cnpj, ano, mes, quinzena, dias (lista de
+        {data_refeicao, <campos>}), resumo (por campo, as faixas de preço com
+        quantidade e total), valor_total, foto (bytes ou None), data_hora e
+        local da assinatura.
+        """
+        sha = self.chave(recibo)
+        with self._lock:
+            pdf = self._cache.get(sha)
+            if pdf is not None:
+                self._cache.move_to_end(sha)
+                self._stats['cache_hits'] += 1
+                return sha, pdf
+
+        pdf = self._desenhar(recibo)
+
+        with self._lock:
+            self._cache[sha] = pdf
+            self._stats['renderizados'] += 1
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        return sha, pdf
+
+    def _desenhar(self, recibo):
+        logo, (fonte, fonte_negrito) = self._recursos()
+        saida = io.BytesIO()
+        pdf = canvas.Canvas(saida, pagesize=A4, pageCompression=1)
+        pdf.setTitle(f"{recibo['fornecedor']} - {recibo['quinzena']}ª quinzena {recibo['mes']:02d}/{recibo['ano']}")
+        altura_pagina = A4[1]
+
+        # Coordenadas em mm a partir do topo, como no jsPDF
+        def ponto(x, y):
+            return x * mm, altura_pagina - y * mm
+
+        def retangulo(x, y, largura, altura, cor):
+            pdf.setFillColorRGB(*(c / 255 for c in cor))
+            pdf.rect(x * mm, altura_pagina - (y + altura) * mm, largura * mm, altura * mm, stroke=0, fill=1)
+
+        def texto(valor, x, y, tamanho, negrito=False, cor=(0, 0, 0), centro=False):
+            pdf.setFillColorRGB(*(c / 255 for c in cor))
+            pdf.setFont(fonte_negrito if negrito else fonte, tamanho)
+            if centro:
+                pdf.drawCentredString(*ponto(x, y), str(valor))
+            else:
+                pdf.drawString(*ponto(x, y), str(valor))
+
+        def nova_pagina_se(limite, y):
+            if y > limite:
+                pdf.showPage()
+                return 20
+            return y
+
+        branco = (255, 255, 255)
+        mes_nome = MESES[recibo['mes'] - 1]
+
+        # Cabeçalho
+        retangulo(0, 0, 210, 50, (44, 62, 80))
+        if logo is not None:
+            pdf.drawImage(logo, *ponto(10, 20), width=25 * mm, height=15 * mm, mask='auto', preserveAspectRatio=True)
+        texto('SISTEMA DE FORNECIMENTO DE REFEIÇÕES', 105, 18, 16, True, branco, True)
+        texto(f"{recibo['quinzena']}ª Quinzena de {mes_nome}/{recibo['ano']}", 105, 28, 11, True, branco, True)
+        texto(f"Fornecedor: {recibo['fornecedor']}", 105, 38, 10, cor=branco, centro=True)
+        texto(f"CNPJ: {recibo['cnpj']}", 105, 45, 10, cor=branco, centro=True)
+
+        dias = recibo['dias']
+        y = 60
+        if dias:
+            texto(f"Período: {dias[0]['data_refeicao'][8:10]}/{dias[0]['data_refeicao'][5:7]} à "
+                  f"{dias[-1]['data_refeicao'][8:10]}/{dias[-1]['data_refeicao'][5:7]}", 20, y, 10)
+        y += 15
+
+        # Tabela
+        retangulo(15, y - 5, 180, 8, (52, 152, 219))
+        x = 15
+        for cabecalho, largura in zip(CABECALHOS, LARGURAS):
+            texto(cabecalho, x + largura / 2, y, 7, True, branco, True)
+            x += largura
+        y += 12
+
+        totais = [0.0] * len(CAMPOS_REFEICAO)
+        for indice, dia in enumerate(dias):
+            y = nova_pagina_se(260, y)
+            if indice % 2 == 0:
+                retangulo(15, y - 4, 180, 8, (248, 249, 250))
+            x = 15
+            data = dia['data_refeicao']
+            texto(f"{data[8:10]}/{data[5:7]}", x + LARGURAS[0] / 2, y, 7, centro=True)
+            x += LARGURAS[0]
+            for coluna, campo in enumerate(CAMPOS_REFEICAO):
+                quantidade = float(dia.get(campo) or 0)
+                totais[coluna] += quantidade
+                texto(formatar_quantidade(quantidade), x + LARGURAS[coluna + 1] / 2, y, 7, centro=True)
+                x += LARGURAS[coluna + 1]
+            y += 8
+
+        y += 5
+        retangulo(15, y - 4, 180, 10, (39, 174, 96))
+        x = 15
+        texto('TOTAL', x + LARGURAS[0] / 2, y, 8, True, branco, True)
+        x += LARGURAS[0]
+        for coluna, total in enumerate(totais):
+            texto(formatar_quantidade(total), x + LARGURAS[coluna + 1] / 2, y, 8, True, branco, True)
+            x += LARGURAS[coluna + 1]
+        y += 20
+
+        # Resumo financeiro
+        y = nova_pagina_se(200, y)
+        retangulo(15, y - 5, 180, 8, (142, 68, 173))
+        texto('RESUMO FINANCEIRO', 105, y, 11, True, branco, True)
+        y += 15
+
+        # Uma linha por faixa de preço; o subtotal é o total gravado, não quantidade x preço atual
+        for rotulo, item in zip(ROTULOS, recibo['resumo']):
+            for faixa in item['faixas']:
+                y = nova_pagina_se(270, y)
+                texto(f"{rotulo}: {formatar_quantidade(faixa['quantidade'])} un. x {formatar_moeda(faixa['preco'])} = "
+                      f"{formatar_moeda(faixa['total'])}", 20, y, 9)
+                y += 10
+
+        y = nova_pagina_se(270, y + 5)
+        retangulo(15, y - 5, 180, 12, (231, 76, 60))
+        texto(f"VALOR TOTAL A RECEBER: {formatar_moeda(recibo['valor_total'])}", 105, y, 12, True, branco, True)
+        y += 20
+
+        # Assinatura
+        y = nova_pagina_se(200, y)
+        retangulo(15, y - 5, 180, 8, (52, 73, 94))
+        texto('ASSINATURA DIGITAL', 105, y, 11, True, branco, True)
+        y += 15
+
+        if recibo.get('foto'):
+            try:
+                pdf.drawImage(ImageReader(io.BytesIO(recibo['foto'])), *ponto(20, y + 25),
+                              width=25 * mm, height=25 * mm, preserveAspectRatio=True)
+            except Exception as e:
+                print(f"⚠️ Foto da assinatura não pôde ser desenhada: {e}")
+            texto('Validação Facial:', 55, y + 5, 8)
+            texto(f"Data/Hora: {recibo.get('data_hora', '')}", 55, y + 11, 8)
+            texto(f"Local: {recibo.get('local', '')}", 55, y + 17, 8)
+            texto('Documento assinado digitalmente', 55, y + 23, 8, True)
+        y += 35
+
+        # Rodapé
+        y = nova_pagina_se(240, y)
+        y = nova_pagina_se(270, y + 15)
+        retangulo(0, y - 5, 210, 15, (236, 240, 241))
+        cinza = (127, 140, 141)
+        texto('Documento gerado automaticamente pelo Sistema de Fornecimento de Refeições', 105, y, 6, cor=cinza, centro=True)
+        texto(f"Assinado em: {recibo.get('data_hora', '')}", 105, y + 5, 6, cor=cinza, centro=True)
+
+        pdf.save()
+        return saida.getvalue()
+
+    def stats(self):
+        """Estatísticas do gerador"""
+        with self._lock:
+            return {
+                'disponivel': self.disponivel,
+                'cache': len(self._cache),
+                'cache_bytes': sum(len(pdf) for pdf in self._cache.values()),
+                **self._stats,
+            }
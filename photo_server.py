@@ -1,22 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hmac
+import io
+import itertools
 import os
+import tempfile
 print("🔄 Iniciando imports...")
 
-from flask import Flask, jsonify, send_file, request
+from flask import Blueprint, Flask, Response, jsonify, send_file, request
 from flask_cors import CORS
 import pymssql
 import psycopg2
-from datetime import datetime
+import psycopg2.extensions
+from datetime import date, datetime
 from dotenv import load_dotenv
+from werkzeug.exceptions import RequestEntityTooLarge
+from build_assets import ler_manifesto
+from db_pool import ConnectionPool
+from idempotency import IdempotencyCache, idempotente
+from image_pipeline import ImagePipeline
+from migrations import aplicar_migracoes
+from order_export import Workbook, gerar_csv, gravar_xlsx, ler_em_lotes, montar_consulta_exportacao
+from order_history import decodificar_cursor, ler_limite, montar_consulta_historico, montar_pagina
+from order_store import (
+    gravar_refeicoes, ler_pedido, limites_quinzena, montar_linhas_pedido, montar_linhas_quinzena, total_da_linha,
+    validar_data_periodo
+)
+from order_summary import buscar_resumo
+from pdf_report import PdfRenderer, montar_recibo, nome_arquivo_pdf
+from photo_store import (
+    SESSION_ID_VALIDO, TIPOS_FOTO, Foto, FotoGrandeDemais, criar_photo_store, ler_data_url, ler_em_blocos,
+    montar_data_url
+)
+from reports import ler_filtros, montar_consulta, montar_relatorio
+from static_assets import StaticAssets
+from supplier_catalog import CAMPOS_REFEICAO, CatalogCache, PriceBook, somente_digitos
+from supplier_search import SupplierSearch
 
 # Carregar variáveis de ambiente
 load_dotenv()
 print("✅ Imports OK")
 
-app = Flask(__name__)
-CORS(app)  # Habilita CORS para todas as rotas
+# Rotas ficam no blueprint; a aplicação é montada por create_app()
+api = Blueprint('api', __name__)
 
 # Configurações do banco Azure SQL - usando variáveis de ambiente
 SQL_SERVER = os.getenv('SQL_SERVER', 'alrflorestal.database.windows.net')
@@ -31,7 +58,77 @@ PG_USER = os.getenv('PGUSER', 'postgres')
 PG_PASSWORD = os.getenv('PGPASSWORD', '')
 PG_DATABASE = os.getenv('PGDATABASE', 'railway')
 
+# Pool de conexões do Azure SQL
+AZURE_POOL_MIN = int(os.getenv('AZURE_POOL_MIN', 1))
+AZURE_POOL_MAX = int(os.getenv('AZURE_POOL_MAX', 10))
+AZURE_POOL_IDLE_TIMEOUT = int(os.getenv('AZURE_POOL_IDLE_TIMEOUT', 300))
+AZURE_POOL_MAX_LIFETIME = int(os.getenv('AZURE_POOL_MAX_LIFETIME', 1800))
+AZURE_POOL_VALIDATE_AFTER = int(os.getenv('AZURE_POOL_VALIDATE_AFTER', 30))
+
+# Pool de conexões do PostgreSQL
+PG_POOL_MIN = int(os.getenv('PG_POOL_MIN', 1))
+PG_POOL_MAX = int(os.getenv('PG_POOL_MAX', 10))
+PG_POOL_CHECKOUT_TIMEOUT = float(os.getenv('PG_POOL_CHECKOUT_TIMEOUT', 10))
+PG_POOL_IDLE_TIMEOUT = int(os.getenv('PG_POOL_IDLE_TIMEOUT', 300))
+PG_POOL_MAX_LIFETIME = int(os.getenv('PG_POOL_MAX_LIFETIME', 1800))
+
+# Cache do catálogo de fornecedores (segundos)
+CATALOG_TTL = int(os.getenv('CATALOG_TTL', 300))
+CATALOG_STALE_TTL = int(os.getenv('CATALOG_STALE_TTL', 3600))
+# Máximo de resultados por busca de fornecedores
+SUPPLIER_SEARCH_LIMIT = int(os.getenv('SUPPLIER_SEARCH_LIMIT', 30))
+
+# Acima deste número de linhas a gravação usa COPY em vez de INSERT
+COPY_THRESHOLD = int(os.getenv('COPY_THRESHOLD', 500))
+
+# Respostas guardadas por Idempotency-Key
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 5000))
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+
+# Fotos das sessões de QR code (bytes / segundos)
+# memory = por processo; sqlite = arquivo compartilhado entre workers
+PHOTO_STORE = os.getenv('PHOTO_STORE', 'memory')
+PHOTO_STORE_PATH = os.getenv('PHOTO_STORE_PATH', os.path.join(tempfile.gettempdir(), 'fornecedores_fotos.sqlite3'))
+PHOTO_STORE_MAX_BYTES = int(os.getenv('PHOTO_STORE_MAX_BYTES', 64 * 1024 * 1024))
+PHOTO_MAX_BYTES = int(os.getenv('PHOTO_MAX_BYTES', 2 * 1024 * 1024))
+PHOTO_TTL = int(os.getenv('PHOTO_TTL', 600))
+# Tempo máximo que o long-poll do ASGI segura a requisição (abaixo do timeout de proxies)
+PHOTO_WAIT_MAX = float(os.getenv('PHOTO_WAIT_MAX', 25))
+# No WSGI não há long-poll (seguraria uma thread do gthread): segundos sugeridos
+# no Retry-After até a próxima consulta
+PHOTO_POLL_RETRY = int(os.getenv('PHOTO_POLL_RETRY', 2))
+
+# Normalização das fotos de assinatura (pixels / qualidade JPEG / threads)
+PHOTO_SIGNATURE_SIZE = int(os.getenv('PHOTO_SIGNATURE_SIZE', 400))
+PHOTO_THUMB_SIZE = int(os.getenv('PHOTO_THUMB_SIZE', 96))
+PHOTO_JPEG_QUALITY = int(os.getenv('PHOTO_JPEG_QUALITY', 82))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+# PDF gerado no servidor (requer reportlab): PDFs em cache e fonte TTF opcional
+PDF_CACHE_ENTRIES = int(os.getenv('PDF_CACHE_ENTRIES', 64))
+PDF_FONT_PATH = os.getenv('PDF_FONT_PATH', '')
+
+# Diretório do projeto (index.html, logo)
+DIRETORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+LOGO_ARQUIVO = 'LARSIL_branco_fundo_transparente.png'
+# Saída do build_assets.py (CSS/JS separados do index.html, com hash no nome)
+STATIC_BUILD_DIR = os.getenv('STATIC_BUILD_DIR', os.path.join(DIRETORIO_BASE, 'build'))
+# Diretório gravável que sobrevive a deploys (volume do Railway, se montado)
+DATA_DIR = os.getenv('DATA_DIR', os.getenv('RAILWAY_VOLUME_MOUNT_PATH', tempfile.gettempdir()))
+# Snapshot do catálogo lido no boot e regravado quando o catálogo muda (vazio = desligado)
+CATALOG_SNAPSHOT = os.getenv('CATALOG_SNAPSHOT', os.path.join(DATA_DIR, 'fornecedores_catalogo.json'))
+# Semente versionada (só leitura), usada quando o snapshot ainda não existe; get_suppliers.py a regenera
+CATALOG_SNAPSHOT_SEED = os.getenv('CATALOG_SNAPSHOT_SEED', os.path.join(DIRETORIO_BASE, 'fornecedores_sql.json'))
+
+# Linhas lidas por vez do cursor nomeado em /api/export
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 2000))
+
+# Token para endpoints administrativos (vazio = endpoints administrativos bloqueados)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
 print("✅ Configurações carregadas")
+if not ADMIN_TOKEN:
+    print("⚠️ ADMIN_TOKEN não configurado: /api/admin, /api/reports e /api/export respondem 403")
 
 def conectar_azure_sql():
     """Conecta ao Azure SQL Server"""
@@ -51,6 +148,25 @@ def conectar_azure_sql():
         print(f"❌ Erro ao conectar: {e}")
         return None
 
+def validar_conexao_azure(connection):
+    """Verifica se uma conexão do pool Azure ainda responde"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchone()
+    cursor.close()
+    return True
+
+azure_pool = ConnectionPool(
+    'azure',
+    conectar_azure_sql,
+    min_size=AZURE_POOL_MIN,
+    max_size=AZURE_POOL_MAX,
+    idle_timeout=AZURE_POOL_IDLE_TIMEOUT,
+    max_lifetime=AZURE_POOL_MAX_LIFETIME,
+    validate=validar_conexao_azure,
+    validate_after=AZURE_POOL_VALIDATE_AFTER
+)
+
 def conectar_postgresql():
     """Conecta ao PostgreSQL Railway"""
     try:
@@ -69,147 +185,186 @@ def conectar_postgresql():
         print(f"❌ Erro ao conectar PostgreSQL: {e}")
         return None
 
-def criar_tabela_pedidos_postgresql():
-    """Cria a tabela refeicoes no PostgreSQL se não existir"""
+def conexao_postgresql_quebrada(connection):
+    """Detecta conexões PostgreSQL fechadas ou em estado desconhecido"""
+    return (
+        connection.closed != 0
+        or connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    )
+
+def resetar_conexao_postgresql(connection):
+    """Desfaz transações abertas antes de devolver a conexão ao pool"""
+    if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+def validar_conexao_postgresql(connection):
+    """Verifica se uma conexão do pool PostgreSQL ainda responde"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchone()
+    cursor.close()
+    connection.rollback()
+    return True
+
+pg_pool = ConnectionPool(
+    'postgresql',
+    conectar_postgresql,
+    min_size=PG_POOL_MIN,
+    max_size=PG_POOL_MAX,
+    checkout_timeout=PG_POOL_CHECKOUT_TIMEOUT,
+    idle_timeout=PG_POOL_IDLE_TIMEOUT,
+    max_lifetime=PG_POOL_MAX_LIFETIME,
+    validate=validar_conexao_postgresql,
+    is_broken=conexao_postgresql_quebrada,
+    reset=resetar_conexao_postgresql
+)
+
+def migrar_banco_postgresql():
+    """Aplica as migrações pendentes do schema FORNECEDORES (tabelas e índices)"""
     try:
-        connection = conectar_postgresql()
-        if not connection:
-            print("❌ Erro: Não foi possível conectar ao PostgreSQL")
-            return False
-        
-        cursor = connection.cursor()
-        
-        # Criar tabela com a estrutura correta
-        create_table_query = """
-        CREATE SCHEMA IF NOT EXISTS FORNECEDORES;
-        CREATE TABLE IF NOT EXISTS FORNECEDORES.refeicoes (
-            id SERIAL PRIMARY KEY,
-            data_refeicao DATE,
-            cnpj CHAR(14),
-            fornecedor TEXT,
-            cafe NUMERIC(10,2) DEFAULT 0,
-            almoco_marmitex NUMERIC(10,2) DEFAULT 0,
-            almoco_local NUMERIC(10,2) DEFAULT 0,
-            janta_marmitex NUMERIC(10,2) DEFAULT 0,
-            janta_local NUMERIC(10,2) DEFAULT 0,
-            gelo NUMERIC(10,2) DEFAULT 0,
-            valor_cafe NUMERIC(12,2) DEFAULT 0,
-            valor_almoco_marmitex NUMERIC(12,2) DEFAULT 0,
-            valor_almoco_local NUMERIC(12,2) DEFAULT 0,
-            valor_janta_marmitex NUMERIC(12,2) DEFAULT 0,
-            valor_janta_local NUMERIC(12,2) DEFAULT 0,
-            valor_gelo NUMERIC(12,2) DEFAULT 0,
-            total_cafe NUMERIC(14,2) DEFAULT 0,
-            total_almoco_marmitex NUMERIC(14,2) DEFAULT 0,
-            total_almoco_local NUMERIC(14,2) DEFAULT 0,
-            total_janta_marmitex NUMERIC(14,2) DEFAULT 0,
-            total_janta_local NUMERIC(14,2) DEFAULT 0,
-            total_gelo NUMERIC(14,2) DEFAULT 0,
-            data_criacao TIMESTAMP DEFAULT NOW()
-        );
-        """
-        
-        cursor.execute(create_table_query)
-        connection.commit()
-        cursor.close()
-        connection.close()
+        with pg_pool.connection() as connection:
+            if not connection:
+                print("❌ Erro: Não foi possível conectar ao PostgreSQL")
+                return False
+            
+            aplicar_migracoes(connection)
         
-        print("✅ Tabela FORNECEDORES.refeicoes criada/verificada no PostgreSQL")
         return True
         
     except Exception as e:
-        print(f"❌ Erro ao criar tabela PostgreSQL: {e}")
+        print(f"❌ Erro ao migrar banco PostgreSQL: {e}")
         return False
 
-def buscar_valores_fornecedor(fornecedor_nome):
-    """Busca os valores unitários de um fornecedor no SQL Azure"""
+class PrecosIndisponiveis(RuntimeError):
+    """Azure fora e nenhum catálogo recente para precificar o pedido"""
+
+# O SQL Server aceita no máximo 2100 parâmetros por comando: IN (...) vai em blocos
+NOMES_POR_CONSULTA_AZURE = 1000
+
+
+def buscar_valores_fornecedores(nomes):
+    """Busca os valores unitários de vários fornecedores no SQL Azure (uma consulta por bloco de nomes)
+
+    Devolve ({fornecedor: SupplierPrices}, do_cache). Se o Azure não
+    responder usa os preços do catálogo em cache (do_cache=True), desde que
+    ele tenha vindo do banco dentro da janela ttl + stale_ttl; senão levanta
+    PrecosIndisponiveis.
+    """
+    nomes = sorted({nome for nome in nomes if nome})
+    if not nomes:
+        return {}, False
+    
     try:
-        connection = conectar_azure_sql()
-        if not connection:
-            return None
+        with azure_pool.connection() as connection:
+            if not connection:
+                raise RuntimeError('Erro de conexão com o banco de dados')
 
-        cursor = connection.cursor(as_dict=True)
-        cursor.execute("""
-            SELECT FORNECEDOR, CPF_CNPJ, VALOR, TIPO_FORN
-            FROM tb_fornecedores
-            WHERE FORNECEDOR = %s
-            ORDER BY TIPO_FORN
-        """, (fornecedor_nome,))
+            cursor = connection.cursor(as_dict=True)
+            dados = []
+            for inicio in range(0, len(nomes), NOMES_POR_CONSULTA_AZURE):
+                bloco = nomes[inicio:inicio + NOMES_POR_CONSULTA_AZURE]
+                cursor.execute(f"""
+                    SELECT FORNECEDOR, CPF_CNPJ, VALOR, TIPO_FORN
+                    FROM tb_fornecedores
+                    WHERE FORNECEDOR IN ({', '.join(['%s'] * len(bloco))})
+                    ORDER BY FORNECEDOR, TIPO_FORN
+                """, tuple(bloco))
+                dados.extend(cursor.fetchall())
+            cursor.close()
         
-        dados = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
-        # Organizar valores por tipo
-        valores = {
-            'fornecedor': fornecedor_nome,
-            'cnpj': '',
-            'cafe': 0.0,
-            'almoco_marmitex': 0.0,
-            'almoco_local': 0.0,
-            'janta_marmitex': 0.0,
-            'janta_local': 0.0,
-            'gelo': 0.0
-        }
-        
-        for row in dados:
-            if row['CPF_CNPJ']:
-                valores['cnpj'] = row['CPF_CNPJ']
-            
-            valor = float(row['VALOR']) if row['VALOR'] else 0.0
-            tipo_clean = row['TIPO_FORN'].strip().upper() if row['TIPO_FORN'] else ''
-            
-            if tipo_clean in ['CAFÉ', 'CAFE']:
-                valores['cafe'] = valor
-            elif tipo_clean == 'ALMOÇO MARMITEX':
-                valores['almoco_marmitex'] = valor
-            elif tipo_clean == 'ALMOÇO LOCAL':
-                valores['almoco_local'] = valor
-            elif tipo_clean == 'JANTA MARMITEX':
-                valores['janta_marmitex'] = valor
-            elif tipo_clean == 'JANTA LOCAL':
-                valores['janta_local'] = valor
-            elif tipo_clean == 'GELO':
-                valores['gelo'] = valor
-        
-        return valores
+        precos = PriceBook.das_linhas(dados)
         
     except Exception as e:
-        print(f"❌ Erro ao buscar valores do fornecedor: {e}")
-        return None
+        precos = catalog_cache.precos_recentes()
+        if precos is None:
+            print(f"❌ Erro ao buscar valores dos fornecedores (sem catálogo recente): {e}")
+            raise PrecosIndisponiveis('Preços indisponíveis: banco de fornecedores fora do ar')
+        print(f"⚠️ Azure indisponível, usando preços do catálogo em cache para {', '.join(nomes)}: {e}")
+        return precos.filtrar(nomes), True
+    
+    return precos.filtrar(nomes), False
+
+def buscar_valores_fornecedor(fornecedor_nome):
+    """Busca os valores unitários de um fornecedor no SQL Azure"""
+    precos, _ = buscar_valores_fornecedores([fornecedor_nome])
+    encontrado = precos.get(fornecedor_nome)
+    
+    valores = {
+        'fornecedor': fornecedor_nome,
+        'cnpj': encontrado.cpf_cnpj if encontrado else '',
+    }
+    for campo in CAMPOS_REFEICAO:
+        valores[campo] = encontrado[campo] if encontrado else 0.0
+    return valores
 
-@app.route('/favicon.ico')
+@api.route('/favicon.ico')
 def favicon():
     """Retorna um favicon vazio para evitar erro 404"""
     return '', 204
 
-@app.route('/health')
+@api.route('/health')
 def health_check():
     """Health check para Railway"""
     return jsonify({'status': 'healthy', 'service': 'fornecedores-api'}), 200
 
-@app.route('/')
+@api.route('/api/stats')
+def get_stats():
+    """Estatísticas internas (pools de conexão)"""
+    return jsonify({
+        'azure_pool': azure_pool.stats(),
+        'postgresql_pool': pg_pool.stats(),
+        'catalogo': catalog_cache.stats(),
+        'idempotencia': idempotency_cache.stats(),
+        'fotos': photo_store.stats(),
+        'imagens': image_pipeline.stats(),
+        'pdf': pdf_renderer.stats(),
+        'estaticos': static_assets.stats(),
+        'busca': supplier_search.stats()
+    })
+
+def servir_estatico(nome, asset):
+    """Responde um arquivo estático: variante comprimida da memória ou sendfile do disco"""
+    if asset is None:
+        return jsonify({'error': f'{nome} não encontrado'}), 404
+    
+    variante = asset.negociar(request.headers.get('Accept-Encoding'))
+    if variante.dados is None:
+        # Binário (PNG): send_file usa wsgi.file_wrapper, o gunicorn faz sendfile()
+        response = send_file(asset.caminho, mimetype=asset.content_type, etag=variante.etag)
+    else:
+        response = Response(variante.dados, mimetype=asset.content_type)
+        response.set_etag(variante.etag)
+        if variante.encoding != 'identity':
+            response.headers['Content-Encoding'] = variante.encoding
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = static_assets.cache_control(asset, nome)
+    response = response.make_conditional(request)
+    static_assets.registrar_resposta(response.status_code == 304)
+    return response
+
+@api.route('/')
 def index():
     """Serve o HTML principal"""
-    print("📄 Servindo index.html")
-    try:
-        return send_file('index.html')
-    except FileNotFoundError:
-        return jsonify({'error': 'index.html não encontrado'}), 404
+    return servir_estatico('index.html', static_assets.buscar('index.html'))
 
-@app.route('/api/suppliers')
-def get_suppliers():
-    """API para buscar fornecedores da tabela tb_fornecedores"""
+@api.route(f'/{LOGO_ARQUIVO}')
+def logo():
+    """Logo pelo nome original (páginas antigas em cache)"""
+    return servir_estatico(LOGO_ARQUIVO, static_assets.buscar(LOGO_ARQUIVO))
+
+@api.route('/static/<nome>')
+def static_fingerprint(nome):
+    """Arquivos pela URL com hash do conteúdo (cache de um ano)"""
+    return servir_estatico(nome, static_assets.buscar_fingerprint(nome))
+
+def carregar_fornecedores_azure():
+    """Lê tb_fornecedores no Azure e devolve a tabela de preços (PriceBook)"""
     print("🔍 Buscando dados da tabela tb_fornecedores...")
     
-    try:
-        # Conectar ao banco
-        connection = conectar_azure_sql()
+    # Emprestar conexão do pool
+    with azure_pool.connection() as connection:
         if not connection:
-            return jsonify({
-                'success': False,
-                'error': 'Erro de conexão com o banco de dados'
-            }), 500
+            raise RuntimeError('Erro de conexão com o banco de dados')
 
         # Executar query
         cursor = connection.cursor(as_dict=True)
@@ -222,65 +377,552 @@ def get_suppliers():
         # Buscar todos os resultados
         dados = cursor.fetchall()
         
-        # Fechar conexão
+        # Fechar cursor (a conexão volta para o pool)
         cursor.close()
-        connection.close()
-        
-        print(f"✅ Consulta executada: {len(dados)} registros")
-        
-        # Organizar dados por fornecedor
-        suppliers_dict = {}
-        for row in dados:
-            fornecedor = row['FORNECEDOR'] if row['FORNECEDOR'] else ''
-            cpf_cnpj = row['CPF_CNPJ'] if row['CPF_CNPJ'] else ''
-            valor = float(row['VALOR']) if row['VALOR'] else 0.0
-            tipo_forn = row['TIPO_FORN'] if row['TIPO_FORN'] else ''
-            
-            if fornecedor not in suppliers_dict:
-                suppliers_dict[fornecedor] = {
-                    'fornecedor': fornecedor,
-                    'cpf_cnpj': cpf_cnpj,
-                    'cafe': 0.0,
-                    'almoco_marmitex': 0.0,
-                    'almoco_local': 0.0,
-                    'janta_marmitex': 0.0,
-                    'janta_local': 0.0,
-                    'gelo': 0.0
-                }
-            
-            # Mapear tipos de fornecimento - aceitar variações
-            tipo_clean = tipo_forn.strip().upper() if tipo_forn else ''
-            
-            if tipo_clean in ['CAFÉ', 'CAFE']:
-                suppliers_dict[fornecedor]['cafe'] = valor
-            elif tipo_clean == 'ALMOÇO MARMITEX':
-                suppliers_dict[fornecedor]['almoco_marmitex'] = valor
-            elif tipo_clean == 'ALMOÇO LOCAL':
-                suppliers_dict[fornecedor]['almoco_local'] = valor
-            elif tipo_clean == 'JANTA MARMITEX':
-                suppliers_dict[fornecedor]['janta_marmitex'] = valor
-            elif tipo_clean == 'JANTA LOCAL':
-                suppliers_dict[fornecedor]['janta_local'] = valor
-            elif tipo_clean == 'GELO':
-                suppliers_dict[fornecedor]['gelo'] = valor
-        
-        suppliers = list(suppliers_dict.values())
-        print(f"📊 Retornando {len(suppliers)} fornecedores com valores reais")
-        return jsonify(suppliers)
-        
+    
+    print(f"✅ Consulta executada: {len(dados)} registros")
+    return PriceBook.das_linhas(dados)
+
+idempotency_cache = IdempotencyCache(
+    max_entries=IDEMPOTENCY_MAX_ENTRIES,
+    ttl=IDEMPOTENCY_TTL
+)
+
+photo_store = criar_photo_store(
+    PHOTO_STORE,
+    PHOTO_STORE_PATH,
+    max_bytes=PHOTO_STORE_MAX_BYTES,
+    max_entry_bytes=PHOTO_MAX_BYTES,
+    ttl=PHOTO_TTL
+)
+
+image_pipeline = ImagePipeline(
+    lado=PHOTO_SIGNATURE_SIZE,
+    lado_miniatura=PHOTO_THUMB_SIZE,
+    qualidade=PHOTO_JPEG_QUALITY,
+    workers=IMAGE_WORKERS
+)
+
+pdf_renderer = PdfRenderer(
+    os.path.join(DIRETORIO_BASE, LOGO_ARQUIVO),
+    font_path=PDF_FONT_PATH or None,
+    max_cache=PDF_CACHE_ENTRIES
+)
+
+def carregar_estaticos():
+    """Registra o logo (com hash) e o index.html, que passa a apontar para a URL com hash
+
+    Se houver um build em dia (build_assets.py), o index.html vem dele,
+    junto com os .css/.js separados e já nomeados com hash.
+    """
+    assets = StaticAssets(DIRETORIO_BASE)
+    origem = os.path.join(DIRETORIO_BASE, 'index.html')
+    manifesto = ler_manifesto(STATIC_BUILD_DIR, origem)
+    arquivos = [(LOGO_ARQUIVO, 'public, max-age=86400', True, None)]
+    if manifesto is not None:
+        arquivos += [(nome, 'no-cache', nome, os.path.join(STATIC_BUILD_DIR, nome)) for nome in manifesto['arquivos']]
+        arquivos.append(('index.html', 'no-cache', False, os.path.join(STATIC_BUILD_DIR, manifesto['index'])))
+    else:
+        arquivos.append(('index.html', 'no-cache', False, origem))
+    
+    for nome, cache_control, fingerprint, caminho in arquivos:
+        try:
+            assets.adicionar(nome, cache_control=cache_control, fingerprint=fingerprint, caminho=caminho)
+        except FileNotFoundError:
+            print(f"⚠️ Arquivo estático não encontrado: {nome}")
+    return assets
+
+static_assets = carregar_estaticos()
+
+catalog_cache = CatalogCache(
+    carregar_fornecedores_azure,
+    ttl=CATALOG_TTL,
+    stale_ttl=CATALOG_STALE_TTL,
+    snapshot=CATALOG_SNAPSHOT or None,
+    semente=CATALOG_SNAPSHOT_SEED or None
+)
+# Responde /api/suppliers desde o primeiro request, mesmo com o Azure fora
+catalog_cache.carregar_snapshot()
+
+supplier_search = SupplierSearch(catalog_cache.get)
+
+def token_admin_valido(token):
+    """Confere o X-Admin-Token; sem ADMIN_TOKEN configurado ninguém é administrador"""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest((token or '').encode(), ADMIN_TOKEN.encode())
+
+def admin_autorizado():
+    """Confere o token de administração do request atual"""
+    return token_admin_valido(request.headers.get('X-Admin-Token'))
+
+@api.route('/api/suppliers')
+def get_suppliers():
+    """API para buscar fornecedores (catálogo em cache com ETag)"""
+    try:
+        catalogo = catalog_cache.get()
     except Exception as e:
         print(f"❌ Erro na API: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
+    
+    response = Response(catalogo.corpo, mimetype='application/json')
+    response.set_etag(catalogo.etag)
+    # Navegador sempre revalida; se nada mudou recebe 304 sem corpo
+    response.headers['Cache-Control'] = 'no-cache'
+    if catalog_cache.expirado(catalogo):
+        # Azure fora por mais que ttl + stale_ttl: o catálogo pode estar desatualizado
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    return response.make_conditional(request)
+
+@api.route('/api/suppliers/search')
+def search_suppliers():
+    """Busca de fornecedores para o Select2 (sem acento, por prefixo, tolera um erro de digitação)"""
+    try:
+        limite = min(int(request.args.get('limit') or SUPPLIER_SEARCH_LIMIT), SUPPLIER_SEARCH_LIMIT)
+        if limite < 1:
+            raise ValueError('limit deve ser positivo')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        resultados = supplier_search.buscar(request.args.get('q', ''), limite)
+    except Exception as e:
+        print(f"❌ Erro na busca de fornecedores: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+    return jsonify({
+        'success': True,
+        # id = posição no catálogo; com os preços o front-end não precisa baixar /api/suppliers
+        'resultados': [{'id': indice, **f.para_dict()} for indice, f in resultados]
+    })
+
+@api.route('/api/admin/suppliers/refresh', methods=['POST'])
+def refresh_suppliers():
+    """Força a recarga do catálogo de fornecedores a partir do Azure"""
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    
+    try:
+        catalogo = catalog_cache.refresh()
+    except Exception as e:
+        print(f"❌ Erro ao recarregar catálogo: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'fornecedores': len(catalogo.fornecedores),
+        'etag': catalogo.etag
+    })
+
+def receber_foto():
+    """Lê a foto do POST: bytes crus (image/*), multipart (campo 'photo') ou JSON com data URL
+
+    Devolve uma Foto. Corpos binários são lidos em blocos e abortados ao passar
+    de PHOTO_MAX_BYTES (FotoGrandeDemais); formatos inválidos levantam ValueError.
+    """
+    # Teto do corpo inteiro: base64 e multipart têm overhead sobre a imagem
+    request.max_content_length = PHOTO_MAX_BYTES * 4 // 3 + 64 * 1024
+    if request.content_length and request.content_length > request.max_content_length:
+        raise FotoGrandeDemais('Foto maior que o permitido')
+    
+    if request.mimetype in TIPOS_FOTO:
+        return Foto(ler_em_blocos(request.stream, PHOTO_MAX_BYTES), request.mimetype)
+    
+    if request.mimetype == 'multipart/form-data':
+        arquivo = request.files.get('photo')
+        if arquivo is None:
+            raise ValueError("Campo 'photo' não enviado")
+        if arquivo.mimetype not in TIPOS_FOTO:
+            raise ValueError(f"Tipo de imagem não suportado: {arquivo.mimetype}")
+        return Foto(ler_em_blocos(arquivo.stream, PHOTO_MAX_BYTES), arquivo.mimetype)
+    
+    data = request.get_json(silent=True) or {}
+    if not data.get('photo'):
+        raise ValueError('Foto não fornecida')
+    return ler_data_url(data['photo'])
+
+def guardar_foto(session_id, foto):
+    """Grava a foto da sessão; com Pillow ela é normalizada no pool de imagens antes
+
+    Não espera o processamento: devolve assim que o trabalho é enviado ao pool.
+    A gravação (e o aviso a quem espera) acontece quando ele termina; se falhar,
+    a sessão fica marcada e a espera/miniatura respondem com o erro.
+    Devolve False só se a foto recebida já passar do limite do store.
+    """
+    if len(foto.dados) > photo_store.max_entry_bytes:
+        return False
+    # Falhas de um envio anterior da mesma sessão não valem para este
+    photo_store.discard(f'falha:{session_id}')
+    photo_store.discard(f'falha:thumb:{session_id}')
+    if not image_pipeline.disponivel:
+        return photo_store.put(session_id, foto.dados, foto.content_type)
+    
+    def concluir(futuro):
+        try:
+            try:
+                variantes = futuro.result()
+            except Exception as e:
+                print(f"⚠️ Foto da sessão {session_id} não pôde ser processada, guardando original: {e}")
+                # Sem miniatura: marcada antes de a espera acordar com a original
+                registrar_falha_foto(f'thumb:{session_id}', 'A foto não pôde ser processada')
+                if not photo_store.put(session_id, foto.dados, foto.content_type):
+                    registrar_falha_foto(session_id, 'Foto maior que o permitido')
+                return
+            # Miniatura antes: quando a espera acordar ela já existe
+            if not photo_store.put(f'thumb:{session_id}', variantes.miniatura, 'image/jpeg'):
+                print(f"⚠️ Miniatura da sessão {session_id} não coube no store")
+            if not photo_store.put(session_id, variantes.assinatura, 'image/jpeg'):
+                print(f"❌ Foto da sessão {session_id} não foi gravada: maior que o limite do store")
+                registrar_falha_foto(session_id, 'Foto maior que o permitido')
+        except Exception as e:
+            print(f"❌ Erro ao gravar a foto da sessão {session_id}: {e}")
+            try:
+                registrar_falha_foto(session_id, 'Erro ao gravar a foto')
+            except Exception:
+                pass
+    
+    # Quem espera é avisado pelo put() quando o processamento terminar
+    image_pipeline.submit(foto.dados).add_done_callback(concluir)
+    return True
+
+def registrar_falha_foto(chave, mensagem):
+    """Marca a foto (session_id) ou a miniatura (thumb:session_id) como falha; expira junto com as fotos"""
+    photo_store.put(f'falha:{chave}', mensagem.encode('utf-8'), 'text/plain')
+
+def falha_da_foto(chave):
+    """Mensagem da falha registrada para a foto ou a miniatura, ou None"""
+    marca = photo_store.get(f'falha:{chave}')
+    return None if marca is None else marca.dados.decode('utf-8')
+
+def responder_foto(foto):
+    """Foto em bytes com o content type original (?format=raw) ou JSON com data URL"""
+    if request.args.get('format') == 'raw':
+        response = Response(foto.dados, mimetype=foto.content_type)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    return jsonify({'status': 'found', 'photo': montar_data_url(foto)})
+
+@api.route('/api/photo/<session_id>', methods=['GET', 'POST'])
+def photo_session(session_id):
+    """Foto da sessão de QR code: o celular envia (POST) e o desktop retira (GET)"""
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+    
+    if request.method == 'GET':
+        foto = photo_store.take(session_id)
+        if foto is None:
+            return jsonify({'status': 'not_found'}), 404
+        print(f"📷 Foto entregue para a sessão {session_id}")
+        return responder_foto(foto)
+    
+    try:
+        foto = receber_foto()
+    except (FotoGrandeDemais, RequestEntityTooLarge):
+        return jsonify({'status': 'error', 'error': 'Foto maior que o permitido'}), 413
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    
+    if not guardar_foto(session_id, foto):
+        return jsonify({'status': 'error', 'error': 'Foto maior que o permitido'}), 413
+    
+    print(f"📷 Foto recebida para a sessão {session_id} ({len(foto.dados)} bytes, {foto.content_type})")
+    return jsonify({'status': 'success'})
+
+@api.route('/api/photo/<session_id>/thumb')
+def photo_session_thumb(session_id):
+    """Miniatura JPEG da foto da sessão (pode ser lida várias vezes até expirar)"""
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+    
+    miniatura = photo_store.get(f'thumb:{session_id}')
+    if miniatura is None:
+        falha = falha_da_foto(f'thumb:{session_id}') or falha_da_foto(session_id)
+        if falha is not None:
+            return jsonify({'status': 'error', 'error': falha}), 422
+        return jsonify({'status': 'not_found'}), 404
+    response = Response(miniatura.dados, mimetype=miniatura.content_type)
+    response.headers['Cache-Control'] = f'private, max-age={PHOTO_TTL}'
+    return response
+
+@api.route('/api/photo/<session_id>/wait')
+def photo_session_wait(session_id):
+    """Consulta a foto da sessão sem bloquear: cada espera ocuparia uma thread do gthread
+
+    Com ?format=raw devolve os bytes da imagem, ou 204 se ela ainda não chegou;
+    o Retry-After diz quando consultar de novo. Se o processamento da foto
+    falhou responde 422 com o erro. ?timeout= só vale no ASGI.
+    """
+    if not SESSION_ID_VALIDO.match(session_id):
+        return jsonify({'status': 'error', 'error': 'Sessão inválida'}), 400
+    
+    foto = photo_store.take(session_id)
+    if foto is None:
+        falha = falha_da_foto(session_id)
+        if falha is not None:
+            return jsonify({'status': 'error', 'error': falha}), 422
+        if request.args.get('format') == 'raw':
+            response = Response(status=204)
+        else:
+            response = jsonify({'status': 'waiting'})
+        response.headers['Retry-After'] = str(PHOTO_POLL_RETRY)
+        return response
+    print(f"📷 Foto entregue para a sessão {session_id}")
+    return responder_foto(foto)
+
+# Linhas de um fornecedor/CNPJ entre duas datas, no formato esperado por montar_recibo
+SQL_REFEICOES_PERIODO = f"""
+    SELECT data_refeicao, {', '.join(CAMPOS_REFEICAO)}, {', '.join(f'valor_{campo}' for campo in CAMPOS_REFEICAO)},
+           {', '.join(f'total_{campo}' for campo in CAMPOS_REFEICAO)}
+    FROM FORNECEDORES.refeicoes
+    WHERE cnpj = %s AND fornecedor = %s AND data_refeicao BETWEEN %s AND %s
+    ORDER BY data_refeicao
+"""
+
+def buscar_refeicoes_periodo(cnpj, fornecedor, inicio, fim):
+    """Linhas gravadas de um fornecedor/CNPJ entre duas datas: (data, quantidades..., valores..., totais...)"""
+    with pg_pool.connection() as connection:
+        if not connection:
+            raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+        
+        cursor = connection.cursor()
+        cursor.execute(SQL_REFEICOES_PERIODO, (cnpj, fornecedor, inicio, fim))
+        linhas = cursor.fetchall()
+        cursor.close()
+    return linhas
+
+@api.route('/api/pdf', methods=['POST'])
+def order_pdf():
+    """PDF do pedido da quinzena gerado a partir das linhas gravadas e da foto da assinatura
+
+    Corpo: {cnpj, fornecedor, ano, mes, quinzena, photo (data URL), data_hora, local}.
+    """
+    if not pdf_renderer.disponivel:
+        return jsonify({'success': False, 'error': 'Geração de PDF no servidor indisponível'}), 501
+    
+    data = request.get_json(silent=True) or {}
+    fornecedor = data.get('fornecedor', '')
+    # refeicoes guarda só os dígitos (saveOrderToDatabase envia cleanCNPJ)
+    cnpj = somente_digitos(data.get('cnpj'))
+    try:
+        if not fornecedor or not cnpj:
+            raise ValueError('Fornecedor e CNPJ são obrigatórios')
+        inicio, fim = limites_quinzena(data.get('ano'), data.get('mes'), data.get('quinzena'))
+        foto = ler_data_url(data['photo']).dados if data.get('photo') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        linhas = buscar_refeicoes_periodo(cnpj, fornecedor, inicio, fim)
+        if not linhas:
+            return jsonify({'success': False, 'error': 'Nenhum pedido gravado nesta quinzena'}), 404
+        recibo = montar_recibo(
+            linhas, fornecedor, cnpj, inicio.year, inicio.month, data.get('quinzena'),
+            foto=foto, data_hora=data.get('data_hora', ''), local=data.get('local', '')
+        )
+        sha, pdf = pdf_renderer.render(recibo)
+    except Exception as e:
+        print(f"❌ Erro ao gerar PDF: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    nome_arquivo = nome_arquivo_pdf(recibo)
+    # send_file entrega em blocos (wsgi.file_wrapper); o ETag é o hash do conteúdo do recibo
+    return send_file(
+        io.BytesIO(pdf),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=nome_arquivo,
+        etag=sha,
+        max_age=0
+    )
+
+@api.route('/api/reports/resumo')
+def report_summary():
+    """Totais de uma quinzena de um fornecedor (uma linha de FORNECEDORES.resumo_quinzena)
+
+    Parâmetros: cnpj, fornecedor, ano, mes, quinzena.
+    """
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    cnpj = somente_digitos(request.args.get('cnpj'))
+    fornecedor = request.args.get('fornecedor', '')
+    try:
+        if not cnpj or not fornecedor:
+            raise ValueError('cnpj e fornecedor são obrigatórios')
+        inicio, fim = limites_quinzena(request.args.get('ano'), request.args.get('mes'), request.args.get('quinzena'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        with pg_pool.connection() as connection:
+            if not connection:
+                raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+            
+            cursor = connection.cursor()
+            resumo = buscar_resumo(cursor, cnpj, fornecedor, inicio)
+            cursor.close()
+    except Exception as e:
+        print(f"❌ Erro no resumo: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'cnpj': cnpj,
+        'fornecedor': fornecedor,
+        'data_inicio': inicio.isoformat(),
+        'data_fim': fim.isoformat(),
+        'resumo': resumo
+    })
 
-@app.route('/api/photo/<session_id>')
-def get_photo(session_id):
-    """API para fotos (placeholder)"""
-    return jsonify({'message': 'Photo API - implementar se necessário'})
+@api.route('/api/reports/<agrupamento>')
+def report(agrupamento):
+    """Somas de quantidades e totais por fornecedores, projetos ou periodos (quinzenas)
 
-@app.route('/api/save-order', methods=['POST'])
+    Filtros: data_inicio, data_fim, ano, mes, quinzena, cnpj.
+    """
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    try:
+        filtros = ler_filtros(request.args)
+        projetos = ()
+        if agrupamento == 'projetos':
+            projetos = [(f['fornecedor'], f.get('projeto', '')) for f in catalog_cache.get().fornecedores]
+        sql, parametros = montar_consulta(agrupamento, filtros, projetos)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro no relatório: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    try:
+        with pg_pool.connection() as connection:
+            if not connection:
+                raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+            
+            cursor = connection.cursor()
+            cursor.execute(sql, parametros)
+            linhas = cursor.fetchall()
+            cursor.close()
+    except Exception as e:
+        print(f"❌ Erro no relatório: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'agrupamento': agrupamento,
+        'filtros': {chave: valor.isoformat() if isinstance(valor, date) else valor for chave, valor in filtros.items()},
+        **montar_relatorio(agrupamento, linhas)
+    })
+
+@api.route('/api/orders')
+def list_orders():
+    """Pedidos já gravados de um CNPJ, do mais recente ao mais antigo, em páginas
+
+    Parâmetros: cnpj (obrigatório), fornecedor, data_inicio, data_fim, ano,
+    mes, quinzena, limit e cursor (o proximo_cursor da página anterior).
+    """
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    try:
+        filtros = ler_filtros(request.args)
+        if not filtros['cnpj']:
+            raise ValueError('cnpj é obrigatório')
+        limite = ler_limite(request.args.get('limit'))
+        cursor_pagina = decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        sql, parametros = montar_consulta_historico(
+            filtros, request.args.get('fornecedor') or None, cursor_pagina, limite
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        with pg_pool.connection() as connection:
+            if not connection:
+                raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+            
+            cursor = connection.cursor()
+            cursor.execute(sql, parametros)
+            linhas = cursor.fetchall()
+            cursor.close()
+    except Exception as e:
+        print(f"❌ Erro no histórico: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({'success': True, **montar_pagina(linhas, limite)})
+
+@api.route('/api/export/<formato>')
+def export_orders(formato):
+    """Exporta FORNECEDORES.refeicoes em csv ou xlsx (filtros como em /api/reports)
+
+    O CSV é lido por cursor nomeado e enviado em pedaços enquanto é lido; o
+    XLSX é montado em arquivo temporário e enviado do disco.
+    """
+    if not admin_autorizado():
+        return jsonify({'success': False, 'error': 'Não autorizado'}), 403
+    if formato not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'error': f'Formato inválido: {formato}'}), 400
+    if formato == 'xlsx' and Workbook is None:
+        return jsonify({'success': False, 'error': 'Exportação XLSX indisponível (openpyxl não instalado)'}), 501
+    
+    try:
+        sql, parametros = montar_consulta_exportacao(ler_filtros(request.args))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    nome_arquivo = f"refeicoes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{formato}"
+    
+    if formato == 'xlsx':
+        try:
+            with pg_pool.connection() as connection:
+                if not connection:
+                    raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+                arquivo = gravar_xlsx(ler_em_lotes(connection, sql, parametros, EXPORT_CHUNK_ROWS))
+        except Exception as e:
+            print(f"❌ Erro na exportação: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+        return send_file(
+            arquivo,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=nome_arquivo
+        )
+    
+    def gerar():
+        with pg_pool.connection() as connection:
+            if not connection:
+                raise RuntimeError('Erro de conexão com o banco PostgreSQL')
+            try:
+                yield from gerar_csv(ler_em_lotes(connection, sql, parametros, EXPORT_CHUNK_ROWS))
+            except GeneratorExit:
+                # Cliente desconectou: o finally de ler_em_lotes já fechou o cursor,
+                # então a conexão volta ao pool normalmente
+                return
+    
+    # O primeiro pedaço já executa a consulta: erro aqui ainda vira um 500 em JSON
+    corpo = gerar()
+    try:
+        primeiro = next(corpo)
+    except Exception as e:
+        print(f"❌ Erro na exportação: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    print(f"📤 Exportando refeições ({formato})")
+    response = Response(
+        itertools.chain([primeiro], corpo),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}', 'Cache-Control': 'no-store'}
+    )
+    # chain() não repassa o close() do servidor: sem isto a conexão só voltaria no GC
+    response.call_on_close(corpo.close)
+    return response
+
+@api.route('/api/save-order', methods=['POST'])
+@idempotente(idempotency_cache)
 def save_order():
     """API para salvar pedidos com quantidades no banco"""
     try:
@@ -293,29 +935,8 @@ def save_order():
                 'error': 'Dados não fornecidos'
             }), 400
         
-        # Verificar se é formato novo (individual) ou antigo (múltiplos)
-        if 'pedidos' in data:
-            # Formato antigo com múltiplos pedidos
-            funcionario = data.get('funcionario', '')
-            cpf = data.get('cpf', '')
-            data_pedido = data.get('data', '')
-            pedidos = data.get('pedidos', [])
-        else:
-            # Formato novo - pedido individual
-            funcionario = data.get('funcionario', 'Usuario')
-            cpf = data.get('cnpj', '')  # Interface envia 'cnpj' em vez de 'cpf'
-            data_pedido = data.get('data_refeicao', '')
-            
-            # Criar array de pedidos com um item
-            pedidos = [{
-                'fornecedor': data.get('fornecedor', ''),
-                'cafe': data.get('cafe', 0),
-                'almoco_marmitex': data.get('almoco_marmitex', 0),
-                'almoco_local': data.get('almoco_local', 0),
-                'janta_marmitex': data.get('janta_marmitex', 0),
-                'janta_local': data.get('janta_local', 0),
-                'gelo': data.get('gelo', 0)
-            }]
+        # Formato novo (individual) ou antigo (lista de pedidos)
+        funcionario, cpf, data_pedido, pedidos = ler_pedido(data)
         
         if not pedidos or len(pedidos) == 0:
             return jsonify({
@@ -325,120 +946,63 @@ def save_order():
         
         print(f"💾 Salvando pedido para {funcionario} (CPF: {cpf}) - {len(pedidos)} itens - Data: {data_pedido}")
         
-        # Conectar ao PostgreSQL para salvar pedidos
-        connection = conectar_postgresql()
-        if not connection:
+        try:
+            data_pedido = validar_data_periodo(data_pedido)
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': 'Erro de conexão com o banco PostgreSQL'
-            }), 500
+                'error': str(e)
+            }), 400
         
-        cursor = connection.cursor()
+        # Resolver os preços de todos os fornecedores do pedido de uma vez,
+        # antes de qualquer INSERT (e sem segurar conexão do PostgreSQL)
+        try:
+            precos, precos_do_cache = buscar_valores_fornecedores(pedido.get('fornecedor', '') for pedido in pedidos)
+        except PrecosIndisponiveis as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
         
-        # Salvar cada item do pedido
-        itens_salvos = 0
-        for pedido in pedidos:
-            try:
-                fornecedor = pedido.get('fornecedor', '')
-                cnpj = cpf  # usar o CNPJ do pedido
-                data_refeicao = data_pedido
-                
-                # Quantidades
-                cafe_qtd = float(pedido.get('cafe', 0))
-                almoco_marmitex_qtd = float(pedido.get('almoco_marmitex', 0))
-                almoco_local_qtd = float(pedido.get('almoco_local', 0))
-                janta_marmitex_qtd = float(pedido.get('janta_marmitex', 0))
-                janta_local_qtd = float(pedido.get('janta_local', 0))
-                gelo_qtd = float(pedido.get('gelo', 0))
-                
-                # Buscar valores unitários do SQL Azure
-                sql_conn = conectar_azure_sql()
-                if sql_conn:
-                    sql_cursor = sql_conn.cursor(as_dict=True)
-                    sql_cursor.execute("""
-                        SELECT TIPO_FORN, VALOR 
-                        FROM tb_fornecedores 
-                        WHERE FORNECEDOR = %s
-                    """, (fornecedor,))
-                    
-                    valores = sql_cursor.fetchall()
-                    sql_cursor.close()
-                    sql_conn.close()
-                    
-                    # Mapear valores unitários
-                    valor_cafe = 0.0
-                    valor_almoco_marmitex = 0.0
-                    valor_almoco_local = 0.0
-                    valor_janta_marmitex = 0.0
-                    valor_janta_local = 0.0
-                    valor_gelo = 0.0
-                    
-                    for row in valores:
-                        tipo = row['TIPO_FORN'].strip().upper() if row['TIPO_FORN'] else ''
-                        valor = float(row['VALOR']) if row['VALOR'] else 0.0
-                        
-                        if tipo in ['CAFÉ', 'CAFE']:
-                            valor_cafe = valor
-                        elif tipo == 'ALMOÇO MARMITEX':
-                            valor_almoco_marmitex = valor
-                        elif tipo == 'ALMOÇO LOCAL':
-                            valor_almoco_local = valor
-                        elif tipo == 'JANTA MARMITEX':
-                            valor_janta_marmitex = valor
-                        elif tipo == 'JANTA LOCAL':
-                            valor_janta_local = valor
-                        elif tipo == 'GELO':
-                            valor_gelo = valor
-                
-                # Calcular totais
-                total_cafe = cafe_qtd * valor_cafe
-                total_almoco_marmitex = almoco_marmitex_qtd * valor_almoco_marmitex
-                total_almoco_local = almoco_local_qtd * valor_almoco_local
-                total_janta_marmitex = janta_marmitex_qtd * valor_janta_marmitex
-                total_janta_local = janta_local_qtd * valor_janta_local
-                total_gelo = gelo_qtd * valor_gelo
-                
-                # Inserir no PostgreSQL
-                query = """
-                INSERT INTO FORNECEDORES.refeicoes 
-                (data_refeicao, cnpj, fornecedor, cafe, almoco_marmitex, almoco_local, 
-                 janta_marmitex, janta_local, gelo, valor_cafe, valor_almoco_marmitex,
-                 valor_almoco_local, valor_janta_marmitex, valor_janta_local, valor_gelo,
-                 total_cafe, total_almoco_marmitex, total_almoco_local, 
-                 total_janta_marmitex, total_janta_local, total_gelo)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                cursor.execute(query, (
-                    data_refeicao, cnpj, fornecedor,
-                    cafe_qtd, almoco_marmitex_qtd, almoco_local_qtd,
-                    janta_marmitex_qtd, janta_local_qtd, gelo_qtd,
-                    valor_cafe, valor_almoco_marmitex, valor_almoco_local,
-                    valor_janta_marmitex, valor_janta_local, valor_gelo,
-                    total_cafe, total_almoco_marmitex, total_almoco_local,
-                    total_janta_marmitex, total_janta_local, total_gelo
-                ))
-                
-                itens_salvos += 1
-                print(f"✅ Item salvo: {fornecedor} - Total: R$ {total_cafe + total_almoco_marmitex + total_almoco_local + total_janta_marmitex + total_janta_local + total_gelo:.2f}")
-                
-            except Exception as e:
-                print(f"❌ Erro ao salvar item {fornecedor}: {e}")
-                continue
+        # Montar as linhas em memória; com algum item inválido nada é gravado
+        linhas, erros = montar_linhas_pedido(data_pedido, cpf, pedidos, precos)
         
-        # Confirmar transação
-        connection.commit()
-        cursor.close()
-        connection.close()
+        if erros:
+            print(f"❌ Pedido rejeitado: {len(erros)} itens com erro")
+            return jsonify({
+                'success': False,
+                'error': f'{len(erros)} item(ns) com dados inválidos',
+                'erros': erros
+            }), 400
         
+        # Conectar ao PostgreSQL para salvar pedidos
+        with pg_pool.connection() as connection:
+            if not connection:
+                return jsonify({
+                    'success': False,
+                    'error': 'Erro de conexão com o banco PostgreSQL'
+                }), 500
+            
+            cursor = connection.cursor()
+            resultado = gravar_refeicoes(cursor, linhas, COPY_THRESHOLD)
+            
+            # Confirmar transação
+            connection.commit()
+            cursor.close()
+        
+        ids = resultado['ids'] or []
+        itens_salvos = resultado['linhas']
         print(f"✅ Pedido salvo: {itens_salvos} itens para {funcionario}")
         
         return jsonify({
             'success': True,
             'message': f'Pedido salvo com sucesso! {itens_salvos} itens processados',
             'itens_salvos': itens_salvos,
+            'id': ids[0] if ids else None,
+            'ids': ids,
             'funcionario': funcionario,
-            'data_pedido': data_pedido
+            'data_pedido': data_pedido.isoformat(),
+            'precos_do_cache': precos_do_cache
         })
         
     except Exception as e:
@@ -450,13 +1014,137 @@ def save_order():
             'error': str(e)
         }), 500
 
+@api.route('/api/save-order/quinzena', methods=['POST'])
+@idempotente(idempotency_cache)
+def save_order_quinzena():
+    """API para salvar todos os dias de uma quinzena em uma única transação
+
+    Corpo: {cnpj, fornecedor, ano, mes, quinzena, dias: [{data_refeicao, cafe, ...}]}.
+    Se algum dia for inválido nada é gravado e os erros voltam por dia.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'Dados não fornecidos'
+            }), 400
+        
+        # refeicoes guarda só os dígitos (cnpj CHAR(14)), como o /api/pdf consulta
+        cnpj = somente_digitos(data.get('cnpj'))
+        fornecedor = data.get('fornecedor', '')
+        ano = data.get('ano')
+        mes = data.get('mes')
+        quinzena = data.get('quinzena')
+        dias = data.get('dias') or []
+        
+        if not fornecedor or not dias:
+            return jsonify({
+                'success': False,
+                'error': 'Fornecedor e dias do período são obrigatórios'
+            }), 400
+        
+        print(f"📋 Quinzena recebida: {fornecedor} (CNPJ: {cnpj}) - {len(dias)} dias - {quinzena}ª/{mes}/{ano}")
+        
+        # Preços resolvidos uma única vez para o período inteiro
+        try:
+            precos, precos_do_cache = buscar_valores_fornecedores([fornecedor])
+        except PrecosIndisponiveis as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        valores = precos.get(fornecedor, {})
+        
+        # Validar e montar todas as linhas antes de abrir a transação
+        linhas, erros = montar_linhas_quinzena(dias, cnpj, fornecedor, valores, ano, mes, quinzena)
+        
+        if erros:
+            print(f"❌ Quinzena rejeitada: {len(erros)} dias com erro")
+            return jsonify({
+                'success': False,
+                'error': f'{len(erros)} dia(s) com dados inválidos',
+                'erros': erros
+            }), 400
+        
+        # Gravar o período inteiro com um INSERT multi-linha e um único commit
+        with pg_pool.connection() as connection:
+            if not connection:
+                return jsonify({
+                    'success': False,
+                    'error': 'Erro de conexão com o banco PostgreSQL'
+                }), 500
+            
+            cursor = connection.cursor()
+            resultado = gravar_refeicoes(cursor, linhas, COPY_THRESHOLD)
+            connection.commit()
+            cursor.close()
+        
+        ids = resultado['ids'] or [None] * len(linhas)
+        print(f"✅ Quinzena salva: {resultado['linhas']} dias para {fornecedor}")
+        
+        return jsonify({
+            'success': True,
+            'message': f"Quinzena salva com sucesso! {resultado['linhas']} dias processados",
+            'itens_salvos': resultado['linhas'],
+            'precos_do_cache': precos_do_cache,
+            'dias': [
+                {
+                    'data_refeicao': linha[0].isoformat(),
+                    'id': id_refeicao,
+                    'total': round(total_da_linha(linha), 2)
+                }
+                for linha, id_refeicao in zip(linhas, ids)
+            ]
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao salvar quinzena: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def aquecer_pools():
+    """Pré-abre as conexões mínimas dos pools (uma vez por processo)"""
+    # Confere o catálogo do snapshot com o Azure sem segurar o boot
+    catalog_cache.atualizar()
+    print(f"🔧 Aquecendo pool Azure: {azure_pool.warm_up()} conexões abertas")
+    print(f"🔧 Aquecendo pool PostgreSQL: {pg_pool.warm_up()} conexões abertas")
+
+def fechar_pools():
+    """Fecha as conexões ociosas (ex.: no processo master antes do fork)"""
+    azure_pool.close_all()
+    pg_pool.close_all()
+
+def create_app():
+    """Cria a aplicação Flask com todas as rotas registradas"""
+    app = Flask(__name__)
+    CORS(app)  # Habilita CORS para todas as rotas
+    app.register_blueprint(api)
+    return app
+
 if __name__ == '__main__':
-    print("🚀 Iniciando servidor Flask...")
+    print("🚀 Iniciando servidor Flask (modo desenvolvimento)...")
+    print("💡 Em produção use: gunicorn -c gunicorn.conf.py")
     print("📊 Interface: http://localhost:5000")
     print("🔌 APIs disponíveis:")
     print("   GET  /api/suppliers - Buscar fornecedores")
-    print("   GET  /api/photo/<id> - Fotos")
+    print("   POST /api/admin/suppliers/refresh - Recarregar catálogo")
+    print("   GET/POST /api/photo/<id> - Fotos das sessões de QR code")
+    print("   GET  /api/photo/<id>/wait - Consulta a foto (Retry-After)")
+    print("   GET  /api/photo/<id>/thumb - Miniatura da foto")
     print("   POST /api/save-order - Salvar pedidos")
+    print("   POST /api/save-order/quinzena - Salvar quinzena inteira")
+    print("   POST /api/pdf - PDF do pedido da quinzena")
+    print("   GET  /api/reports/<fornecedores|projetos|periodos> - Totais agregados")
+    print("   GET  /api/reports/resumo - Totais de uma quinzena (tabela de resumo)")
+    print("   GET  /api/orders - Histórico de pedidos (paginado por cursor)")
+    print("   GET  /api/export/<csv|xlsx> - Exportação das refeições")
+    print("   GET  /api/stats - Estatísticas dos pools")
     print("🔧 Configurações:")
     print(f"   SQL Server: {SQL_SERVER}")
     print(f"   SQL Database: {SQL_DATABASE}")
@@ -464,9 +1152,12 @@ if __name__ == '__main__':
     print(f"   PostgreSQL: {PG_HOST}:{PG_PORT}")
     print(f"   PostgreSQL Database: {PG_DATABASE}")
     
-    # Inicializar tabela de pedidos no PostgreSQL
-    print("🔧 Inicializando tabela de refeições no PostgreSQL...")
-    criar_tabela_pedidos_postgresql()
+    # Aplicar migrações do PostgreSQL (tabelas e índices)
+    print("🔧 Verificando migrações do PostgreSQL...")
+    migrar_banco_postgresql()
+    
+    # Pré-abrir conexões mínimas dos pools
+    aquecer_pools()
     
     print("✅ Iniciando servidor...")
     
@@ -474,7 +1165,7 @@ if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     
     try:
-        app.run(host='0.0.0.0', port=port, debug=False)
+        create_app().run(host='0.0.0.0', port=port, debug=False)
     except Exception as e:
         print(f"❌ Erro: {e}")
         import traceback
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Fotos das sessões de QR code (celular envia, desktop retira uma única vez)"""
+
+import base64
+import binascii
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# IDs gerados pelo front-end: session_<timestamp>_<aleatório>
+SESSION_ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Tipos de imagem aceitos no upload
+TIPOS_FOTO = ('image/jpeg', 'image/png', 'image/webp')
+
+# Foto guardada: bytes da imagem e o content type com que ela chegou
+Foto = namedtuple('Foto', ['dados', 'content_type'])
+
+
+class FotoGrandeDemais(ValueError):
+    """Upload acima do tamanho máximo permitido"""
+
+
+def ler_em_blocos(stream, limite, bloco=64 * 1024):
+    """Lê o stream em blocos, abortando assim que passar de `limite` bytes"""
+    dados = bytearray()
+    while True:
+        parte = stream.read(bloco)
+        if not parte:
+            return bytes(dados)
+        dados += parte
+        if len(dados) > limite:
+            raise FotoGrandeDemais(f"Foto maior que {limite} bytes")
+
+
+def ler_data_url(texto):
+    """Converte 'data:image/jpeg;base64,...' (formato antigo do front-end) em Foto"""
+    cabecalho, separador, conteudo = str(texto).partition(',')
+    content_type = cabecalho[len('data:'):].split(';')[0] if cabecalho.startswith('data:') else ''
+    if not separador or ';base64' not in cabecalho or content_type not in TIPOS_FOTO:
+        raise ValueError('Foto deve ser um data URL base64 de imagem')
+    try:
+        return Foto(base64.b64decode(conteudo, validate=True), content_type)
+    except (binascii.Error, ValueError):
+        raise ValueError('Base64 da foto inválido')
+
+
+def montar_data_url(foto):
+    """Foto -> data URL (resposta JSON compatível com o front-end antigo)"""
+    return f"data:{foto.content_type};base64,{base64.b64encode(foto.dados).decode('ascii')}"
+
+
+def limitar_espera(valor, maximo):
+    """Converte o ?timeout= do long-poll em segundos entre 0 e `maximo`"""
+    try:
+        segundos = float(valor)
+    except (TypeError, ValueError):
+        return maximo
+    return max(0.0, min(segundos, maximo))
+
+
+class PhotoSessionStore:
+    """Armazena as fotos com orçamento total de bytes, TTL por entrada e LRU
+
+    - put() substitui a foto da sessão e expulsa as mais antigas até caber
+    - take() entrega a foto e a remove (leitura única)
+    - entradas vencidas somem no acesso e a cada gravação
+    - quem espera uma sessão registra um callback, chamado quando a foto chega
+    """
+
+    # Só o próprio processo grava aqui: os callbacks bastam, sem polling
+    poll_interval = None
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=2 * 1024 * 1024, ttl=600):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.ttl = ttl
+        self._itens = OrderedDict()   # session_id -> (expira_em, tamanho, Foto)
+        self._bytes = 0
+        self._ouvintes = {}           # session_id -> [callback, ...]
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'gravadas': 0,
+            'rejeitadas': 0,
+            'expiradas': 0,
+            'expulsas': 0,
+            'esperas': 0,
+            'notificacoes': 0,
+        }
+
+    def _remover(self, session_id):
+        _, tamanho, foto = self._itens.pop(session_id)
+        self._bytes -= tamanho
+        return foto
+
+    def _limpar_vencidas(self, agora):
+        # get() move a entrada para o fim (LRU): a ordem não é mais a de vencimento
+        vencidas = [session_id for session_id, (expira_em, _, _) in self._itens.items() if expira_em <= agora]
+        for session_id in vencidas:
+            self._remover(session_id)
+        self._stats['expiradas'] += len(vencidas)
+
+    def put(self, session_id, dados, content_type='image/jpeg'):
+        """Guarda os bytes da foto da sessão; False se ela sozinha passar do limite"""
+        tamanho = len(dados)
+        with self._lock:
+            if tamanho > self.max_entry_bytes:
+                self._stats['rejeitadas'] += 1
+                return False
+            agora = time.monotonic()
+            if session_id in self._itens:
+                self._remover(session_id)
+            self._limpar_vencidas(agora)
+            while self._itens and self._bytes + tamanho > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+                self._stats['expulsas'] += 1
+            self._itens[session_id] = (agora + self.ttl, tamanho, Foto(bytes(dados), content_type))
+            self._bytes += tamanho
+            self._stats['gravadas'] += 1
+            ouvintes = self._ouvintes.pop(session_id, [])
+            self._stats['notificacoes'] += len(ouvintes)
+
+        # Fora do lock: o callback pode voltar a chamar take()
+        for callback in ouvintes:
+            callback()
+        return True
+
+    def take(self, session_id):
+        """Entrega a Foto da sessão e a remove, ou None"""
+        with self._lock:
+            item = self._itens.get(session_id)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    self._remover(session_id)
+                    self._stats['expiradas'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return self._remover(session_id)
+
+    def get(self, session_id):
+        """Devolve a Foto sem removê-la (ex.: miniaturas vistas mais de uma vez), ou None"""
+        with self._lock:
+            item = self._itens.get(session_id)
+            if item is None or item[0] <= time.monotonic():
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            # Lida agora: fica por último na fila de expulsão
+            self._itens.move_to_end(session_id)
+            return item[2]
+
+    def add_listener(self, session_id, callback):
+        """Registra um callback (sem argumentos) para a próxima foto da sessão"""
+        with self._lock:
+            self._ouvintes.setdefault(session_id, []).append(callback)
+            self._stats['esperas'] += 1
+
+    def remove_listener(self, session_id, callback):
+        """Remove um callback ainda não chamado"""
+        with self._lock:
+            ouvintes = self._ouvintes.get(session_id)
+            if ouvintes and callback in ouvintes:
+                ouvintes.remove(callback)
+                if not ouvintes:
+                    del self._ouvintes[session_id]
+
+    def discard(self, session_id):
+        """Descarta a foto da sessão (se houver)"""
+        with self._lock:
+            if session_id in self._itens:
+                self._remover(session_id)
+
+    def stats(self):
+        """Estatísticas do armazenamento"""
+        with self._lock:
+            self._limpar_vencidas(time.monotonic())
+            return {
+                'backend': 'memory',
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes,
+                'ttl': self.ttl,
+                'sessoes': len(self._itens),
+                'bytes': self._bytes,
+                'aguardando': sum(len(ouvintes) for ouvintes in self._ouvintes.values()),
+                **self._stats,
+            }
+
+
+class SQLitePhotoStore(PhotoSessionStore):
+    """Mesma semântica do PhotoSessionStore, em um arquivo SQLite (WAL) compartilhado
+
+    Permite que o celular envie para um worker e o desktop retire em outro.
+    Quem espera no mesmo processo é avisado na hora; fotos gravadas por outro
+    processo são percebidas consultando o arquivo a cada `poll_interval`.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, max_entry_bytes=2 * 1024 * 1024, ttl=600,
+                 poll_interval=0.25):
+        super().__init__(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes, ttl=ttl)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        connection = self._abrir()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS fotos (
+                session_id TEXT PRIMARY KEY,
+                expira_em REAL NOT NULL,
+                gravada_em REAL NOT NULL,
+                tamanho INTEGER NOT NULL,
+                foto BLOB NOT NULL,
+                content_type TEXT NOT NULL DEFAULT 'image/jpeg'
+            )
+        """)
+        # Arquivos criados antes de guardar o content type
+        colunas = {row[1] for row in connection.execute("PRAGMA table_info(fotos)")}
+        if 'content_type' not in colunas:
+            connection.execute("ALTER TABLE fotos ADD COLUMN content_type TEXT NOT NULL DEFAULT 'image/jpeg'")
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_fotos_gravada_em ON fotos (gravada_em)")
+        # Não reaproveitar conexões através de fork (gunicorn importa no master)
+        connection.close()
+
+    def _abrir(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _conexao(self):
+        """Uma conexão por thread e por processo"""
+        atual = getattr(self._local, 'conexao', None)
+        if atual is None or atual[0] != os.getpid():
+            atual = (os.getpid(), self._abrir())
+            self._local.conexao = atual
+        return atual[1]
+
+    def _contar(self, evento, quantidade=1):
+        with self._lock:
+            self._stats[evento] += quantidade
+
+    def put(self, session_id, dados, content_type='image/jpeg'):
+        tamanho = len(dados)
+        if tamanho > self.max_entry_bytes:
+            self._contar('rejeitadas')
+            return False
+
+        connection = self._conexao()
+        agora = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM fotos WHERE session_id = ?", (session_id,))
+            expiradas = connection.execute("DELETE FROM fotos WHERE expira_em <= ?", (agora,)).rowcount
+            ocupados = connection.execute("SELECT COALESCE(SUM(tamanho), 0) FROM fotos").fetchone()[0]
+            expulsas = 0
+            if ocupados + tamanho > self.max_bytes:
+                # Mais antigas primeiro até caber
+                for antiga, tamanho_antiga in connection.execute(
+                    "SELECT session_id, tamanho FROM fotos ORDER BY gravada_em"
+                ).fetchall():
+                    if ocupados + tamanho <= self.max_bytes:
+                        break
+                    connection.execute("DELETE FROM fotos WHERE session_id = ?", (antiga,))
+                    ocupados -= tamanho_antiga
+                    expulsas += 1
+            connection.execute(
+                "INSERT INTO fotos (session_id, expira_em, gravada_em, tamanho, foto, content_type) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, agora + self.ttl, agora, tamanho, sqlite3.Binary(dados), content_type)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._stats['gravadas'] += 1
+            self._stats['expiradas'] += expiradas
+            self._stats['expulsas'] += expulsas
+            ouvintes = self._ouvintes.pop(session_id, [])
+            self._stats['notificacoes'] += len(ouvintes)
+        for callback in ouvintes:
+            callback()
+        return True
+
+    def take(self, session_id):
+        connection = self._conexao()
+        # Quem espera consulta a cada poll_interval e quase sempre não há foto:
+        # a leitura (WAL) não bloqueia ninguém; o lock de escrita só quando há o que retirar
+        if connection.execute("SELECT 1 FROM fotos WHERE session_id = ?", (session_id,)).fetchone() is None:
+            self._contar('misses')
+            return None
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT expira_em, foto, content_type FROM fotos WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM fotos WHERE session_id = ?", (session_id,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        if row is None or row[0] <= time.time():
+            if row is not None:
+                self._contar('expiradas')
+            self._contar('misses')
+            return None
+        self._contar('hits')
+        return Foto(bytes(row[1]), row[2])
+
+    def get(self, session_id):
+        row = self._conexao().execute(
+            "SELECT foto, content_type FROM fotos WHERE session_id = ? AND expira_em > ?", (session_id, time.time())
+        ).fetchone()
+        self._contar('misses' if row is None else 'hits')
+        return None if row is None else Foto(bytes(row[0]), row[1])
+
+    def discard(self, session_id):
+        self._conexao().execute("DELETE FROM fotos WHERE session_id = ?", (session_id,))
+
+    def stats(self):
+        connection = self._conexao()
+        connection.execute("DELETE FROM fotos WHERE expira_em <= ?", (time.time(),))
+        sessoes, ocupados = connection.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM fotos").fetchone()
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes,
+                'ttl': self.ttl,
+                'sessoes': sessoes,
+                'bytes': ocupados,
+                'aguardando': sum(len(ouvintes) for ouvintes in self._ouvintes.values()),
+                **self._stats,
+            }
+
+
+def criar_photo_store(backend, path=None, **limites):
+    """PhotoSessionStore em memória (backend 'memory') ou SQLite compartilhado ('sqlite')"""
+    if backend == 'sqlite':
+        return SQLitePhotoStore(path, **limites)
+    if backend != 'memory':
+        raise ValueError(f"PHOTO_STORE inválido: {backend} (use memory ou sqlite)")
+    return PhotoSessionStore(**limites)
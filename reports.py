@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Relatórios de FORNECEDORES.refeicoes: somas por fornecedor, projeto ou quinzena, feitas no PostgreSQL
+
+Quando o período cobre quinzenas inteiras a consulta vai ao
+FORNECEDORES.resumo_quinzena (mantido por trigger) em vez das linhas diárias.
+"""
+
+import calendar
+import re
+from datetime import date, datetime
+
+from order_store import limites_quinzena
+from supplier_catalog import CAMPOS_REFEICAO
+
+# agrupamento -> (colunas de saída, expressões SQL do SELECT/GROUP BY, ordenação);
+# {data} é a data da linha (data_refeicao ou o início da quinzena no resumo)
+AGRUPAMENTOS = {
+    'fornecedores': (
+        ('cnpj', 'fornecedor'),
+        ('r.cnpj', 'r.fornecedor'),
+        'total DESC',
+    ),
+    'projetos': (
+        ('projeto',),
+        ("COALESCE(p.projeto, '')",),
+        'total DESC',
+    ),
+    'periodos': (
+        ('mes', 'quinzena'),
+        ("to_char({data}, 'YYYY-MM')",
+         "CASE WHEN EXTRACT(DAY FROM {data}) <= 15 THEN 1 ELSE 2 END"),
+        'chave_0, chave_1',
+    ),
+}
+
+# Somas devolvidas em cada linha do relatório
+COLUNAS_SOMA = CAMPOS_REFEICAO + tuple(f'total_{campo}' for campo in CAMPOS_REFEICAO)
+
+# Origem dos dados: (tabela, coluna de data, contagem de dias, total da linha)
+FONTE_REFEICOES = (
+    'FORNECEDORES.refeicoes', 'r.data_refeicao', 'COUNT(*)',
+    ' + '.join(f'r.total_{campo}' for campo in CAMPOS_REFEICAO),
+)
+FONTE_RESUMO = ('FORNECEDORES.resumo_quinzena', 'r.periodo', 'SUM(r.dias)', 'r.total')
+
+
+def _ler_data(valor, nome):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{nome} inválida: '{valor}' (use AAAA-MM-DD)")
+
+
+def ler_filtros(args):
+    """Filtros da query string: data_inicio/data_fim, ano/mes/quinzena e cnpj
+
+    Com ano e mês, a quinzena vira um intervalo de datas; quinzena sozinha
+    filtra a metade do mês em todos os meses. Levanta ValueError se algo
+    estiver mal formado.
+    """
+    inicio = _ler_data(args['data_inicio'], 'data_inicio') if args.get('data_inicio') else None
+    fim = _ler_data(args['data_fim'], 'data_fim') if args.get('data_fim') else None
+    quinzena = args.get('quinzena') or None
+    if quinzena is not None and quinzena not in ('1', '2'):
+        raise ValueError(f"Quinzena inválida: {quinzena}")
+
+    if args.get('ano') and args.get('mes'):
+        if quinzena:
+            periodo_inicio, periodo_fim = limites_quinzena(args['ano'], args['mes'], quinzena)
+            quinzena = None
+        else:
+            ano, mes = int(args['ano']), int(args['mes'])
+            periodo_inicio, periodo_fim = date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+        inicio = max(inicio, periodo_inicio) if inicio else periodo_inicio
+        fim = min(fim, periodo_fim) if fim else periodo_fim
+    elif args.get('ano') or args.get('mes'):
+        raise ValueError('Informe ano e mes juntos')
+
+    if inicio and fim and inicio > fim:
+        raise ValueError('data_inicio posterior a data_fim')
+
+    cnpj = re.sub(r'\D', '', args.get('cnpj', '')) or None
+    return {
+        'data_inicio': inicio,
+        'data_fim': fim,
+        'quinzena': int(quinzena) if quinzena else None,
+        'cnpj': cnpj,
+    }
+
+
+def cobre_quinzenas_inteiras(filtros):
+    """True se o intervalo começa no dia 1/16 e termina no dia 15/fim do mês (ou é aberto)"""
+    inicio, fim = filtros['data_inicio'], filtros['data_fim']
+    if inicio and inicio.day not in (1, 16):
+        return False
+    if fim and fim.day != 15 and fim.day != calendar.monthrange(fim.year, fim.month)[1]:
+        return False
+    return True
+
+
+def montar_consulta(agrupamento, filtros, projetos=()):
+    """SQL (psycopg2) e parâmetros do relatório
+
+    A soma é feita pelo GROUP BY no banco; ROLLUP acrescenta a linha do
+    total geral. `projetos` são pares (fornecedor, projeto) do catálogo,
+    usados só no agrupamento por projeto (refeicoes não guarda o projeto).
+    """
+    if agrupamento not in AGRUPAMENTOS:
+        raise ValueError(f"Agrupamento inválido: {agrupamento}")
+    _, expressoes, ordem = AGRUPAMENTOS[agrupamento]
+    tabela, data, dias, total = FONTE_RESUMO if cobre_quinzenas_inteiras(filtros) else FONTE_REFEICOES
+    expressoes = [expressao.format(data=data) for expressao in expressoes]
+
+    parametros = []
+    juncao = ''
+    if agrupamento == 'projetos':
+        nomes = [fornecedor for fornecedor, _ in projetos]
+        juncao = """
+            LEFT JOIN unnest(%s::text[], %s::text[]) AS p(fornecedor, projeto)
+                   ON p.fornecedor = r.fornecedor"""
+        parametros += [nomes, [projeto for _, projeto in projetos]]
+
+    condicoes = []
+    # Intervalo de datas e cnpj usam os índices por data / (cnpj, data) da tabela
+    if filtros['data_inicio']:
+        condicoes.append(f'{data} >= %s')
+        parametros.append(filtros['data_inicio'])
+    if filtros['data_fim']:
+        condicoes.append(f'{data} <= %s')
+        parametros.append(filtros['data_fim'])
+    if filtros['cnpj']:
+        condicoes.append('r.cnpj = %s')
+        parametros.append(filtros['cnpj'])
+    if filtros['quinzena'] == 1:
+        condicoes.append(f'EXTRACT(DAY FROM {data}) <= 15')
+    elif filtros['quinzena'] == 2:
+        condicoes.append(f'EXTRACT(DAY FROM {data}) > 15')
+
+    somas = ',\n               '.join(f'SUM(r.{coluna}) AS {coluna}' for coluna in COLUNAS_SOMA)
+    chaves = ', '.join(expressoes)
+    sql = f"""
+        SELECT {', '.join(f'{expressao} AS chave_{i}' for i, expressao in enumerate(expressoes))},
+               GROUPING({chaves}) AS geral,
+               {dias} AS dias,
+               {somas},
+               SUM({total}) AS total
+        FROM {tabela} r{juncao}
+        {'WHERE ' + ' AND '.join(condicoes) if condicoes else ''}
+        GROUP BY ROLLUP (({chaves}))
+        ORDER BY geral, {ordem}
+    """
+    return sql, parametros
+
+
+def _numero(valor):
+    return float(valor) if valor is not None else 0.0
+
+
+def montar_relatorio(agrupamento, linhas):
+    """Converte as linhas da consulta em {'linhas': [...], 'total': {...}}"""
+    colunas, expressoes, _ = AGRUPAMENTOS[agrupamento]
+    n = len(expressoes)
+    resultado = {'linhas': [], 'total': None}
+    for linha in linhas:
+        registro = {
+            'dias': linha[n + 1],
+            **{coluna: _numero(valor) for coluna, valor in zip(COLUNAS_SOMA, linha[n + 2:])},
+            'total': _numero(linha[-1]),
+        }
+        if linha[n]:
+            resultado['total'] = registro
+        else:
+            resultado['linhas'].append({**dict(zip(colunas, linha[:n])), **registro})
+    return resultado
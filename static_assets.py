@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Arquivos estáticos carregados uma vez: variantes gzip/brotli, ETag forte e URL com hash"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só há gzip
+    brotli = None
+
+# Um ano: para URLs com hash, que mudam sempre que o conteúdo muda
+MAX_AGE_IMUTAVEL = 31536000
+
+# Tipos que valem a pena comprimir (PNG/JPEG já são comprimidos)
+TIPOS_COMPRIMIVEIS = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Abaixo disso a compressão não compensa o custo do cabeçalho
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+# Alguns sistemas não trazem .css/.js no mime.types
+TIPOS_CONHECIDOS = {'.html': 'text/html', '.css': 'text/css', '.js': 'text/javascript', '.png': 'image/png'}
+
+# Variante escolhida para uma requisição: dados=None -> servir o arquivo do disco
+Variante = namedtuple('Variante', ['encoding', 'dados', 'etag'])
+
+
+def aceita_encoding(accept_encoding, encoding):
+    """True se o header Accept-Encoding aceita o encoding (q=0 ou q inválido recusa)"""
+    for item in (accept_encoding or '').split(','):
+        nome, _, parametros = item.strip().partition(';')
+        if nome.strip().lower() != encoding:
+            continue
+        parametros = parametros.replace(' ', '').lower()
+        if not parametros.startswith('q='):
+            return True
+        try:
+            return float(parametros[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def nome_com_hash(nome, dados):
+    """'logo.png' -> 'logo.<12 hex do sha256>.png'"""
+    base, extensao = os.path.splitext(os.path.basename(nome))
+    return f"{base}.{hashlib.sha256(dados).hexdigest()[:12]}{extensao}"
+
+
+class Asset:
+    """Um arquivo estático com hash do conteúdo e variantes comprimidas em memória"""
+
+    def __init__(self, nome, caminho, dados, content_type, cache_control, fingerprint):
+        self.nome = nome
+        self.caminho = caminho
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.sha = hashlib.sha256(dados).hexdigest()
+        # fingerprint=True calcula o nome com hash; uma string é um nome que já tem hash (build)
+        if fingerprint is True:
+            self.nome_fingerprint = nome_com_hash(nome, dados)
+        else:
+            self.nome_fingerprint = fingerprint or None
+        self.tamanho = len(dados)
+
+        # encoding -> bytes; arquivos não comprimíveis ficam só no disco (sendfile)
+        self.variantes = {}
+        if content_type.startswith(TIPOS_COMPRIMIVEIS) and len(dados) >= TAMANHO_MINIMO_COMPRESSAO:
+            self.variantes['identity'] = dados
+            self.variantes['gzip'] = gzip.compress(dados, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variantes['br'] = brotli.compress(dados, quality=11)
+
+    def negociar(self, accept_encoding):
+        """Escolhe a melhor variante para o Accept-Encoding; cada uma tem o próprio ETag"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variantes and aceita_encoding(accept_encoding, encoding):
+                return Variante(encoding, self.variantes[encoding], f"{self.sha}-{encoding}")
+        return Variante('identity', self.variantes.get('identity'), self.sha)
+
+    def stats(self):
+        return {
+            'tamanho': self.tamanho,
+            'fingerprint': self.nome_fingerprint,
+            **{encoding: len(dados) for encoding, dados in self.variantes.items() if encoding != 'identity'},
+        }
+
+
+class StaticAssets:
+    """Registro dos arquivos estáticos servidos pela aplicação
+
+    Arquivos com fingerprint ganham um nome com o hash do conteúdo; nos
+    arquivos de texto registrados depois, as referências ao nome original
+    são trocadas por esse nome, e ele pode ter cache de um ano.
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self._assets = {}            # nome -> Asset
+        self._por_fingerprint = {}   # nome com hash -> Asset
+        self._lock = threading.Lock()
+        self._stats = {'servidos': 0, 'nao_modificados': 0}
+
+    def adicionar(self, nome, cache_control='no-cache', fingerprint=False, caminho=None):
+        """Lê e registra um arquivo (da raiz, se `caminho` não for dado); devolve o Asset"""
+        caminho = caminho or os.path.join(self.raiz, nome)
+        with open(caminho, 'rb') as arquivo:
+            dados = arquivo.read()
+
+        content_type = (TIPOS_CONHECIDOS.get(os.path.splitext(nome)[1].lower())
+                        or mimetypes.guess_type(nome)[0] or 'application/octet-stream')
+        if content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+            dados = self._trocar_referencias(dados)
+
+        asset = Asset(nome, caminho, dados, content_type, cache_control, fingerprint)
+        with self._lock:
+            self._assets[nome] = asset
+            if asset.nome_fingerprint:
+                self._por_fingerprint[asset.nome_fingerprint] = asset
+        print(f"📦 Estático {nome}: {asset.tamanho} bytes"
+              + ''.join(f", {encoding} {len(dados)}" for encoding, dados in asset.variantes.items()
+                        if encoding != 'identity'))
+        return asset
+
+    def _trocar_referencias(self, dados):
+        for asset in list(self._assets.values()):
+            # Arquivos do build já chegam com o hash no nome e nas referências
+            if asset.nome_fingerprint and asset.nome_fingerprint != asset.nome:
+                dados = dados.replace(asset.nome.encode(), f"/static/{asset.nome_fingerprint}".encode())
+        return dados
+
+    def buscar(self, nome):
+        """Asset pelo nome original (None se não registrado)"""
+        return self._assets.get(nome)
+
+    def buscar_fingerprint(self, nome):
+        """Asset pelo nome com hash (None se o hash não é o atual)"""
+        return self._por_fingerprint.get(nome)
+
+    def registrar_resposta(self, nao_modificado):
+        with self._lock:
+            self._stats['servidos'] += 1
+            if nao_modificado:
+                self._stats['nao_modificados'] += 1
+
+    def cache_control(self, asset, nome_pedido):
+        """Cache de um ano só quando o pedido veio pela URL com hash"""
+        if asset.nome_fingerprint and nome_pedido == asset.nome_fingerprint:
+            return f'public, max-age={MAX_AGE_IMUTAVEL}, immutable'
+        return asset.cache_control
+
+    def stats(self):
+        """Estatísticas dos arquivos estáticos"""
+        with self._lock:
+            return {
+                'brotli': brotli is not None,
+                'arquivos': {nome: asset.stats() for nome, asset in self._assets.items()},
+                **self._stats,
+            }
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Catálogo de fornecedores: tabela de preços compacta (PriceBook) e cache em memória com TTL e ETag"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from datetime import datetime, timezone
+
+# Campos de refeição usados no catálogo e nos pedidos
+CAMPOS_REFEICAO = ('cafe', 'almoco_marmitex', 'almoco_local', 'janta_marmitex', 'janta_local', 'gelo')
+
+
+# TIPO_FORN de tb_fornecedores (sem acento, maiúsculo) -> posição em CAMPOS_REFEICAO
+TIPOS_REFEICAO = {
+    'CAFE': 0,
+    'ALMOCO MARMITEX': 1,
+    'ALMOCO LOCAL': 2,
+    'JANTA MARMITEX': 3,
+    'JANTA LOCAL': 4,
+    'GELO': 5,
+}
+_POSICAO_CAMPO = {campo: posicao for posicao, campo in enumerate(CAMPOS_REFEICAO)}
+
+
+def dobrar(texto):
+    """Maiúsculas sem acentos: 'Conveniência' -> 'CONVENIENCIA'"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).upper()
+
+
+@functools.lru_cache(maxsize=256)
+def posicao_do_tipo(tipo_forn):
+    """Posição em CAMPOS_REFEICAO de um TIPO_FORN ('Almoço  marmitex' -> 1), ou None
+
+    Os valores distintos de TIPO_FORN são poucos: cada um é normalizado uma
+    vez e as linhas seguintes saem do cache.
+    """
+    return TIPOS_REFEICAO.get(' '.join(dobrar(tipo_forn).split()))
+
+
+def somente_digitos(cnpj):
+    return re.sub(r'\D', '', cnpj or '')
+
+
+class SupplierPrices:
+    """Preços de um fornecedor: um float por campo de refeição em um array
+
+    Aceita leitura como dict (registro['cafe'], registro.get('cpf_cnpj')),
+    então serve onde antes circulava o dict do catálogo.
+    """
+
+    __slots__ = ('fornecedor', 'cpf_cnpj', 'projeto', 'precos')
+
+    def __init__(self, fornecedor, cpf_cnpj='', projeto='', precos=None):
+        self.fornecedor = fornecedor
+        self.cpf_cnpj = cpf_cnpj
+        self.projeto = projeto
+        self.precos = array('d', precos if precos is not None else [0.0] * len(CAMPOS_REFEICAO))
+
+    def __getitem__(self, chave):
+        posicao = _POSICAO_CAMPO.get(chave)
+        if posicao is not None:
+            return self.precos[posicao]
+        if chave in ('fornecedor', 'cpf_cnpj', 'projeto'):
+            return getattr(self, chave)
+        raise KeyError(chave)
+
+    def get(self, chave, padrao=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    def para_dict(self):
+        """Registro no formato de /api/suppliers"""
+        return {
+            'fornecedor': self.fornecedor,
+            'cpf_cnpj': self.cpf_cnpj,
+            'projeto': self.projeto,
+            **dict(zip(CAMPOS_REFEICAO, self.precos)),
+        }
+
+
+class PriceBook:
+    """Tabela de preços do catálogo, indexada por nome e por CNPJ (só dígitos)"""
+
+    __slots__ = ('fornecedores', '_por_nome', '_por_cnpj')
+
+    def __init__(self, fornecedores):
+        self.fornecedores = fornecedores
+        self._por_nome = {f.fornecedor: f for f in fornecedores}
+        self._por_cnpj = {}
+        for fornecedor in fornecedores:
+            cnpj = somente_digitos(fornecedor.cpf_cnpj)
+            if cnpj:
+                self._por_cnpj.setdefault(cnpj, fornecedor)
+
+    @classmethod
+    def das_linhas(cls, dados):
+        """Agrupa as linhas de tb_fornecedores (uma por tipo) em um registro por fornecedor"""
+        por_nome = {}
+        for row in dados:
+            fornecedor = row['FORNECEDOR'] or ''
+            registro = por_nome.get(fornecedor)
+            if registro is None:
+                registro = por_nome[fornecedor] = SupplierPrices(
+                    fornecedor, row['CPF_CNPJ'] or '', (row.get('PROJETO') or '').strip()
+                )
+            elif not registro.projeto and row.get('PROJETO'):
+                registro.projeto = row['PROJETO'].strip()
+
+            posicao = posicao_do_tipo(row['TIPO_FORN'] or '')
+            if posicao is not None:
+                registro.precos[posicao] = float(row['VALOR'] or 0.0)
+        return cls(list(por_nome.values()))
+
+    @classmethod
+    def dos_registros(cls, registros):
+        """Reconstrói a tabela a partir dos dicts de /api/suppliers"""
+        return cls([
+            SupplierPrices(
+                r.get('fornecedor') or '',
+                r.get('cpf_cnpj') or '',
+                r.get('projeto') or '',
+                [float(r.get(campo) or 0.0) for campo in CAMPOS_REFEICAO],
+            )
+            for r in registros
+        ])
+
+    def __len__(self):
+        return len(self.fornecedores)
+
+    def __iter__(self):
+        return iter(self.fornecedores)
+
+    def buscar(self, nome):
+        return self._por_nome.get(nome)
+
+    def buscar_cnpj(self, cnpj):
+        return self._por_cnpj.get(somente_digitos(cnpj))
+
+    def filtrar(self, nomes):
+        """{fornecedor: SupplierPrices} dos nomes que existem na tabela"""
+        return {nome: self._por_nome[nome] for nome in nomes if nome in self._por_nome}
+
+    def para_json(self):
+        return [fornecedor.para_dict() for fornecedor in self.fornecedores]
+
+
+class Catalogo:
+    """Versão imutável do catálogo já serializada para resposta HTTP
+
+    `origem` é 'banco' (lido do loader) ou 'snapshot' (lido do disco no boot).
+    """
+
+    __slots__ = ('precos', 'fornecedores', 'corpo', 'etag', 'carregado_em', 'origem')
+
+    def __init__(self, precos, carregado_em=None, origem='banco'):
+        self.precos = precos
+        self.origem = origem
+        self.fornecedores = precos.fornecedores
+        self.corpo = json.dumps(precos.para_json(), ensure_ascii=False).encode('utf-8')
+        self.etag = hashlib.sha1(self.corpo).hexdigest()
+        self.carregado_em = carregado_em if carregado_em is not None else time.time()
+
+    def idade(self):
+        return time.time() - self.carregado_em
+
+
+# Formato do snapshot em disco: {"versao": 1, "etag", "gerado_em", "fornecedores": [...]};
+# uma lista solta (como o get_suppliers.py gravava) é lida como versão 0
+VERSAO_SNAPSHOT = 1
+
+
+def ler_snapshot(caminho):
+    """PriceBook gravado em `caminho`, ou None se o arquivo não existe ou não é legível"""
+    try:
+        with open(caminho, 'rb') as f:
+            conteudo = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Snapshot do catálogo ilegível ({caminho}): {e}")
+        return None
+
+    if isinstance(conteudo, list):
+        registros = conteudo
+    elif isinstance(conteudo, dict) and conteudo.get('versao') == VERSAO_SNAPSHOT:
+        registros = conteudo.get('fornecedores') or []
+    else:
+        versao = conteudo.get('versao') if isinstance(conteudo, dict) else None
+        print(f"⚠️ Snapshot do catálogo com versão desconhecida ({caminho}): {versao}")
+        return None
+    return PriceBook.dos_registros(registros)
+
+
+def gravar_snapshot(caminho, catalogo):
+    """Grava o catálogo em arquivo temporário e renomeia (quem lê nunca vê arquivo pela metade)"""
+    snapshot = {
+        'versao': VERSAO_SNAPSHOT,
+        'etag': catalogo.etag,
+        'gerado_em': datetime.fromtimestamp(catalogo.carregado_em, timezone.utc).isoformat(),
+        'fornecedores': catalogo.precos.para_json(),
+    }
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+class CatalogCache:
+    """Cache do catálogo com stale-while-revalidate
+
+    - idade < ttl: responde do cache
+    - ttl <= idade < ttl + stale_ttl: responde do cache e atualiza em segundo plano
+    - acima disso: continua respondendo do cache (expirado(), para a rota
+      avisar o cliente) enquanto a atualização corre em segundo plano
+    - sem catálogo: carrega na hora
+
+    Só uma atualização roda por vez, e depois de uma falha as seguintes
+    esperam um intervalo crescente (backoff .. backoff_max segundos): com o
+    Azure fora nenhum request fica preso no timeout de login.
+
+    Com `snapshot` (caminho de arquivo), carregar_snapshot() põe no cache o
+    catálogo salvo em disco antes de qualquer ida ao banco, e cada catálogo
+    novo vindo do loader regrava o arquivo. Sem esse arquivo (primeiro boot,
+    disco efêmero) vale a `semente`, que é só lida, nunca gravada.
+    """
+
+    def __init__(self, loader, ttl=300, stale_ttl=3600, snapshot=None, semente=None, backoff=5, backoff_max=300):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._falhas_seguidas = 0
+        self._proxima_tentativa = 0.0   # time.monotonic() a partir do qual pode ir ao banco
+        self._ultimo_erro = None
+        self.snapshot = snapshot
+        self.semente = semente
+        self._etag_snapshot = None
+        self._catalogo = None
+        self._lock = threading.Lock()          # protege _catalogo/_atualizando
+        self._carga_lock = threading.RLock()   # serializa idas ao banco
+        self._atualizando = False
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'atualizacoes': 0,
+            'falhas': 0,
+            'expirados': 0,
+            'snapshots_gravados': 0,
+        }
+
+    def _carregar(self):
+        """Executa o loader e publica o novo catálogo"""
+        with self._carga_lock:
+            catalogo = Catalogo(self.loader())
+            with self._lock:
+                anterior = self._catalogo
+                self._catalogo = catalogo
+                self._stats['atualizacoes'] += 1
+                self._falhas_seguidas = 0
+                self._proxima_tentativa = 0.0
+            if anterior is None or anterior.etag != catalogo.etag:
+                print(f"📚 Catálogo atualizado: {len(catalogo.fornecedores)} fornecedores (etag {catalogo.etag[:8]})")
+            if self.snapshot and catalogo.etag != self._etag_snapshot:
+                self._gravar_snapshot(catalogo)
+            return catalogo
+
+    def _gravar_snapshot(self, catalogo):
+        try:
+            gravar_snapshot(self.snapshot, catalogo)
+        except OSError as e:
+            # Disco somente leitura não pode derrubar a atualização do catálogo
+            print(f"⚠️ Não foi possível gravar o snapshot do catálogo: {e}")
+            return
+        self._etag_snapshot = catalogo.etag
+        with self._lock:
+            self._stats['snapshots_gravados'] += 1
+
+    def carregar_snapshot(self):
+        """Publica o catálogo do snapshot em disco, ou da semente (se o cache estiver vazio)
+
+        O catálogo entra já vencido: é servido na hora e a primeira leitura
+        dispara a atualização em segundo plano. Devolve True se carregou.
+        """
+        precos = ler_snapshot(self.snapshot) if self.snapshot else None
+        origem = self.snapshot
+        if precos is None and self.semente:
+            precos = ler_snapshot(self.semente)
+            origem = self.semente
+        if precos is None:
+            print("📚 Sem snapshot nem semente do catálogo: a primeira carga vem do banco")
+            return False
+        catalogo = Catalogo(precos, carregado_em=time.time() - self.ttl, origem='snapshot')
+        with self._lock:
+            if self._catalogo is not None:
+                return False
+            self._catalogo = catalogo
+        if origem == self.snapshot:
+            # Da semente não: a primeira carga do banco grava o snapshot de runtime
+            self._etag_snapshot = catalogo.etag
+        print(f"📚 Catálogo de {origem}: {len(catalogo.fornecedores)} fornecedores (etag {catalogo.etag[:8]})")
+        return True
+
+    def atualizar(self):
+        """Dispara a recarga em segundo plano (sem esperar), se nenhuma estiver em andamento"""
+        with self._lock:
+            self._disparar_atualizacao_locked()
+
+    def _registrar_falha_locked(self, erro):
+        """Conta a falha e adia a próxima ida ao banco (chamar com o lock)"""
+        self._stats['falhas'] += 1
+        self._falhas_seguidas += 1
+        self._ultimo_erro = erro
+        espera = min(self.backoff_max, self.backoff * 2 ** (self._falhas_seguidas - 1))
+        self._proxima_tentativa = time.monotonic() + espera
+
+    def _disparar_atualizacao_locked(self):
+        """Inicia a atualização em segundo plano, salvo se já houver uma ou estiver em backoff"""
+        if self._atualizando or time.monotonic() < self._proxima_tentativa:
+            return
+        self._atualizando = True
+        self._atualizar_em_segundo_plano()
+
+    def _atualizar_em_segundo_plano(self):
+        def executar():
+            try:
+                self._carregar()
+            except Exception as e:
+                with self._lock:
+                    self._registrar_falha_locked(e)
+                print(f"⚠️ Falha ao atualizar catálogo em segundo plano: {e}")
+            finally:
+                with self._lock:
+                    self._atualizando = False
+
+        threading.Thread(target=executar, name='catalogo-refresh', daemon=True).start()
+
+    def get(self):
+        """Devolve o catálogo atual (objeto Catalogo)"""
+        with self._lock:
+            catalogo = self._catalogo
+            if catalogo is not None:
+                idade = catalogo.idade()
+                if idade < self.ttl:
+                    self._stats['hits'] += 1
+                    return catalogo
+                if idade < self.ttl + self.stale_ttl:
+                    self._stats['stale_hits'] += 1
+                else:
+                    self._stats['expirados'] += 1
+                self._disparar_atualizacao_locked()
+                return catalogo
+            self._stats['misses'] += 1
+            if time.monotonic() < self._proxima_tentativa:
+                raise RuntimeError(f"Catálogo indisponível (última falha: {self._ultimo_erro})")
+
+        try:
+            with self._carga_lock:
+                # Outra thread pode ter carregado enquanto esperávamos
+                with self._lock:
+                    atual = self._catalogo
+                if atual is not None:
+                    return atual
+                return self._carregar()
+        except Exception as e:
+            with self._lock:
+                self._registrar_falha_locked(e)
+            raise
+
+    def precos_recentes(self):
+        """PriceBook do cache só se veio do banco e ainda está na janela ttl + stale_ttl, senão None
+
+        É o que pode precificar um pedido quando o Azure não responde; um
+        snapshot do disco pode ter qualquer idade e não serve para isso.
+        """
+        with self._lock:
+            catalogo = self._catalogo
+        if catalogo is None or catalogo.origem != 'banco' or self.expirado(catalogo):
+            return None
+        return catalogo.precos
+
+    def expirado(self, catalogo):
+        """True se o catálogo passou de ttl + stale_ttl (servido só porque o banco não respondeu)"""
+        return catalogo.idade() >= self.ttl + self.stale_ttl
+
+    def peek(self):
+        """Catálogo carregado no momento (sem ir ao banco), ou None"""
+        with self._lock:
+            return self._catalogo
+
+    def refresh(self):
+        """Força a recarga imediata do catálogo"""
+        try:
+            return self._carregar()
+        except Exception as e:
+            with self._lock:
+                self._registrar_falha_locked(e)
+            raise
+
+    def stats(self):
+        """Estatísticas do cache"""
+        with self._lock:
+            catalogo = self._catalogo
+            return {
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'fornecedores': len(catalogo.fornecedores) if catalogo else 0,
+                'etag': catalogo.etag if catalogo else None,
+                'idade_s': round(catalogo.idade(), 1) if catalogo else None,
+                'atualizando': self._atualizando,
+                'falhas_seguidas': self._falhas_seguidas,
+                'snapshot': self.snapshot,
+                'semente': self.semente,
+                **self._stats,
+            }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Índice em memória para a busca de fornecedores: tokens sem acento, prefixo por bisect e tolerância a um erro"""
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from supplier_catalog import dobrar, somente_digitos
+
+TOKEN = re.compile(r'[A-Z0-9]+')
+
+# Pontos por token da busca, conforme a qualidade do casamento
+PONTOS_EXATO = 3
+PONTOS_PREFIXO = 2
+PONTOS_APROXIMADO = 1
+
+# Tokens curtos demais geram aproximações sem sentido
+TAMANHO_MINIMO_APROXIMADO = 4
+
+
+def tokenizar(texto):
+    return TOKEN.findall(dobrar(texto))
+
+
+def distancia_ate_um(a, b):
+    """True se a e b diferem por no máximo uma inserção, remoção ou troca de letra"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+class SupplierIndex:
+    """Índice imutável de uma versão do catálogo
+
+    Cada token (nome e dígitos do CNPJ) aponta para os fornecedores que o
+    contêm; o vocabulário ordenado permite achar todos os tokens com um
+    prefixo por bisect, e os buckets por tamanho limitam a busca aproximada.
+    """
+
+    def __init__(self, fornecedores, etag=None):
+        self.etag = etag
+        self.fornecedores = fornecedores
+        self._nomes = [dobrar(f.get('fornecedor', '')) for f in fornecedores]
+        postings = defaultdict(set)
+        for indice, fornecedor in enumerate(fornecedores):
+            for token in tokenizar(fornecedor.get('fornecedor', '')):
+                postings[token].add(indice)
+            cnpj = somente_digitos(fornecedor.get('cpf_cnpj', ''))
+            if cnpj:
+                postings[cnpj].add(indice)
+        self._postings = {token: tuple(sorted(indices)) for token, indices in postings.items()}
+        self._vocabulario = sorted(self._postings)
+        self._por_tamanho = defaultdict(list)
+        for token in self._vocabulario:
+            self._por_tamanho[len(token)].append(token)
+        # Ordem alfabética dos fornecedores, para desempate e busca vazia
+        self._ordem = sorted(range(len(fornecedores)), key=lambda i: self._nomes[i])
+        self._posicao = {indice: posicao for posicao, indice in enumerate(self._ordem)}
+
+    def _pontuar_token(self, token):
+        """{indice do fornecedor: pontos} para um token da busca"""
+        pontos = {}
+        inicio = bisect.bisect_left(self._vocabulario, token)
+        for posicao in range(inicio, len(self._vocabulario)):
+            candidato = self._vocabulario[posicao]
+            if not candidato.startswith(token):
+                break
+            valor = PONTOS_EXATO if candidato == token else PONTOS_PREFIXO
+            for indice in self._postings[candidato]:
+                if pontos.get(indice, 0) < valor:
+                    pontos[indice] = valor
+
+        # CONVENIENCIA x COVENIENCIA: tokens a uma letra de distância
+        if len(token) >= TAMANHO_MINIMO_APROXIMADO:
+            for tamanho in (len(token) - 1, len(token), len(token) + 1):
+                for candidato in self._por_tamanho.get(tamanho, ()):
+                    if candidato != token and distancia_ate_um(token, candidato):
+                        for indice in self._postings[candidato]:
+                            pontos.setdefault(indice, PONTOS_APROXIMADO)
+        return pontos
+
+    def buscar(self, consulta, limite=20):
+        """(índice no catálogo, fornecedor) dos que casam com todos os tokens da busca, do melhor para o pior"""
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return [(i, self.fornecedores[i]) for i in self._ordem[:limite]]
+
+        total = None
+        for token in tokens:
+            pontos = self._pontuar_token(token)
+            if total is None:
+                total = pontos
+            else:
+                total = {indice: total[indice] + valor for indice, valor in pontos.items() if indice in total}
+            if not total:
+                return []
+
+        inicio_busca = ' '.join(tokens)
+        ranking = sorted(
+            total,
+            key=lambda i: (-total[i], not self._nomes[i].startswith(inicio_busca), self._posicao[i])
+        )
+        return [(i, self.fornecedores[i]) for i in ranking[:limite]]
+
+    def stats(self):
+        return {
+            'etag': self.etag,
+            'fornecedores': len(self.fornecedores),
+            'tokens': len(self._vocabulario),
+        }
+
+
+class SupplierSearch:
+    """Mantém o índice em dia com o catálogo: reconstrói quando o ETag muda"""
+
+    def __init__(self, obter_catalogo):
+        self.obter_catalogo = obter_catalogo
+        self._indice = None
+        self._lock = threading.Lock()
+        self._stats = {'buscas': 0, 'reconstrucoes': 0}
+
+    def indice(self):
+        catalogo = self.obter_catalogo()
+        indice = self._indice
+        if indice is None or indice.etag != catalogo.etag:
+            with self._lock:
+                indice = self._indice
+                if indice is None or indice.etag != catalogo.etag:
+                    indice = SupplierIndex(catalogo.fornecedores, catalogo.etag)
+                    self._indice = indice
+                    self._stats['reconstrucoes'] += 1
+        return indice
+
+    def buscar(self, consulta, limite=20):
+        resultado = self.indice().buscar(consulta, limite)
+        with self._lock:
+            self._stats['buscas'] += 1
+        return resultado
+
+    def stats(self):
+        """Estatísticas da busca"""
+        with self._lock:
+            indice = self._indice
+            return {
+                **(indice.stats() if indice else {'etag': None}),
+                **self._stats,
+            }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do ConnectionPool com conexões falsas (sem Azure nem PostgreSQL)
+
+Uso:
+    python test_db_pool.py
+    python -m pytest test_db_pool.py
+"""
+
+import threading
+import time
+
+from db_pool import ConnectionPool
+from testes_util import rodar_testes
+
+
+class ConexaoFalsa:
+    def __init__(self, numero):
+        self.numero = numero
+        self.fechada = False
+        self.quebrada = False
+
+    def close(self):
+        self.fechada = True
+
+
+def _pool(**kwargs):
+    criadas = []
+
+    def factory():
+        conexao = ConexaoFalsa(len(criadas))
+        criadas.append(conexao)
+        return conexao
+
+    kwargs.setdefault('min_size', 0)
+    return ConnectionPool('teste', factory, **kwargs), criadas
+
+
+def test_reuso_lifo_e_tamanho_maximo():
+    pool, criadas = _pool(max_size=2)
+    a, b = pool.acquire(), pool.acquire()
+    assert a is not b and len(criadas) == 2
+
+    inicio = time.monotonic()
+    assert pool.acquire(timeout=0.05) is None
+    assert time.monotonic() - inicio >= 0.05 and pool.stats()['timeouts'] == 1
+
+    pool.release(a)
+    pool.release(b)
+    # A última devolvida sai primeiro
+    assert pool.acquire() is b and len(criadas) == 2
+    assert pool.stats()['pico_em_uso'] == 2 and pool.stats()['abertas'] == 2
+
+
+def test_espera_por_vaga():
+    """Quem espera recebe a conexão devolvida por outra thread; só o tempo bloqueado conta"""
+    pool, criadas = _pool(max_size=1)
+    ocupada = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(ocupada,)).start()
+    assert pool.acquire(timeout=2) is ocupada and len(criadas) == 1
+
+    stats = pool.stats()
+    assert stats['esperas'] == 1 and stats['espera_max_ms'] >= 40
+    assert stats['checkouts'] == 2
+
+
+def test_close_all_descarta_geracao_anterior():
+    """Conexões em uso durante o close_all são fechadas na devolução, não voltam ao pool"""
+    pool, criadas = _pool(max_size=3)
+    em_uso = pool.acquire()
+    ociosa = pool.acquire()
+    pool.release(ociosa)
+
+    pool.close_all()
+    assert ociosa.fechada and not em_uso.fechada and pool.stats()['ociosas'] == 0
+
+    pool.release(em_uso)
+    assert em_uso.fechada and pool.stats()['abertas'] == 0
+    # Continua utilizável com conexões novas
+    nova = pool.acquire()
+    assert nova is criadas[-1] and nova not in (em_uso, ociosa)
+
+
+def test_ociosidade_e_tempo_de_vida():
+    pool, criadas = _pool(min_size=1, idle_timeout=0.05)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+    time.sleep(0.06)
+    # Acima do mínimo a ociosa vencida é fechada; o mínimo fica
+    c = pool.acquire()
+    assert pool.stats()['abertas'] == 1 and sum(conexao.fechada for conexao in criadas) == 1
+    pool.release(c)
+
+    pool, criadas = _pool(max_lifetime=0.05)
+    antiga = pool.acquire()
+    time.sleep(0.06)
+    pool.release(antiga)
+    assert antiga.fechada and pool.acquire() is not antiga
+
+
+def test_validacao_quebrada_e_reset():
+    validas = {'ok': True}
+    pool, criadas = _pool(validate=lambda conexao: validas['ok'], validate_after=0,
+                          is_broken=lambda conexao: conexao.quebrada, reset=lambda conexao: None)
+    a = pool.acquire()
+    pool.release(a)
+    validas['ok'] = False
+    b = pool.acquire()
+    assert b is not a and a.fechada and pool.stats()['falhas_validacao'] == 1
+    validas['ok'] = True
+
+    b.quebrada = True
+    pool.release(b)
+    assert b.fechada and pool.stats()['quebradas'] >= 1
+
+    # Com is_broken + reset, erro dentro do with só descarta se a conexão estiver quebrada
+    try:
+        with pool.connection() as conexao:
+            raise RuntimeError('consulta falhou')
+    except RuntimeError:
+        pass
+    assert not conexao.fechada and pool.stats()['ociosas'] == 1
+
+
+def test_erro_no_with_sem_hooks_descarta_e_factory_falha():
+    pool, _ = _pool()
+    try:
+        with pool.connection() as conexao:
+            raise RuntimeError('consulta falhou')
+    except RuntimeError:
+        pass
+    assert conexao.fechada and pool.stats()['abertas'] == 0
+
+    sem_banco = ConnectionPool('fora', lambda: None, min_size=0, max_size=1)
+    assert sem_banco.acquire() is None and sem_banco.acquire() is None
+    assert sem_banco.stats()['falhas_conexao'] == 2 and sem_banco.stats()['abertas'] == 0
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do cache de Idempotency-Key e do decorator das rotas de gravação (app Flask local)
+
+Uso:
+    python test_idempotency.py
+    python -m pytest test_idempotency.py
+"""
+
+import threading
+import time
+
+from flask import Flask, jsonify
+
+from idempotency import IdempotencyCache, idempotente
+from testes_util import rodar_testes
+
+
+def _app(cache, view):
+    app = Flask(__name__)
+    app.add_url_rule('/gravar', 'gravar', idempotente(cache)(view), methods=['POST'])
+    return app.test_client()
+
+
+def test_lru_e_ttl():
+    cache = IdempotencyCache(max_entries=2, ttl=60)
+    for chave in ('a', 'b'):
+        cache.put(chave, 'x', 200, b'{}', 'application/json')
+    assert cache.get('a') is not None   # 'a' lida: 'b' passa a ser a mais antiga
+    cache.put('c', 'x', 200, b'{}', 'application/json')
+    assert cache.get('b') is None and cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['expulsas'] == 1
+
+    vencido = IdempotencyCache(ttl=0.01)
+    vencido.put('a', 'x', 200, b'{}', 'application/json')
+    time.sleep(0.02)
+    assert vencido.get('a') is None and vencido.stats()['entradas'] == 0
+
+
+def test_reservar_e_liberar():
+    """Só um request por chave: o segundo vê a chave em andamento até liberar()"""
+    cache = IdempotencyCache()
+    assert cache.reservar('a') == (None, False)
+    assert cache.reservar('a') == (None, True)
+    assert cache.stats()['em_andamento'] == 1
+
+    # Resposta gravada: vale mais que a reserva
+    cache.put('a', 'x', 200, b'{}', 'application/json')
+    item, em_andamento = cache.reservar('a')
+    assert item[1] == 'x' and not em_andamento
+    cache.liberar('a')
+    assert cache.stats()['em_andamento'] == 0
+
+    # Erro libera sem gravar: a chave pode ser tentada de novo
+    assert cache.reservar('b') == (None, False)
+    cache.liberar('b')
+    assert cache.reservar('b') == (None, False)
+
+
+def test_replay_conflito_e_erros():
+    chamadas = []
+
+    def view():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            return jsonify({'success': False}), 500
+        return jsonify({'success': True, 'n': len(chamadas)})
+
+    cliente = _app(IdempotencyCache(), view)
+    cabecalhos = {'Idempotency-Key': 'k1'}
+    assert cliente.post('/gravar', json={'a': 1}, headers=cabecalhos).status_code == 500
+    primeira = cliente.post('/gravar', json={'a': 1}, headers=cabecalhos)
+    assert primeira.status_code == 200 and primeira.get_json()['n'] == 2
+
+    repetida = cliente.post('/gravar', json={'a': 1}, headers=cabecalhos)
+    assert repetida.get_json() == primeira.get_json() and repetida.headers['Idempotent-Replayed'] == 'true'
+    assert cliente.post('/gravar', json={'a': 2}, headers=cabecalhos).status_code == 422
+    assert len(chamadas) == 2
+
+    # Sem chave: sempre executa
+    cliente.post('/gravar', json={'a': 1})
+    assert len(chamadas) == 3
+
+
+def test_mesma_chave_em_paralelo():
+    """Enquanto o primeiro request roda, o segundo com a mesma chave recebe 409 sem executar"""
+    entrou = threading.Event()
+    solta = threading.Event()
+    chamadas = []
+
+    def view():
+        chamadas.append(1)
+        entrou.set()
+        solta.wait(5)
+        return jsonify({'success': True})
+
+    cache = IdempotencyCache()
+    cliente = _app(cache, view)
+    cabecalhos = {'Idempotency-Key': 'k1'}
+    respostas = []
+    primeiro = threading.Thread(target=lambda: respostas.append(cliente.post('/gravar', json={}, headers=cabecalhos)))
+    primeiro.start()
+    try:
+        assert entrou.wait(5)
+        segunda = cliente.post('/gravar', json={}, headers=cabecalhos)
+        assert segunda.status_code == 409 and segunda.headers['Retry-After'] == '1'
+    finally:
+        solta.set()
+        primeiro.join(5)
+
+    assert respostas[0].status_code == 200 and len(chamadas) == 1
+    assert cliente.post('/gravar', json={}, headers=cabecalhos).headers['Idempotent-Replayed'] == 'true'
+    assert cache.stats()['concorrentes'] == 1 and cache.stats()['em_andamento'] == 0
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
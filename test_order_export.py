@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da exportação (consulta e CSV em pedaços; sem banco)
+
+Uso:
+    python test_order_export.py
+    python -m pytest test_order_export.py
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+from order_export import COLUNAS_EXPORTACAO, gerar_csv, montar_consulta_exportacao
+from reports import ler_filtros
+from testes_util import rodar_testes
+
+
+def _linha(id_linha, dia):
+    valores = (Decimal('1'),) * (len(COLUNAS_EXPORTACAO) - 5)
+    return (id_linha, date(2025, 9, dia), '12323430000123', 'RESTAURANTE PARAISO') + valores + (datetime(2025, 9, 20),)
+
+
+def test_consulta_na_ordem_do_indice():
+    sql, parametros = montar_consulta_exportacao(ler_filtros({}))
+    assert 'WHERE' not in sql and sql.strip().endswith('ORDER BY data_refeicao, id')
+    assert parametros == []
+
+    sql, parametros = montar_consulta_exportacao(ler_filtros({'ano': '2025', 'mes': '9', 'cnpj': '12.323.430/0001-23'}))
+    assert 'data_refeicao >= %s AND data_refeicao <= %s AND cnpj = %s' in sql
+    assert parametros == [date(2025, 9, 1), date(2025, 9, 30), '12323430000123']
+
+
+def test_csv_em_pedacos():
+    """Um pedaço por lote; cabeçalho com BOM só no primeiro; o todo é um CSV válido"""
+    pedacos = list(gerar_csv([[_linha(1, 1), _linha(2, 1)], [_linha(3, 2)]]))
+    assert len(pedacos) == 2
+    assert pedacos[0].startswith('\ufeff'.encode('utf-8'))
+
+    linhas = list(csv.reader(io.StringIO(b''.join(pedacos).decode('utf-8-sig')), delimiter=';'))
+    assert linhas[0] == list(COLUNAS_EXPORTACAO)
+    assert [linha[0] for linha in linhas[1:]] == ['1', '2', '3']
+    assert linhas[3][1] == '2025-09-02' and linhas[3][-1] == '2025-09-20T00:00:00'
+
+    # Sem linhas ainda sai o cabeçalho
+    vazio = b''.join(gerar_csv([])).decode('utf-8-sig')
+    assert vazio.strip() == ';'.join(COLUNAS_EXPORTACAO)
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do histórico paginado por cursor (sem banco)
+
+Uso:
+    python test_order_history.py
+    python -m pytest test_order_history.py
+"""
+
+from datetime import date, datetime
+
+from order_history import codificar_cursor, decodificar_cursor, montar_consulta_historico, montar_pagina
+from order_store import COLUNAS_REFEICOES
+from reports import ler_filtros
+from testes_util import rodar_testes
+
+CNPJ = '12323430000123'
+FORNECEDOR = 'AGUINALDO JOSE DA SILVA - REST E ESPETINHO DO IRMÃO'
+
+
+def test_cursor_do_historico():
+    """O token da página volta à mesma chave; tokens inválidos levantam ValueError"""
+    token = codificar_cursor(date(2025, 9, 18), 4321)
+    assert decodificar_cursor(token) == (date(2025, 9, 18), 4321)
+    # Seguro em URL e sem padding
+    assert '=' not in token and '+' not in token and '/' not in token
+
+    for invalido in ('', 'xyz', codificar_cursor(date(2025, 9, 18), 1)[:-2], 'WyIyMDI1LTEzLTAxIiwxXQ'):
+        try:
+            decodificar_cursor(invalido)
+        except ValueError:
+            continue
+        raise AssertionError(f'Cursor aceito: {invalido!r}')
+
+    # montar_pagina gera o cursor da última linha quando há mais uma página
+    colunas_valores = (0,) * (len(COLUNAS_REFEICOES) - 3)
+    linhas = [
+        (10 - i, date(2025, 9, 10 - i), CNPJ, FORNECEDOR) + colunas_valores + (datetime(2025, 9, 20),)
+        for i in range(3)
+    ]
+    pagina = montar_pagina(linhas, 2)
+    assert len(pagina['pedidos']) == 2
+    assert decodificar_cursor(pagina['proximo_cursor']) == (date(2025, 9, 9), 9)
+    assert montar_pagina(linhas, 3)['proximo_cursor'] is None
+
+
+def test_consulta_continua_depois_do_cursor():
+    """Sem OFFSET: a página seguinte filtra pela última chave e busca uma linha a mais"""
+    filtros = ler_filtros({'cnpj': '12.323.430/0001-23', 'ano': '2025', 'mes': '9', 'quinzena': '2'})
+    sql, parametros = montar_consulta_historico(filtros, FORNECEDOR, (date(2025, 9, 18), 4321), 50)
+    assert 'OFFSET' not in sql and '(data_refeicao, id) < (%s, %s)' in sql
+    assert 'ORDER BY data_refeicao DESC, id DESC' in sql
+    assert parametros == [CNPJ, FORNECEDOR, date(2025, 9, 16), date(2025, 9, 30), date(2025, 9, 18), 4321, 51]
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da montagem e da gravação das linhas de refeicoes (cursor falso; sem banco)
+
+Uso:
+    python test_order_store.py
+    python -m pytest test_order_store.py
+"""
+
+import csv
+import io
+from datetime import date
+
+import order_store
+from order_store import (COLUNAS_REFEICOES, _FonteCSV, _valor_csv, chave_da_linha, deduplicar_linhas, gravar_refeicoes,
+                         ler_pedido, montar_linha_refeicao, montar_linhas_quinzena)
+from testes_util import rodar_testes
+
+CNPJ = '12323430000123'
+FORNECEDOR = 'AGUINALDO JOSE DA SILVA - REST E ESPETINHO DO IRMÃO'
+VALORES = {'cafe': 5.0, 'almoco_marmitex': 25.0, 'almoco_local': 0, 'janta_marmitex': 0,
+           'janta_local': 25.0, 'gelo': 5.0}
+
+
+def _linhas(quantidade, fornecedor=FORNECEDOR):
+    """Uma linha por dia a partir de 2025-01-01 (chaves distintas)"""
+    return [
+        montar_linha_refeicao(date.fromordinal(date(2025, 1, 1).toordinal() + i), CNPJ, fornecedor,
+                              {'cafe': i % 5, 'gelo': 1}, VALORES)
+        for i in range(quantidade)
+    ]
+
+
+class CursorFalso:
+    """Registra o SQL executado e consome o arquivo do COPY como o psycopg2 faz (read em blocos)"""
+
+    def __init__(self, tamanho_bloco=8192):
+        self.tamanho_bloco = tamanho_bloco
+        self.sql = []
+        self.copiado = None
+
+    def execute(self, sql, parametros=None):
+        self.sql.append(' '.join(sql.split()))
+
+    def copy_expert(self, sql, arquivo):
+        self.sql.append(sql)
+        blocos = []
+        while True:
+            bloco = arquivo.read(self.tamanho_bloco)
+            if not bloco:
+                break
+            assert len(bloco) <= self.tamanho_bloco
+            blocos.append(bloco)
+        self.copiado = ''.join(blocos)
+
+
+def test_montar_linhas_quinzena():
+    """Dias fora da quinzena viram erro; os válidos viram linhas na ordem de COLUNAS_REFEICOES"""
+    dias = [
+        {'data_refeicao': '2025-09-01', 'cafe': 3, 'gelo': 1},
+        {'data_refeicao': '2025-09-15', 'almoco_marmitex': 2},
+        {'data_refeicao': '2025-09-16', 'cafe': 1},
+        {'data_refeicao': '2025-09-02', 'cafe': -1},
+        {'data_refeicao': '01/09/2025'},
+    ]
+    linhas, erros = montar_linhas_quinzena(dias, CNPJ, FORNECEDOR, VALORES, 2025, 9, 1)
+
+    assert [linha[0] for linha in linhas] == [date(2025, 9, 1), date(2025, 9, 15)]
+    assert all(len(linha) == len(COLUNAS_REFEICOES) for linha in linhas)
+    primeira = dict(zip(COLUNAS_REFEICOES, linhas[0]))
+    assert primeira['cafe'] == 3 and primeira['total_cafe'] == 15.0
+    assert primeira['gelo'] == 1 and primeira['total_gelo'] == 5.0
+    assert primeira['almoco_marmitex'] == 0 and primeira['total_almoco_marmitex'] == 0
+    assert [erro['data_refeicao'] for erro in erros] == ['2025-09-16', '2025-09-02', '01/09/2025']
+
+    # Segunda quinzena vai até o fim do mês
+    linhas, erros = montar_linhas_quinzena([{'data_refeicao': '2024-02-29'}], CNPJ, FORNECEDOR, VALORES, 2024, 2, 2)
+    assert len(linhas) == 1 and not erros
+
+
+def test_deduplicar_linhas():
+    """Uma linha por (data, cnpj, fornecedor); a última enviada vence e a ordem se mantém"""
+    linhas, _ = montar_linhas_quinzena([
+        {'data_refeicao': '2025-09-01', 'cafe': 1},
+        {'data_refeicao': '2025-09-02', 'cafe': 2},
+        {'data_refeicao': '2025-09-01', 'cafe': 3},
+    ], CNPJ, FORNECEDOR, VALORES, 2025, 9, 1)
+    unicas = deduplicar_linhas(linhas)
+
+    assert [(linha[0], linha[3]) for linha in unicas] == [(date(2025, 9, 1), 3), (date(2025, 9, 2), 2)]
+    # CHAR(14) do banco volta com espaços à direita: mesma chave
+    assert chave_da_linha((date(2025, 9, 1), CNPJ + ' ', FORNECEDOR)) == chave_da_linha(linhas[0])
+    assert deduplicar_linhas([]) == []
+
+
+def test_ler_pedido_so_digitos():
+    """CNPJ/CPF formatado vira só dígitos nos dois formatos do /api/save-order"""
+    _, cnpj, _, pedidos = ler_pedido({'cnpj': '12.323.430/0001-23', 'fornecedor': FORNECEDOR, 'cafe': 2})
+    assert cnpj == CNPJ and pedidos[0]['cafe'] == 2
+    assert ler_pedido({'cpf': '123.456.789-01', 'pedidos': []})[1] == '12345678901'
+    assert ler_pedido({})[1] == ''
+
+
+def test_valor_csv():
+    """Números sem aspas, datas ISO, texto sempre entre aspas (vazio ≠ NULL)"""
+    assert _valor_csv(None) == ''
+    assert _valor_csv(3) == '3' and _valor_csv(2.5) == '2.5' and _valor_csv(0.1) == '0.1'
+    assert _valor_csv(date(2025, 9, 1)) == '2025-09-01'
+    assert _valor_csv('') == '""'
+    assert _valor_csv('BAR "DO ZÉ", LTDA') == '"BAR ""DO ZÉ"", LTDA"'
+
+
+def test_fonte_csv_em_blocos():
+    """read(size) nunca passa de size, não perde bytes entre blocos e conta as linhas"""
+    linhas = _linhas(40, fornecedor='BAR "DO ZÉ", LTDA\nFILIAL')
+    inteiro = _FonteCSV(linhas).read()
+
+    for tamanho in (1, 7, 100, 10 ** 6):
+        fonte = _FonteCSV(linhas)
+        partes = []
+        while True:
+            parte = fonte.read(tamanho)
+            if not parte:
+                break
+            assert len(parte) <= tamanho
+            partes.append(parte)
+        assert ''.join(partes) == inteiro
+        assert fonte.total == 40
+
+    registros = list(csv.reader(io.StringIO(inteiro)))
+    assert len(registros) == 40 and all(len(registro) == len(COLUNAS_REFEICOES) for registro in registros)
+    assert registros[0][2] == 'BAR "DO ZÉ", LTDA\nFILIAL'
+    assert _FonteCSV([]).read(10) == ''
+
+
+def test_gravar_refeicoes_insert_ate_o_limite():
+    """Até limite_copy linhas: INSERT multi-linha com ids na ordem recebida (repetidas incluídas)"""
+    chamadas = []
+
+    def execute_values_falso(cursor, query, linhas, page_size=None, fetch=False):
+        chamadas.append((query, list(linhas)))
+        return [(100 + i, linha[0], linha[1], linha[2]) for i, linha in enumerate(linhas)]
+
+    original = order_store.execute_values
+    order_store.execute_values = execute_values_falso
+    try:
+        linhas = _linhas(3)
+        resultado = gravar_refeicoes(CursorFalso(), linhas + [linhas[0]], limite_copy=3)
+    finally:
+        order_store.execute_values = original
+
+    assert resultado['metodo'] == 'insert' and resultado['linhas'] == 3
+    assert resultado['ids'] == [100, 101, 102, 100]
+    assert len(chamadas) == 1 and len(chamadas[0][1]) == 3
+    assert 'ON CONFLICT (cnpj, fornecedor, data_refeicao) DO UPDATE' in chamadas[0][0]
+
+
+def test_gravar_refeicoes_copy_acima_do_limite():
+    """Acima de limite_copy: COPY para a staging e upsert de lá, sem ids"""
+    cursor = CursorFalso(tamanho_bloco=256)
+    linhas = _linhas(6)
+    # A linha repetida conta uma vez só: a última enviada vence
+    repetida = montar_linha_refeicao(linhas[0][0], CNPJ, FORNECEDOR, {'cafe': 9}, VALORES)
+    resultado = gravar_refeicoes(cursor, linhas + [repetida], limite_copy=5)
+
+    assert resultado['metodo'] == 'copy' and resultado['ids'] is None and resultado['linhas'] == 6
+    assert any(sql.startswith('CREATE TEMP TABLE IF NOT EXISTS refeicoes_staging') for sql in cursor.sql)
+    assert any(sql.startswith('COPY refeicoes_staging') for sql in cursor.sql)
+    assert any(sql.startswith('INSERT INTO FORNECEDORES.refeicoes') and 'FROM refeicoes_staging' in sql
+               for sql in cursor.sql)
+
+    registros = list(csv.reader(io.StringIO(cursor.copiado)))
+    assert len(registros) == 6
+    assert registros[0][0] == '2025-01-01' and float(registros[0][3]) == 9.0
+
+
+def test_limite_copy_e_exclusivo():
+    """Exatamente limite_copy linhas ainda vão pelo INSERT"""
+    original = order_store.execute_values
+    order_store.execute_values = lambda cursor, query, linhas, **_: [
+        (i, linha[0], linha[1], linha[2]) for i, linha in enumerate(linhas)
+    ]
+    try:
+        assert gravar_refeicoes(CursorFalso(), _linhas(5), limite_copy=5)['metodo'] == 'insert'
+        assert gravar_refeicoes(CursorFalso(), _linhas(6), limite_copy=5)['metodo'] == 'copy'
+    finally:
+        order_store.execute_values = original
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da leitura e da reconciliação do resumo por quinzena (cursor falso; sem banco)
+
+Uso:
+    python test_order_summary.py
+    python -m pytest test_order_summary.py
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from order_summary import COLUNAS_RESUMO, buscar_divergencias, buscar_resumo, montar_resumo, reconciliar_resumo
+from testes_util import rodar_testes
+
+CNPJ = '12323430000123'
+
+
+class CursorFalso:
+    def __init__(self, resultado=None):
+        self.resultado = resultado
+        self.executados = []
+        self.fechado = False
+
+    def execute(self, sql, parametros=None):
+        self.executados.append((' '.join(sql.split()), parametros))
+
+    def fetchone(self):
+        return self.resultado
+
+    def fetchall(self):
+        return self.resultado or []
+
+    def close(self):
+        self.fechado = True
+
+
+class ConexaoFalsa:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.fim = None
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.fim = 'commit'
+
+    def rollback(self):
+        self.fim = 'rollback'
+
+
+def test_buscar_resumo_pela_chave():
+    linha = (3,) + tuple(Decimal(i) for i in range(len(COLUNAS_RESUMO))) + (Decimal('99.5'), datetime(2025, 9, 20, 8))
+    cursor = CursorFalso(linha)
+    resumo = buscar_resumo(cursor, CNPJ, 'RESTAURANTE PARAISO', date(2025, 9, 16))
+
+    assert cursor.executados[0][1] == (CNPJ, 'RESTAURANTE PARAISO', date(2025, 9, 16))
+    assert 'WHERE cnpj = %s AND fornecedor = %s AND periodo = %s' in cursor.executados[0][0]
+    assert resumo['dias'] == 3 and resumo['cafe'] == 0.0 and resumo['total_gelo'] == float(len(COLUNAS_RESUMO) - 1)
+    assert resumo['total'] == 99.5 and resumo['atualizado_em'] == '2025-09-20T08:00:00'
+    assert montar_resumo(None) is None
+
+
+def test_divergencias_filtradas_por_cnpj():
+    cursor = CursorFalso()
+    buscar_divergencias(cursor, CNPJ)
+    sql, parametros = cursor.executados[0]
+    # O filtro entra nas duas CTEs (base e gravado)
+    assert sql.count('AND cnpj = %s') == 2 and parametros == [CNPJ, CNPJ]
+
+    buscar_divergencias(cursor)
+    assert 'AND cnpj' not in cursor.executados[1][0] and cursor.executados[1][1] == []
+
+
+def test_reconciliar_corrige_so_as_divergentes():
+    divergentes = [(CNPJ, 'RESTAURANTE PARAISO', date(2025, 9, 1))]
+    cursor = CursorFalso(divergentes)
+    conexao = ConexaoFalsa(cursor)
+    assert reconciliar_resumo(conexao) == divergentes
+
+    comandos = [sql.split()[0] for sql, _ in cursor.executados]
+    assert comandos == ['LOCK', 'WITH', 'DELETE', 'INSERT']
+    assert cursor.executados[2][1] == ([CNPJ], ['RESTAURANTE PARAISO'], [date(2025, 9, 1)])
+    assert conexao.fim == 'commit' and cursor.fechado
+
+    # Só verificar: nada é alterado e a transação (com o LOCK) é desfeita
+    cursor = CursorFalso(divergentes)
+    conexao = ConexaoFalsa(cursor)
+    reconciliar_resumo(conexao, apenas_verificar=True)
+    assert [sql.split()[0] for sql, _ in cursor.executados] == ['LOCK', 'WITH']
+    assert conexao.fim == 'rollback'
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
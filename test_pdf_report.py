@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do recibo da quinzena (montagem a partir das linhas gravadas; sem banco)
+
+Uso:
+    python test_pdf_report.py
+    python -m pytest test_pdf_report.py
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from pdf_report import PdfRenderer, canvas, formatar_cnpj, montar_recibo, nome_arquivo_pdf
+from supplier_catalog import CAMPOS_REFEICAO, somente_digitos
+from testes_util import rodar_testes
+
+CNPJ = '12323430000123'
+FORNECEDOR = 'AGUINALDO JOSE DA SILVA - REST E ESPETINHO DO IRMÃO'
+
+
+def _linha(dia, quantidades, valores):
+    """Linha como SQL_REFEICOES_PERIODO devolve: data, quantidades, valores e totais gravados"""
+    quantidades = [quantidades.get(campo, 0) for campo in CAMPOS_REFEICAO]
+    valores = [Decimal(str(valores.get(campo, 0))) for campo in CAMPOS_REFEICAO]
+    totais = [quantidade * valor for quantidade, valor in zip(quantidades, valores)]
+    return (dia,) + tuple(quantidades) + tuple(valores) + tuple(totais)
+
+
+def test_cnpj_do_pdf():
+    """O /api/pdf consulta só dígitos e o recibo mostra o CNPJ formatado"""
+    assert somente_digitos('12.323.430/0001-23') == CNPJ
+    assert somente_digitos(CNPJ) == CNPJ
+    assert somente_digitos(None) == ''
+    assert formatar_cnpj(CNPJ) == '12.323.430/0001-23'
+    assert formatar_cnpj('12345678901') == '123.456.789-01'
+    # Tamanho inesperado volta como veio
+    assert formatar_cnpj('123') == '123'
+    assert formatar_cnpj(formatar_cnpj(CNPJ)) == '12.323.430/0001-23'
+
+
+def test_recibo_soma_os_totais_gravados():
+    """Preço que muda na quinzena: uma faixa por preço e o total é o gravado, não qtd x último preço"""
+    linhas = [
+        _linha(date(2025, 9, 1), {'cafe': 2, 'almoco_marmitex': 1}, {'cafe': 5.0, 'almoco_marmitex': 25.0}),
+        _linha(date(2025, 9, 2), {'cafe': 3}, {'cafe': 5.0, 'almoco_marmitex': 25.0}),
+        _linha(date(2025, 9, 10), {'cafe': 1, 'almoco_marmitex': 2}, {'cafe': 6.0, 'almoco_marmitex': 25.0}),
+    ]
+    recibo = montar_recibo(linhas, FORNECEDOR, CNPJ, 2025, 9, 1)
+
+    assert recibo['cnpj'] == '12.323.430/0001-23'
+    assert len(recibo['dias']) == 15 and recibo['dias'][2]['cafe'] == 0.0
+    assert recibo['dias'][0]['cafe'] == 2.0 and recibo['dias'][9]['almoco_marmitex'] == 2.0
+
+    resumo = {item['campo']: item['faixas'] for item in recibo['resumo']}
+    assert [item['campo'] for item in recibo['resumo']] == list(CAMPOS_REFEICAO)
+    assert resumo['cafe'] == [{'preco': 5.0, 'quantidade': 5.0, 'total': 25.0},
+                              {'preco': 6.0, 'quantidade': 1.0, 'total': 6.0}]
+    assert resumo['almoco_marmitex'] == [{'preco': 25.0, 'quantidade': 3.0, 'total': 75.0}]
+    # Sem consumo: uma linha zerada
+    assert resumo['gelo'] == [{'preco': 0.0, 'quantidade': 0.0, 'total': 0.0}]
+    # 6 cafés x R$ 6,00 (último preço) dariam 36; o gravado é 25 + 6
+    assert recibo['valor_total'] == 106.0
+
+    assert nome_arquivo_pdf(recibo) == 'AGUINALDO_JOSE_DA_SILVA_REST_E_ESPETINHO_DO_IRMÃO-Setembro-2025-1Q.pdf'
+
+
+def test_recibo_sem_linhas_e_render():
+    """Quinzena sem linhas sai zerada; com reportlab o mesmo recibo vem do cache"""
+    recibo = montar_recibo([], FORNECEDOR, CNPJ, 2024, 2, 2)
+    assert [dia['data_refeicao'] for dia in recibo['dias']][-1] == '2024-02-29'
+    assert recibo['valor_total'] == 0
+
+    if canvas is None:
+        return
+    renderer = PdfRenderer('logo_nao_existe.png')
+    sha, pdf = renderer.render(recibo)
+    assert pdf.startswith(b'%PDF')
+    assert renderer.render(dict(recibo))[0] == sha and renderer.stats()['cache_hits'] == 1
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
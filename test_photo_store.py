@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes dos armazenamentos de fotos das sessões (memória e SQLite em diretório temporário)
+
+Uso:
+    python test_photo_store.py
+    python -m pytest test_photo_store.py
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from photo_store import (Foto, PhotoSessionStore, SQLitePhotoStore, ler_data_url, limitar_espera,
+                         montar_data_url)
+from testes_util import rodar_testes
+
+
+def _sqlite(diretorio, **kwargs):
+    return SQLitePhotoStore(os.path.join(diretorio, 'fotos.db'), **kwargs)
+
+
+def _leitura_unica(store):
+    assert store.put('s1', b'abc', 'image/png')
+    assert store.get('s1') == Foto(b'abc', 'image/png')
+    assert store.take('s1') == Foto(b'abc', 'image/png')
+    assert store.take('s1') is None and store.get('s1') is None
+    # put() substitui a foto da sessão
+    store.put('s1', b'1')
+    store.put('s1', b'22')
+    assert store.take('s1').dados == b'22'
+
+
+def _orcamento_e_expulsao(store):
+    """max_bytes=10: a entrada sozinha acima de max_entry_bytes é recusada; as antigas saem primeiro"""
+    assert not store.put('grande', b'x' * 11)
+    for sessao in ('a', 'b', 'c'):
+        assert store.put(sessao, b'x' * 4)
+        time.sleep(0.01)
+    assert store.get('a') is None
+    assert store.take('b') is not None and store.take('c') is not None
+    assert store.stats()['expulsas'] == 1 and store.stats()['rejeitadas'] == 1
+
+
+def _expiracao(store):
+    store.put('s1', b'abc')
+    time.sleep(0.06)
+    assert store.get('s1') is None and store.take('s1') is None
+    assert store.stats()['sessoes'] == 0
+
+
+def test_memoria_leitura_unica():
+    _leitura_unica(PhotoSessionStore())
+
+
+def test_memoria_orcamento_e_lru():
+    _orcamento_e_expulsao(PhotoSessionStore(max_bytes=10))
+
+    # get() conta como uso: a lida fica por último na fila de expulsão
+    store = PhotoSessionStore(max_bytes=8)
+    store.put('a', b'x' * 4)
+    store.put('b', b'x' * 4)
+    store.get('a')
+    store.put('c', b'x' * 4)
+    assert store.get('b') is None and store.get('a') is not None
+
+
+def test_memoria_ttl():
+    _expiracao(PhotoSessionStore(ttl=0.05))
+
+
+def test_memoria_ouvintes():
+    """put() chama e descarta os callbacks da sessão; remove_listener() tira os que não foram chamados"""
+    store = PhotoSessionStore()
+    avisos = []
+    store.add_listener('s1', lambda: avisos.append(store.take('s1')))
+    cancelado = lambda: avisos.append('nao')   # noqa: E731
+    store.add_listener('s2', cancelado)
+    store.remove_listener('s2', cancelado)
+
+    store.put('s2', b'2')
+    store.put('s1', b'1')
+    store.put('s1', b'1')
+    assert avisos == [Foto(b'1', 'image/jpeg')]
+    assert store.stats()['aguardando'] == 0 and store.stats()['notificacoes'] == 1
+
+
+def test_sqlite_leitura_unica_entre_instancias():
+    """Dois workers (duas instâncias no mesmo arquivo): um grava, o outro retira uma vez só"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        _leitura_unica(_sqlite(diretorio))
+        worker_a, worker_b = _sqlite(diretorio), _sqlite(diretorio)
+        worker_a.put('s2', b'foto', 'image/webp')
+        assert worker_b.take('s2') == Foto(b'foto', 'image/webp')
+        assert worker_a.take('s2') is None
+
+
+def test_sqlite_orcamento_e_ttl():
+    with tempfile.TemporaryDirectory() as diretorio:
+        _orcamento_e_expulsao(_sqlite(diretorio, max_bytes=10))
+    with tempfile.TemporaryDirectory() as diretorio:
+        _expiracao(_sqlite(diretorio, ttl=0.05))
+
+
+def test_sqlite_take_sem_foto_nao_pega_lock_de_escrita():
+    """Com outro processo gravando, consultar uma sessão vazia responde na hora"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        store = _sqlite(diretorio)
+        store.put('s1', b'abc')
+        outro = sqlite3.connect(store.path, timeout=0, isolation_level=None)
+        outro.execute("BEGIN IMMEDIATE")
+        try:
+            inicio = time.monotonic()
+            assert store.take('vazia') is None
+            assert time.monotonic() - inicio < 1
+        finally:
+            outro.execute("ROLLBACK")
+            outro.close()
+        assert store.take('s1').dados == b'abc'
+
+
+def test_data_url_e_espera():
+    foto = ler_data_url('data:image/png;base64,' + 'YWJj')
+    assert foto == Foto(b'abc', 'image/png') and ler_data_url(montar_data_url(foto)) == foto
+    for invalido in ('abc', 'data:text/plain;base64,YWJj', 'data:image/png;base64,@@'):
+        try:
+            ler_data_url(invalido)
+        except ValueError:
+            continue
+        raise AssertionError(f'Data URL aceito: {invalido!r}')
+
+    assert limitar_espera('10', 25) == 10 and limitar_espera('99', 25) == 25
+    assert limitar_espera('-1', 25) == 0 and limitar_espera(None, 25) == 25
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes da montagem dos relatórios (filtros, SQL e conversão das linhas; sem banco)
+
+Uso:
+    python test_reports.py
+    python -m pytest test_reports.py
+"""
+
+from datetime import date
+
+from reports import COLUNAS_SOMA, ler_filtros, montar_consulta, montar_relatorio
+from testes_util import rodar_testes
+
+
+def _erro(funcao, *args):
+    try:
+        funcao(*args)
+    except ValueError as e:
+        return str(e)
+    raise AssertionError(f'{funcao.__name__}{args} deveria levantar ValueError')
+
+
+def test_ler_filtros():
+    filtros = ler_filtros({'ano': '2024', 'mes': '2', 'quinzena': '2', 'cnpj': '12.323.430/0001-23'})
+    assert filtros == {'data_inicio': date(2024, 2, 16), 'data_fim': date(2024, 2, 29), 'quinzena': None,
+                       'cnpj': '12323430000123'}
+
+    # Mês inteiro recortado pelas datas explícitas
+    filtros = ler_filtros({'ano': '2025', 'mes': '9', 'data_inicio': '2025-09-10'})
+    assert (filtros['data_inicio'], filtros['data_fim']) == (date(2025, 9, 10), date(2025, 9, 30))
+
+    # Quinzena sem ano/mês filtra a metade de todos os meses
+    assert ler_filtros({'quinzena': '1'})['quinzena'] == 1
+    assert ler_filtros({}) == {'data_inicio': None, 'data_fim': None, 'quinzena': None, 'cnpj': None}
+
+    assert 'Quinzena inválida' in _erro(ler_filtros, {'quinzena': '3'})
+    assert 'ano e mes' in _erro(ler_filtros, {'ano': '2025'})
+    assert 'data_inicio' in _erro(ler_filtros, {'data_inicio': '10/09/2025'})
+    assert 'posterior' in _erro(ler_filtros, {'data_inicio': '2025-09-10', 'data_fim': '2025-09-01'})
+
+
+def test_consulta_usa_resumo_so_com_quinzenas_inteiras():
+    sql, parametros = montar_consulta('fornecedores', ler_filtros({'ano': '2025', 'mes': '9'}))
+    assert 'FORNECEDORES.resumo_quinzena' in sql
+    assert parametros == [date(2025, 9, 1), date(2025, 9, 30)]
+
+    sql, parametros = montar_consulta('fornecedores', ler_filtros({'data_inicio': '2025-09-03', 'cnpj': '1'}))
+    assert 'FORNECEDORES.refeicoes' in sql and 'resumo_quinzena' not in sql
+    assert parametros == [date(2025, 9, 3), '1']
+    # Valores só entram como parâmetros, nunca no texto do SQL
+    assert '2025' not in sql
+
+
+def test_consulta_por_projeto_e_periodo():
+    projetos = [('RESTAURANTE PARAISO', 'OBRA A'), ('GELO BOM', 'OBRA B')]
+    sql, parametros = montar_consulta('projetos', ler_filtros({}), projetos)
+    assert 'unnest(%s::text[], %s::text[])' in sql
+    assert parametros == [['RESTAURANTE PARAISO', 'GELO BOM'], ['OBRA A', 'OBRA B']]
+
+    sql, _ = montar_consulta('periodos', ler_filtros({'quinzena': '2'}))
+    assert "to_char(r.periodo, 'YYYY-MM')" in sql and 'EXTRACT(DAY FROM r.periodo) > 15' in sql
+
+    assert 'Agrupamento inválido' in _erro(montar_consulta, 'cnpjs', ler_filtros({}))
+
+
+def test_montar_relatorio():
+    somas = tuple(range(len(COLUNAS_SOMA)))
+    linhas = [
+        ('12323430000123', 'RESTAURANTE PARAISO', 0, 10) + somas + (150,),
+        (None, None, 1, 10) + somas + (150,),
+    ]
+    relatorio = montar_relatorio('fornecedores', linhas)
+    assert relatorio['linhas'] == [{
+        'cnpj': '12323430000123', 'fornecedor': 'RESTAURANTE PARAISO', 'dias': 10,
+        **{coluna: float(valor) for coluna, valor in zip(COLUNAS_SOMA, somas)}, 'total': 150.0,
+    }]
+    assert relatorio['total']['total'] == 150.0 and 'cnpj' not in relatorio['total']
+    assert montar_relatorio('fornecedores', []) == {'linhas': [], 'total': None}
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes dos arquivos estáticos (negociação de encoding, ETag e URL com hash; diretório temporário)
+
+Uso:
+    python test_static_assets.py
+    python -m pytest test_static_assets.py
+"""
+
+import gzip
+import os
+import tempfile
+
+from static_assets import MAX_AGE_IMUTAVEL, StaticAssets, aceita_encoding, brotli, nome_com_hash
+from testes_util import rodar_testes
+
+HTML = ('<html><body><img src="logo.png">' + 'refeições ' * 300 + '</body></html>').encode('utf-8')
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 2048
+
+
+def _assets(diretorio):
+    for nome, dados in (('index.html', HTML), ('logo.png', PNG), ('pequeno.css', b'body{}')):
+        with open(os.path.join(diretorio, nome), 'wb') as arquivo:
+            arquivo.write(dados)
+    assets = StaticAssets(diretorio)
+    assets.adicionar('logo.png', fingerprint=True)
+    assets.adicionar('index.html')
+    assets.adicionar('pequeno.css')
+    return assets
+
+
+def test_aceita_encoding():
+    assert aceita_encoding('gzip, deflate, br', 'gzip')
+    assert aceita_encoding('GZIP;q=0.5', 'gzip')
+    assert aceita_encoding('br ; q=1.0, gzip', 'br')
+    assert not aceita_encoding('gzip;q=0', 'gzip')
+    assert not aceita_encoding('gzip; q=0.000', 'gzip')
+    assert not aceita_encoding('deflate', 'gzip')
+    assert not aceita_encoding('', 'gzip') and not aceita_encoding(None, 'gzip')
+    # Header malformado não derruba a requisição
+    assert not aceita_encoding('gzip;q=abc', 'gzip')
+
+
+def test_negociacao_e_etag_por_variante():
+    with tempfile.TemporaryDirectory() as diretorio:
+        index = _assets(diretorio).buscar('index.html')
+
+        gz = index.negociar('gzip, deflate')
+        assert gz.encoding == 'gzip' and gz.etag == f'{index.sha}-gzip'
+        assert gzip.decompress(gz.dados) == index.variantes['identity']
+
+        sem = index.negociar('gzip;q=0')
+        assert sem.encoding == 'identity' and sem.etag == index.sha and sem.dados == index.variantes['identity']
+
+        br = index.negociar('gzip, br')
+        if brotli is None:
+            assert br.encoding == 'gzip'
+        else:
+            assert br.encoding == 'br' and brotli.decompress(br.dados) == index.variantes['identity']
+            assert index.negociar('br;q=0, gzip').encoding == 'gzip'
+
+
+def test_binarios_e_pequenos_ficam_no_disco():
+    """PNG e arquivos abaixo do mínimo não têm variantes: dados=None manda servir do disco"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        assets = _assets(diretorio)
+        for nome in ('logo.png', 'pequeno.css'):
+            variante = assets.buscar(nome).negociar('gzip, br')
+            assert variante.encoding == 'identity' and variante.dados is None
+        assert assets.buscar('pequeno.css').content_type == 'text/css; charset=utf-8'
+        assert assets.buscar('logo.png').content_type == 'image/png'
+
+
+def test_fingerprint_e_cache_control():
+    """O HTML aponta para o logo com hash; só a URL com hash tem cache de um ano"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        assets = _assets(diretorio)
+        logo = assets.buscar('logo.png')
+        assert logo.nome_fingerprint == nome_com_hash('logo.png', PNG)
+        assert assets.buscar_fingerprint(logo.nome_fingerprint) is logo
+        assert assets.buscar_fingerprint('logo.000000000000.png') is None
+
+        html = assets.buscar('index.html').variantes['identity']
+        assert f'src="/static/{logo.nome_fingerprint}"'.encode() in html
+
+        assert assets.cache_control(logo, logo.nome_fingerprint) == f'public, max-age={MAX_AGE_IMUTAVEL}, immutable'
+        assert assets.cache_control(logo, 'logo.png') == 'no-cache'
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do PriceBook, do snapshot e do CatalogCache (sem Azure: o loader é uma função local)
+
+Uso:
+    python test_supplier_catalog.py
+    python -m pytest test_supplier_catalog.py
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from supplier_catalog import (CAMPOS_REFEICAO, VERSAO_SNAPSHOT, CatalogCache, Catalogo, PriceBook, gravar_snapshot,
+                              ler_snapshot, posicao_do_tipo)
+from testes_util import rodar_testes
+
+REGISTROS = [
+    {'fornecedor': 'RESTAURANTE PARAISO', 'cpf_cnpj': '58.283.378/0001-20', 'cafe': 15.0, 'almoco_marmitex': 25.0,
+     'almoco_local': 0.0, 'janta_marmitex': 0.0, 'janta_local': 25.0, 'gelo': 0.0},
+    {'fornecedor': 'GELO BOM', 'cpf_cnpj': '', 'gelo': 8.5},
+]
+
+
+def _arquivo(diretorio, nome, conteudo):
+    caminho = os.path.join(diretorio, nome)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f)
+    return caminho
+
+
+def test_posicao_do_tipo():
+    """TIPO_FORN com acento, caixa e espaços variados cai na mesma posição"""
+    assert posicao_do_tipo('Café') == 0
+    assert posicao_do_tipo('  almoço   MARMITEX ') == 1
+    assert posicao_do_tipo('Janta Local') == 4
+    assert posicao_do_tipo('GELO') == 5
+    assert posicao_do_tipo('LANCHE') is None and posicao_do_tipo('') is None
+
+
+def test_pricebook_das_linhas():
+    """Uma linha por tipo no Azure vira um registro por fornecedor; tipos desconhecidos são ignorados"""
+    linhas = [
+        {'FORNECEDOR': 'RESTAURANTE PARAISO', 'CPF_CNPJ': '58.283.378/0001-20', 'TIPO_FORN': 'Café',
+         'VALOR': 15, 'PROJETO': None},
+        {'FORNECEDOR': 'RESTAURANTE PARAISO', 'CPF_CNPJ': '58.283.378/0001-20', 'TIPO_FORN': 'ALMOÇO MARMITEX',
+         'VALOR': 25.5, 'PROJETO': ' OBRA A '},
+        {'FORNECEDOR': 'RESTAURANTE PARAISO', 'CPF_CNPJ': '58.283.378/0001-20', 'TIPO_FORN': 'LANCHE',
+         'VALOR': 99, 'PROJETO': 'OBRA B'},
+        {'FORNECEDOR': 'GELO BOM', 'CPF_CNPJ': None, 'TIPO_FORN': 'gelo', 'VALOR': None},
+    ]
+    precos = PriceBook.das_linhas(linhas)
+    assert len(precos) == 2 and [f.fornecedor for f in precos] == ['RESTAURANTE PARAISO', 'GELO BOM']
+
+    paraiso = precos.buscar('RESTAURANTE PARAISO')
+    assert paraiso['cafe'] == 15.0 and paraiso['almoco_marmitex'] == 25.5 and paraiso['gelo'] == 0.0
+    assert paraiso['projeto'] == 'OBRA A' and paraiso.get('lanche') is None
+    assert precos.buscar('GELO BOM')['gelo'] == 0.0 and precos.buscar('GELO BOM')['cpf_cnpj'] == ''
+
+    assert precos.buscar_cnpj('58283378000120') is paraiso
+    assert precos.buscar_cnpj('58.283.378/0001-20') is paraiso and precos.buscar_cnpj('') is None
+    assert precos.filtrar(['GELO BOM', 'NAO EXISTE']) == {'GELO BOM': precos.buscar('GELO BOM')}
+
+
+def test_pricebook_ida_e_volta_em_json():
+    precos = PriceBook.dos_registros(REGISTROS)
+    registros = precos.para_json()
+    assert list(registros[0]) == ['fornecedor', 'cpf_cnpj', 'projeto', *CAMPOS_REFEICAO]
+    assert registros[1]['cafe'] == 0.0 and registros[1]['gelo'] == 8.5
+    assert PriceBook.dos_registros(registros).para_json() == registros
+
+
+def test_snapshot_versao_0_e_1():
+    """Lista solta (v0) e {"versao": 1, ...} dão a mesma tabela; o resto volta None"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        v0 = ler_snapshot(_arquivo(diretorio, 'v0.json', REGISTROS))
+        v1 = ler_snapshot(_arquivo(diretorio, 'v1.json', {'versao': 1, 'fornecedores': REGISTROS}))
+        assert Catalogo(v0).etag == Catalogo(v1).etag
+        assert v1.buscar('RESTAURANTE PARAISO')['almoco_marmitex'] == 25.0
+        assert v1.buscar('GELO BOM')['cafe'] == 0.0
+        assert v1.buscar_cnpj('58283378000120').fornecedor == 'RESTAURANTE PARAISO'
+
+        assert ler_snapshot(_arquivo(diretorio, 'v9.json', {'versao': 9, 'fornecedores': REGISTROS})) is None
+        assert ler_snapshot(os.path.join(diretorio, 'nao_existe.json')) is None
+        quebrado = os.path.join(diretorio, 'quebrado.json')
+        with open(quebrado, 'w') as f:
+            f.write('[{"fornecedor": ')
+        assert ler_snapshot(quebrado) is None
+
+
+def test_gravar_snapshot_atomico():
+    """Grava a versão atual, relê igual e não deixa o temporário para trás"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'catalogo.json')
+        catalogo = Catalogo(PriceBook.dos_registros(REGISTROS))
+        gravar_snapshot(caminho, catalogo)
+
+        assert os.listdir(diretorio) == ['catalogo.json']
+        with open(caminho, encoding='utf-8') as f:
+            conteudo = json.load(f)
+        assert conteudo['versao'] == VERSAO_SNAPSHOT and conteudo['etag'] == catalogo.etag
+        assert Catalogo(ler_snapshot(caminho)).etag == catalogo.etag
+
+
+def test_boot_pela_semente_sem_grava_la():
+    """Sem snapshot de runtime vale a semente; a carga do banco grava só o snapshot"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        semente = _arquivo(diretorio, 'semente.json', REGISTROS)
+        antes = os.path.getmtime(semente)
+        snapshot = os.path.join(diretorio, 'runtime', 'catalogo.json')
+        os.mkdir(os.path.dirname(snapshot))
+        cache = CatalogCache(lambda: PriceBook.dos_registros(REGISTROS[:1]), snapshot=snapshot, semente=semente)
+
+        assert cache.carregar_snapshot()
+        catalogo = cache.peek()
+        assert catalogo.origem == 'snapshot' and len(catalogo.fornecedores) == 2
+        # Entra vencido: nunca serve para precificar pedido
+        assert cache.precos_recentes() is None
+
+        cache.refresh()
+        assert len(ler_snapshot(snapshot)) == 1
+        assert os.path.getmtime(semente) == antes and len(ler_snapshot(semente)) == 2
+        assert cache.precos_recentes() is not None
+
+
+def test_snapshot_tem_prioridade_sobre_a_semente():
+    with tempfile.TemporaryDirectory() as diretorio:
+        semente = _arquivo(diretorio, 'semente.json', REGISTROS)
+        snapshot = _arquivo(diretorio, 'catalogo.json', {'versao': 1, 'fornecedores': REGISTROS[:1]})
+        cache = CatalogCache(lambda: PriceBook.dos_registros(REGISTROS), snapshot=snapshot, semente=semente)
+        assert cache.carregar_snapshot()
+        assert len(cache.peek().fornecedores) == 1
+
+
+def test_ttl_e_backoff():
+    """Dentro do ttl responde do cache; vencido responde na hora e atualiza em segundo plano"""
+    chamadas = []
+
+    def loader():
+        chamadas.append(time.monotonic())
+        if len(chamadas) > 1:
+            raise RuntimeError('Azure fora')
+        return PriceBook.dos_registros(REGISTROS)
+
+    cache = CatalogCache(loader, ttl=0.05, stale_ttl=60, backoff=60)
+    primeiro = cache.get()
+    assert cache.get() is primeiro and len(chamadas) == 1
+
+    time.sleep(0.06)
+    assert cache.get() is primeiro
+    for _ in range(50):
+        if not cache.stats()['atualizando'] and cache.stats()['falhas']:
+            break
+        time.sleep(0.01)
+    # Falhou em segundo plano: o catálogo antigo continua e o backoff segura novas idas ao banco
+    for _ in range(20):
+        assert cache.get() is primeiro
+    assert len(chamadas) == 2
+    assert cache.stats()['falhas_seguidas'] == 1
+
+
+def test_sem_catalogo_em_backoff_falha_rapido():
+    def loader():
+        raise RuntimeError('Azure fora')
+
+    cache = CatalogCache(loader, backoff=60)
+    for _ in range(2):
+        try:
+            cache.get()
+        except RuntimeError:
+            continue
+        raise AssertionError('get() sem catálogo deveria falhar')
+    assert cache.stats()['falhas'] == 1
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testes do índice de busca de fornecedores (catálogo montado na hora; sem Azure)
+
+Uso:
+    python test_supplier_search.py
+    python -m pytest test_supplier_search.py
+"""
+
+from supplier_catalog import Catalogo, PriceBook
+from supplier_search import SupplierIndex, SupplierSearch, distancia_ate_um
+from testes_util import rodar_testes
+
+REGISTROS = [
+    {'fornecedor': 'RESTAURANTE PARAISO', 'cpf_cnpj': '58.283.378/0001-20', 'almoco_marmitex': 25.0},
+    {'fornecedor': 'Conveniência Boa Vista', 'cpf_cnpj': '12.323.430/0001-23', 'cafe': 5.0},
+    {'fornecedor': 'GELO BOM', 'cpf_cnpj': '', 'gelo': 8.5},
+    {'fornecedor': 'RESTAURANTE BOM SABOR', 'cpf_cnpj': '11.111.111/0001-11'},
+]
+
+
+def _nomes(resultados):
+    return [fornecedor['fornecedor'] for _, fornecedor in resultados]
+
+
+def test_distancia_ate_um():
+    """Uma inserção, remoção ou troca de letra; nada além disso"""
+    assert distancia_ate_um('CONVENIENCIA', 'CONVENIENCIA')
+    assert distancia_ate_um('CONVENIENCIA', 'COVENIENCIA')
+    assert distancia_ate_um('COVENIENCIA', 'CONVENIENCIA')
+    assert distancia_ate_um('RESTAURANTE', 'RESTAURAMTE')
+    assert distancia_ate_um('GELO', 'GELOS')
+    assert distancia_ate_um('', 'A')
+    assert not distancia_ate_um('RESTAURANTE', 'RESTARANTEE')
+    assert not distancia_ate_um('GELO', 'GALA')
+    assert not distancia_ate_um('GELO', 'GELOSS')
+    assert not distancia_ate_um('AB', 'BA')
+
+
+def test_busca_devolve_indice_no_catalogo():
+    """Cada resultado traz a posição no catálogo: o front-end usa como id da opção"""
+    fornecedores = PriceBook.dos_registros(REGISTROS).fornecedores
+    indice = SupplierIndex(fornecedores)
+    for posicao, fornecedor in indice.buscar('', 10):
+        assert fornecedores[posicao] is fornecedor
+
+    # Busca vazia: ordem alfabética sem acento
+    assert _nomes(indice.buscar('', 2)) == ['Conveniência Boa Vista', 'GELO BOM']
+    assert indice.buscar('paraiso') == [(0, fornecedores[0])]
+
+
+def test_prefixo_acento_cnpj_e_erro_de_digitacao():
+    indice = SupplierIndex(PriceBook.dos_registros(REGISTROS).fornecedores)
+    assert _nomes(indice.buscar('conveniencia')) == ['Conveniência Boa Vista']
+    assert _nomes(indice.buscar('COVENIENCIA')) == ['Conveniência Boa Vista']
+    assert _nomes(indice.buscar('rest bom')) == ['RESTAURANTE BOM SABOR']
+    # Quem começa com a busca vem antes; empate por ordem alfabética
+    assert _nomes(indice.buscar('bom')) == ['GELO BOM', 'RESTAURANTE BOM SABOR']
+    assert _nomes(indice.buscar('12323430')) == ['Conveniência Boa Vista']
+    assert indice.buscar('xyz') == [] and indice.buscar('gel', 0) == []
+
+
+def test_indice_reconstruido_quando_o_catalogo_muda():
+    catalogos = [Catalogo(PriceBook.dos_registros(REGISTROS))]
+    busca = SupplierSearch(lambda: catalogos[-1])
+    assert _nomes(busca.buscar('gelo')) == ['GELO BOM']
+    assert busca.buscar('gelo') and busca.stats()['reconstrucoes'] == 1
+
+    catalogos.append(Catalogo(PriceBook.dos_registros(REGISTROS[2:])))
+    assert busca.buscar('gelo')[0][0] == 0
+    assert busca.stats()['reconstrucoes'] == 2 and busca.stats()['buscas'] == 3
+
+
+if __name__ == "__main__":
+    rodar_testes(globals())
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Execução dos test_*.py de funções puras sem pytest (python test_xxx.py)"""
+
+import sys
+import traceback
+
+
+def rodar_testes(escopo):
+    """Executa as funções test_* do módulo, na ordem em que foram definidas; sai com 1 se alguma falhar"""
+    testes = [valor for nome, valor in escopo.items() if nome.startswith('test_') and callable(valor)]
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✅ {teste.__name__}")
+        except Exception:
+            falhas += 1
+            print(f"❌ {teste.__name__}")
+            print(traceback.format_exc())
+    print(f"\n{len(testes) - falhas}/{len(testes)} testes passaram")
+    sys.exit(1 if falhas else 0)
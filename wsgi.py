@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ponto de entrada WSGI (Flask) para produção
+
+    SERVER_MODE=wsgi gunicorn -c gunicorn.conf.py
+
+Migrações rodam uma única vez no processo master (ver gunicorn.conf.py),
+não em cada worker.
+"""
+
+from photo_server import create_app
+
+app = create_app()